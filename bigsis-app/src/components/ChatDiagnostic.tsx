@@ -387,6 +387,8 @@ export default function ChatDiagnostic({ initialContext, onBack }: ChatDiagnosti
   const [savedDiagId, setSavedDiagId] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
+  // Lets the backend reuse extracted context across turns of this conversation
+  const conversationIdRef = useRef<string>(crypto.randomUUID());
   const { user, session } = useAuth();
   const router = useRouter();
   const { t } = useLanguage();
@@ -424,6 +426,7 @@ export default function ChatDiagnostic({ initialContext, onBack }: ChatDiagnosti
         body: JSON.stringify({
           messages: updatedMessages.map(m => ({ role: m.role, content: m.content })),
           language: 'fr',
+          conversation_id: conversationIdRef.current,
           ...(initialContext && { context: initialContext }),
         }),
       });
@@ -623,7 +626,7 @@ export default function ChatDiagnostic({ initialContext, onBack }: ChatDiagnosti
               <button
                 onClick={() => {
                   if (onBack) { onBack(); }
-                  else { setMessages([DEFAULT_GREETING]); setInput(''); setSavedDiag(false); setSavedDiagId(null); setFeedbackSubmitted(false); setEnrichment({}); setScoreDetails(null); }
+                  else { conversationIdRef.current = crypto.randomUUID(); setMessages([DEFAULT_GREETING]); setInput(''); setSavedDiag(false); setSavedDiagId(null); setFeedbackSubmitted(false); setEnrichment({}); setScoreDetails(null); }
                 }}
                 className="flex-1 flex items-center justify-center gap-2 py-3 rounded-xl bg-white/5 border border-white/10 text-blue-200 hover:bg-white/10 hover:text-white transition-all text-sm font-medium"
               >
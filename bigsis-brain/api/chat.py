@@ -8,17 +8,27 @@ Chat Diagnostic API — BigSis conversational diagnostic with:
 """
 
 import asyncio
+import hashlib
 import json
 import logging
+import os
+import re
+import time
+import unicodedata
 from typing import Optional
 
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from sqlalchemy import select, func, literal, null, cast, union_all, String
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 
 from api.schemas import DiagnosticRequest
-from core.auth import AuthUser, get_optional_user
+from core import cache_versions, llm_cache
+from core import llm_scheduler
+from core.auth import AuthUser, get_optional_user, require_admin
 from core.orchestrator import Orchestrator
+from core.rag import procedure_index
+from core.utils.lru import LRUCache
 from core.db.database import AsyncSessionLocal
 from core.db.models import Procedure, SocialGeneration, UserProfile, TrendTopic
 from core.trends.learning_pipeline import run_full_learning
@@ -32,11 +42,61 @@ orchestrator = Orchestrator()
 # P2: LLM-based context extraction (replaces keyword matching)
 # ---------------------------------------------------------------------------
 
-async def _extract_context_llm(messages: list) -> dict:
-    """Use a fast LLM call to extract structured clinical context from conversation."""
+# Keyword fast path: skip the LLM when every required field is found with
+# at least this confidence (see _extract_context_keywords_scored)
+KEYWORD_REQUIRED_FIELDS = ("area", "concern")
+KEYWORD_CONFIDENCE_THRESHOLD = float(os.getenv("CHAT_KEYWORD_CONFIDENCE", "0.9"))
+
+# LLM extractions keyed by hash of the user messages so far
+_extraction_cache = LRUCache(
+    int(os.getenv("CHAT_EXTRACTION_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("CHAT_EXTRACTION_CACHE_TTL", "3600")),
+)
+_extraction_counters = {"keyword": 0, "llm_cached": 0, "llm": 0}
+
+
+def _conversation_key(user_texts: list[str]) -> str:
+    return hashlib.sha256("\x1e".join(user_texts).encode("utf-8")).hexdigest()
+
+
+async def _extract_context(messages: list) -> tuple[dict, str]:
+    """Hybrid extraction. Returns (context, source) with source one of
+    "keyword", "llm_cached", "llm" or "keyword_fallback".
+
+    The keyword extractor runs first and wins when all KEYWORD_REQUIRED_FIELDS
+    are found unambiguously; otherwise the LLM extraction is used, cached per
+    conversation prefix (same user messages -> same extraction).
+    "keyword_fallback" means the LLM call failed and the keyword result was
+    used anyway (not cached).
+    """
+    context, confidence = _extract_context_keywords_scored(messages)
+    if all(confidence.get(f, 0.0) >= KEYWORD_CONFIDENCE_THRESHOLD for f in KEYWORD_REQUIRED_FIELDS):
+        _extraction_counters["keyword"] += 1
+        return context, "keyword"
+
+    user_texts = [m.content for m in messages if m.role == "user"]
+    key = _conversation_key(user_texts)
+    cached = _extraction_cache.get(key)
+    if cached is not None:
+        _extraction_counters["llm_cached"] += 1
+        return dict(cached), "llm_cached"
+
+    _extraction_counters["llm"] += 1
+    context, from_llm = await _extract_context_llm(messages)
+    if not from_llm:
+        return context, "keyword_fallback"
+    _extraction_cache.set(key, dict(context))
+    return context, "llm"
+
+
+async def _extract_context_llm(messages: list) -> tuple[dict, bool]:
+    """Use a fast LLM call to extract structured clinical context from conversation.
+
+    Returns (context, from_llm); from_llm is False when the keyword fallback was used.
+    """
     user_texts = [m.content for m in messages if m.role == "user"]
     if not user_texts:
-        return {}
+        return {}, False
 
     full_text = "\n".join(user_texts)
 
@@ -61,23 +121,68 @@ Message patient :
             json_mode=True,
             model_override="gpt-4o-mini",
             temperature_override=0.0,
+            cache_ttl=llm_cache.DEFAULT_TTL,
         )
         if isinstance(result, dict):
-            return result
+            return result, True
         if isinstance(result, str):
-            return json.loads(result)
+            return json.loads(result), True
     except Exception as e:
         logger.warning(f"LLM context extraction failed, falling back to keywords: {e}")
 
     # Fallback to basic keyword extraction
-    return _extract_context_keywords(messages)
+    return _extract_context_keywords(messages), False
 
 
 def _extract_context_keywords(messages: list) -> dict:
     """Fallback: keyword-based context extraction."""
-    import re
+    return _extract_context_keywords_scored(messages)[0]
+
+
+# Keywords too short or too common to decide alone ("cou", "yeux", "volume"...):
+# a hit on these stays below KEYWORD_CONFIDENCE_THRESHOLD so the LLM confirms it
+WEAK_KEYWORD_CONFIDENCE = 0.6
+WEAK_KEYWORDS = {"cou", "yeux", "bouche", "levres", "sourire", "sillon", "joue", "joues",
+                 "front", "volume", "injection", "ipl", "peel", "ride", "rides", "repos"}
+
+
+def _fold(text: str) -> str:
+    """Lowercase, strip accents and normalize apostrophes for keyword matching."""
+    text = text.lower().replace("\u2019", "'")
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+
+def _keyword_confidence(text: str, keywords: list) -> float:
+    """Best confidence among the keywords found as whole words in `text` (0.0 if none)."""
+    best = 0.0
+    for kw in keywords:
+        if re.search(rf"\b{re.escape(_fold(kw))}\b", text):
+            best = max(best, WEAK_KEYWORD_CONFIDENCE if kw in WEAK_KEYWORDS or len(kw) <= 3 else 1.0)
+    return best
+
+
+def _match_keywords(text: str, keyword_map: dict) -> dict:
+    """{value: confidence} for every value with at least one whole-word keyword hit."""
+    hits = {}
+    for value, keywords in keyword_map.items():
+        conf = _keyword_confidence(text, keywords)
+        if conf:
+            hits[value] = conf
+    return hits
+
+
+def _extract_context_keywords_scored(messages: list) -> tuple[dict, dict]:
+    """Keyword-based context extraction with a confidence per field.
+
+    Keywords match whole words on accent-folded text. Confidence is 1.0 for a
+    single unambiguous hit, WEAK_KEYWORD_CONFIDENCE when the hit is a short or
+    common word, 0.5 when keywords for several values match (e.g. two zones),
+    and 0.2 for the concern fallback (raw last message). Pregnancy mentions cap
+    every field at 0.5: negations ("pas enceinte") need the LLM.
+    """
     context = {}
-    full_text = " ".join([m.content.lower() for m in messages if m.role == "user"])
+    confidence = {}
+    full_text = _fold(" ".join([m.content for m in messages if m.role == "user"]))
 
     zone_keywords = {
         "front": ["front", "forehead", "rides du front"],
@@ -87,14 +192,14 @@ def _extract_context_keywords(messages: list) -> dict:
         "cou": ["cou", "neck", "decollete"],
         "joues": ["joue", "joues", "cheek"],
     }
-    for zone, keywords in zone_keywords.items():
-        if any(kw in full_text for kw in keywords):
-            context["area"] = zone
-            break
+    zones = _match_keywords(full_text, zone_keywords)
+    if zones:
+        context["area"] = next(iter(zones))
+        confidence["area"] = zones[context["area"]] if len(zones) == 1 else 0.5
 
-    if any(w in full_text for w in ["expression", "ride d'expression", "quand je souris", "quand je fronce"]):
+    if _keyword_confidence(full_text, ["expression", "ride d'expression", "quand je souris", "quand je fronce"]):
         context["wrinkle_type"] = "expression"
-    elif any(w in full_text for w in ["statique", "permanente", "toujours visible", "repos", "meme au repos"]):
+    elif _keyword_confidence(full_text, ["statique", "permanente", "toujours visible", "repos", "meme au repos"]):
         context["wrinkle_type"] = "statique"
 
     concern_keywords = {
@@ -102,36 +207,53 @@ def _extract_context_keywords(messages: list) -> dict:
         "acide hyaluronique": ["acide hyaluronique", "filler", "injection", "volume"],
         "peeling": ["peeling", "peel"],
         "laser": ["laser", "lumiere pulsee", "ipl"],
-        "rides": ["ride", "rides", "ridule", "vieillissement"],
+        "rides": ["ride", "rides", "ridule", "ridules", "vieillissement"],
         "prevention": ["prevenir", "prevention", "preventif", "commencer tot"],
         "skinbooster": ["skinbooster", "skin booster", "hydratation profonde"],
         "microneedling": ["microneedling", "micro-needling", "dermaroller"],
     }
-    for concern, keywords in concern_keywords.items():
-        if any(kw in full_text for kw in keywords):
-            context["concern"] = concern
-            break
+    concerns = _match_keywords(full_text, concern_keywords)
+    # "rides" is implied by most specific concerns — only ambiguous next to another specific one
+    specific = [c for c in concerns if c != "rides"]
+    if concerns:
+        context["concern"] = next(iter(concerns))
+        confidence["concern"] = concerns[context["concern"]] if len(specific) <= 1 else 0.5
 
     if "concern" not in context:
         user_messages = [m.content for m in messages if m.role == "user"]
         if user_messages:
             context["concern"] = user_messages[-1][:100]
+            confidence["concern"] = 0.2
 
-    if any(w in full_text for w in ["enceinte", "grossesse", "allaite", "allaitement", "pregnant"]):
+    if _keyword_confidence(full_text, ["enceinte", "grossesse", "allaite", "allaitement", "pregnant"]):
         context["pregnancy"] = True
+        confidence = {field: min(value, 0.5) for field, value in confidence.items()}
 
     age_match = re.search(r'\b(\d{2})\s*ans\b', full_text)
     if age_match:
         context["age"] = int(age_match.group(1))
 
-    budget_match = re.search(r'(\d+)\s*(?:€|euro|eur)', full_text)
+    # On the raw text: folding drops the euro sign
+    budget_match = re.search(r'(\d+)\s*(?:€|euro|eur)', " ".join(m.content.lower() for m in messages if m.role == "user"))
     if budget_match:
         context["budget"] = int(budget_match.group(1))
 
-    if any(w in full_text for w in ["deja fait", "deja eu", "deja essaye", "precedent traitement"]):
+    if _keyword_confidence(full_text, ["deja fait", "deja eu", "deja essaye", "precedent traitement"]):
         context["previous_treatment"] = True
 
-    return context
+    skin_keywords = {
+        "grasse": ["peau grasse"],
+        "seche": ["peau seche", "peau sèche"],
+        "mixte": ["peau mixte"],
+        "sensible": ["peau sensible", "peau reactive", "peau réactive"],
+        "normale": ["peau normale"],
+    }
+    for skin_type, keywords in skin_keywords.items():
+        if _keyword_confidence(full_text, keywords):
+            context["skin_type"] = skin_type
+            break
+
+    return context, confidence
 
 
 # ---------------------------------------------------------------------------
@@ -147,126 +269,148 @@ def _make_slug(text: str) -> str:
     return re.sub(r"[-\s]+", "-", text).strip("-")
 
 
-async def _resolve_to_canonical(
-    llm_name: str,
+async def _resolve_many_to_canonical(
+    llm_names: list[str],
     slug_map: dict,
     similarity_threshold: float = 0.82,
-) -> tuple[str, str, float]:
-    """Resolve an LLM-generated procedure name to a canonical catalogue entry.
+) -> list[tuple[str, str, float]]:
+    """Resolve LLM-generated procedure names to canonical catalogue entries.
 
-    Returns (canonical_slug, canonical_name, similarity_score).
+    Returns one (canonical_slug, canonical_name, similarity_score) per name.
     If no match above threshold: (make_slug(llm_name), llm_name, 0.0).
+    Names without an exact slug match are embedded and scored together
+    against the resident procedure matrix (core/rag/procedure_index.py).
     """
-    # Fast path: exact slug match (zero API calls)
-    candidate_slug = _make_slug(llm_name)
-    if candidate_slug in slug_map:
-        return candidate_slug, slug_map[candidate_slug]["name"], 1.0
-
-    # Semantic matching via Procedure embeddings
-    from core.rag.embeddings import get_embedding
-    import numpy as np
+    resolved = []
+    pending = []  # indexes of names needing semantic matching
+    for i, llm_name in enumerate(llm_names):
+        candidate_slug = _make_slug(llm_name)
+        # Fast path: exact slug match (zero API calls)
+        if candidate_slug in slug_map:
+            resolved.append((candidate_slug, slug_map[candidate_slug]["name"], 1.0))
+        else:
+            resolved.append((candidate_slug, llm_name, 0.0))
+            pending.append(i)
+
+    if not pending:
+        return resolved
 
     try:
-        query_emb = np.array(await get_embedding(llm_name))
-        if np.allclose(query_emb, 0):
-            return candidate_slug, llm_name, 0.0
-
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(Procedure).filter(Procedure.embedding != None)  # noqa: E711
-            )
-            procedures = result.scalars().all()
-
-        best_sim, best_slug, best_name = 0.0, candidate_slug, llm_name
-        for proc in procedures:
-            if proc.embedding is None:
-                continue
-            proc_emb = np.array(proc.embedding)
-            if np.allclose(proc_emb, 0):
-                continue
-            cos_sim = float(np.dot(query_emb, proc_emb) / (
-                np.linalg.norm(query_emb) * np.linalg.norm(proc_emb) + 1e-9
-            ))
-            if cos_sim > best_sim:
-                best_sim = cos_sim
-                best_slug = _make_slug(proc.name)
-                best_name = proc.name
-
-        if best_sim >= similarity_threshold:
-            logger.info(
-                f"[Resolve] '{llm_name}' → '{best_name}' (sim={best_sim:.3f})"
-            )
-            return best_slug, best_name, best_sim
-
+        matches = await procedure_index.resolve_many([llm_names[i] for i in pending])
     except Exception as e:
-        logger.warning(f"[Resolve] Semantic matching failed for '{llm_name}': {e}")
+        logger.warning(f"[Resolve] Semantic matching failed for {len(pending)} names: {e}")
+        return resolved
+
+    for i, match in zip(pending, matches):
+        if match and match[1] >= similarity_threshold:
+            best_name, best_sim = match
+            logger.info(f"[Resolve] '{llm_names[i]}' → '{best_name}' (sim={best_sim:.3f})")
+            resolved[i] = (_make_slug(best_name), best_name, best_sim)
+
+    return resolved
+
+
+# Backstop for multi-worker deployments, where version bumps from other
+# processes are not visible (see core/cache_versions.py)
+CATALOGUE_CACHE_TTL = float(os.getenv("CATALOGUE_CACHE_TTL", "300"))
+
+_catalogue_cache = {
+    "key": None,          # version snapshot the cached value was built from
+    "built_at": 0.0,
+    "value": None,        # (prompt_text, slug_map)
+    "hits": 0,
+    "misses": 0,
+    "builds": 0,
+    "last_build_ms": None,
+}
+_catalogue_lock = asyncio.Lock()
 
-    return candidate_slug, llm_name, 0.0
 
+def _trs_lookup(name_col):
+    """Correlated subquery: TRS of the first trend topic whose title contains the name."""
+    return (
+        select(TrendTopic.trs_current)
+        .where(TrendTopic.titre.ilike(func.concat("%", name_col, "%")))
+        .limit(1)
+        .scalar_subquery()
+    )
 
-async def _load_procedure_catalogue() -> tuple[str, dict]:
-    """Load procedures from DB + published fiches. Returns (prompt_text, slug_map)."""
+
+async def _build_procedure_catalogue() -> tuple[str, dict]:
+    """Build (prompt_text, slug_map) from procedures + published fiches in one query."""
     catalogue_lines = []
     slug_map = {}  # slug -> {name, has_fiche, trs, downtime, price_range, tags}
 
+    fiches = (
+        select(
+            func.replace(SocialGeneration.topic, "[SOCIAL] ", "").label("name"),
+            SocialGeneration.content["recuperation_sociale"]["downtime_visage_nu"].astext.label("downtime"),
+            SocialGeneration.content["meta"]["categories"].label("categories"),
+            SocialGeneration.created_at,
+        )
+        .filter(SocialGeneration.kind == "social")
+        .filter(SocialGeneration.status == "published")
+        .filter(~SocialGeneration.content.has_key("error"))
+        .order_by(SocialGeneration.created_at.desc())
+        .limit(200)
+        .subquery("fiches")
+    )
+    stmt = union_all(
+        select(
+            literal("procedure").label("kind"),
+            Procedure.name,
+            Procedure.downtime,
+            Procedure.price_range,
+            Procedure.tags,
+            cast(null(), JSONB).label("categories"),
+            Procedure.category,
+            _trs_lookup(Procedure.name).label("trs"),
+        ),
+        select(
+            literal("fiche").label("kind"),
+            fiches.c.name,
+            fiches.c.downtime,
+            cast(null(), String).label("price_range"),
+            cast(null(), ARRAY(String)).label("tags"),
+            fiches.c.categories,
+            cast(null(), String).label("category"),
+            _trs_lookup(fiches.c.name).label("trs"),
+        ),
+    )
+
     async with AsyncSessionLocal() as session:
-        # Load procedures from atlas
-        proc_result = await session.execute(select(Procedure))
-        procedures = proc_result.scalars().all()
-
-        for p in procedures:
-            slug = _make_slug(p.name)
-            entry = {
-                "name": p.name,
+        rows = (await session.execute(stmt)).all()
+
+    # Procedures first so fiches only flag/extend them (same precedence as before)
+    for row in sorted(rows, key=lambda r: r.kind != "procedure"):
+        slug = _make_slug(row.name or "")
+        trs = round(row.trs) if row.trs else None
+        if row.kind == "procedure":
+            slug_map[slug] = {
+                "name": row.name,
                 "slug": slug,
                 "has_fiche": False,
-                "trs": None,
-                "downtime": p.downtime or "non renseigné",
-                "price_range": p.price_range or "non renseigné",
-                "tags": p.tags or [],
-                "category": getattr(p, "category", ""),
+                "trs": trs,
+                "downtime": row.downtime or "non renseigné",
+                "price_range": row.price_range or "non renseigné",
+                "tags": row.tags or [],
+                "category": row.category or "",
+            }
+        elif slug in slug_map:
+            # Fiche matches an existing procedure
+            slug_map[slug]["has_fiche"] = True
+        else:
+            # Fiche without a matching procedure — still add to catalogue
+            slug_map[slug] = {
+                "name": row.name,
+                "slug": slug,
+                "has_fiche": True,
+                "trs": trs,
+                "downtime": row.downtime or "",
+                "price_range": "",
+                "tags": row.categories if isinstance(row.categories, list) else [],
+                "category": "",
             }
-            slug_map[slug] = entry
-
-        # Load published fiches to enrich with TRS
-        fiche_result = await session.execute(
-            select(SocialGeneration)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
-            .filter(SocialGeneration.status == "published")
-            .order_by(SocialGeneration.created_at.desc())
-            .limit(200)
-        )
-        for g in fiche_result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            fiche_slug = _make_slug(topic_raw)
-            content = g.content if isinstance(g.content, dict) else {}
-            if "error" in content:
-                continue
-
-            # Check if this fiche matches an existing procedure
-            if fiche_slug in slug_map:
-                slug_map[fiche_slug]["has_fiche"] = True
-            else:
-                # Fiche without a matching procedure — still add to catalogue
-                slug_map[fiche_slug] = {
-                    "name": topic_raw,
-                    "slug": fiche_slug,
-                    "has_fiche": True,
-                    "trs": None,
-                    "downtime": content.get("recuperation_sociale", {}).get("downtime_visage_nu", ""),
-                    "price_range": "",
-                    "tags": content.get("meta", {}).get("categories", []),
-                    "category": "",
-                }
-
-        # Enrich with TRS from trend topics
-        for slug, entry in slug_map.items():
-            topic_result = await session.execute(
-                select(TrendTopic).filter(TrendTopic.titre.ilike(f"%{entry['name']}%")).limit(1)
-            )
-            topic = topic_result.scalar_one_or_none()
-            if topic and topic.trs_current:
-                entry["trs"] = round(topic.trs_current)
 
     # Format for prompt
     for slug, entry in slug_map.items():
@@ -281,6 +425,44 @@ async def _load_procedure_catalogue() -> tuple[str, dict]:
     return prompt_text, slug_map
 
 
+async def _load_procedure_catalogue() -> tuple[str, dict]:
+    """Cached catalogue. Returns (prompt_text, slug_map); treat slug_map as read-only.
+
+    Rebuilt when procedures, fiches or trend topics change (version counters)
+    or after CATALOGUE_CACHE_TTL seconds.
+    """
+    key = cache_versions.snapshot(cache_versions.PROCEDURES, cache_versions.FICHES, cache_versions.TREND_TOPICS)
+
+    def _fresh():
+        return (
+            _catalogue_cache["value"] is not None
+            and _catalogue_cache["key"] == key
+            and time.monotonic() - _catalogue_cache["built_at"] < CATALOGUE_CACHE_TTL
+        )
+
+    if _fresh():
+        _catalogue_cache["hits"] += 1
+        return _catalogue_cache["value"]
+
+    async with _catalogue_lock:
+        # Another request may have rebuilt it while we waited
+        if _fresh():
+            _catalogue_cache["hits"] += 1
+            return _catalogue_cache["value"]
+
+        _catalogue_cache["misses"] += 1
+        start = time.perf_counter()
+        value = await _build_procedure_catalogue()
+        _catalogue_cache.update(
+            key=key,
+            built_at=time.monotonic(),
+            value=value,
+            builds=_catalogue_cache["builds"] + 1,
+            last_build_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+        return value
+
+
 # ---------------------------------------------------------------------------
 # P0: Formulaic confidence score
 # ---------------------------------------------------------------------------
@@ -494,6 +676,149 @@ MAX 2 phrases au total. Pas de blabla.
     return base_prompt
 
 
+# ---------------------------------------------------------------------------
+# Pre-LLM pipeline stages
+# ---------------------------------------------------------------------------
+
+# Start retrieval from keyword-extracted context while the LLM extraction runs;
+# the result is used when both extractions lead to the same query.
+SPECULATIVE_RETRIEVAL = os.getenv("CHAT_SPECULATIVE_RETRIEVAL", "1") not in ("0", "false", "False")
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _timed(timings: dict, name: str, coro):
+    """Await coro, recording its wall time in timings[name] (ms)."""
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = _elapsed_ms(start)
+
+
+def _rules_context(context: dict) -> Optional[dict]:
+    """Rules engine input for a context, or None when rules do not apply."""
+    if not (context.get("area") or context.get("concern")):
+        return None
+
+    rules_context = {}
+    if context.get("area"):
+        rules_context["area"] = context["area"]
+    if context.get("wrinkle_type"):
+        rules_context["wrinkle_type"] = context["wrinkle_type"]
+    if context.get("pregnancy"):
+        rules_context["pregnancy"] = True
+    if context.get("age"):
+        rules_context["age"] = context["age"]
+    # P1: inject profile-based rules
+    if context.get("skin_type"):
+        rules_context["skin_type"] = context["skin_type"]
+    return rules_context
+
+
+def _evaluate_rules(rules_context: Optional[dict]) -> tuple[str, int]:
+    """Run the rules engine. Returns (prompt_text, rules_count)."""
+    if rules_context is None:
+        return "", 0
+
+    from core.rules.engine import RulesEngine
+    engine = RulesEngine()
+    rule_outputs = engine.evaluate(rules_context)
+    rules_text = ""
+    if rule_outputs:
+        rules_text = "\n=== REGLES CLINIQUES ===\n"
+        for r in rule_outputs:
+            rules_text += f"- [{r.type.upper()}] {r.detail}\n"
+    return rules_text, len(rule_outputs)
+
+
+def _evidence_query(context: dict) -> Optional[str]:
+    """RAG query for a context, or None when there is nothing to search for."""
+    if not (context.get("concern") or context.get("area")):
+        return None
+    return f"{context.get('concern', '')} {context.get('area', '')} aesthetic procedure"
+
+
+async def _retrieve_evidence_text(query: str) -> tuple[str, int]:
+    """RAG retrieval formatted for the prompt. Returns (evidence_text, evidence_count)."""
+    from core.rag.retriever import retrieve_evidence
+    chunks = await retrieve_evidence(query, limit=3)
+    evidence_text = ""
+    if chunks:
+        evidence_text = "\n=== PREUVES SCIENTIFIQUES ===\n"
+        for c in chunks:
+            evidence_text += f"Source: {c['source']}\n{c['text'][:300]}\n---\n"
+    return evidence_text, len(chunks)
+
+
+# ---------------------------------------------------------------------------
+# Per-conversation state: each turn only processes the new user messages
+# ---------------------------------------------------------------------------
+
+# Keyed by ("id", owner, conversation_id) or ("prefix", owner, hash of user messages)
+_conversation_states = LRUCache(
+    int(os.getenv("CHAT_STATE_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("CHAT_STATE_CACHE_TTL", "1800")),
+)
+_conversation_counters = {"hits": 0, "misses": 0}
+
+
+def _conversation_state_keys(conversation_id: Optional[str], user: Optional[AuthUser], user_texts: list[str]):
+    """Returns (storage_key, lookup_keys). Keys are scoped to the authenticated
+    user. Anonymous requests all have owner None, so identical anonymous
+    histories without a conversation_id share one prefix key; that is safe
+    because the state only holds what those same messages produce (extracted
+    context, rules, evidence), never a profile."""
+    owner = user.sub if user else None
+    if conversation_id:
+        key = ("id", owner, conversation_id)
+        return key, [key]
+    key = ("prefix", owner, _conversation_key(user_texts))
+    # Same history (regenerate) first, then the previous turn
+    return key, [key, ("prefix", owner, _conversation_key(user_texts[:-1]))]
+
+
+def _lookup_conversation_state(lookup_keys: list, user_texts: list[str]) -> Optional[dict]:
+    """Cached state whose processed user messages are a prefix of user_texts."""
+    for key in lookup_keys:
+        state = _conversation_states.peek(key)
+        if (
+            state
+            and state["user_count"] <= len(user_texts)
+            and state["prefix_hash"] == _conversation_key(user_texts[:state["user_count"]])
+        ):
+            _conversation_counters["hits"] += 1
+            return state
+    _conversation_counters["misses"] += 1
+    return None
+
+
+def _merge_context(base: dict, delta: dict, delta_source: str) -> dict:
+    """Fold context extracted from new messages into the conversation context."""
+    merged = dict(base)
+    for key, value in delta.items():
+        if value is None or value == "":
+            continue
+        # The keyword fallback's concern is the raw last message — keep a real one
+        if key == "concern" and delta_source == "keyword_fallback" and merged.get("concern"):
+            continue
+        merged[key] = value
+    return merged
+
+
+async def _extract_with_state(user_messages: list, state: Optional[dict]) -> tuple[dict, str]:
+    """Context for the conversation, extracting only messages the state has not seen."""
+    if state is None:
+        return await _extract_context(user_messages)
+    delta = user_messages[state["user_count"]:]
+    if not delta:
+        return dict(state["context"]), "state"
+    delta_context, source = await _extract_context(delta)
+    return _merge_context(state["context"], delta_context, source), f"delta_{source}"
+
+
 # ---------------------------------------------------------------------------
 # Auto-learning: create TrendTopic + trigger learning for unknown procedures
 # ---------------------------------------------------------------------------
@@ -547,16 +872,15 @@ async def _trigger_auto_learning(slugs: list[str], slug_map: dict) -> list[dict]
     learning in the background. Returns list of {slug, name, status} for
     the frontend to display a 'learning in progress' state."""
     triggered = []
+    slugs = [slug for slug in slugs if slug in slug_map]
+
+    # Resolve all names to canonical in one batch (one embedding call, one matmul)
+    resolutions = await _resolve_many_to_canonical([slug_map[slug]["name"] for slug in slugs], slug_map)
 
     async with AsyncSessionLocal() as session:
-        for slug in slugs:
-            entry = slug_map.get(slug)
-            if not entry:
-                continue
-            name = entry["name"]
-
-            # Resolve name to canonical via semantic matching
-            canonical_slug, canonical_name, sim = await _resolve_to_canonical(name, slug_map)
+        for slug, (canonical_slug, canonical_name, sim) in zip(slugs, resolutions):
+            name = slug_map[slug]["name"]
+
             search_name = canonical_name if sim >= 0.82 else name
 
             # Check if a TrendTopic already exists (exact match first, then ilike fallback)
@@ -637,6 +961,7 @@ async def _trigger_auto_learning(slugs: list[str], slug_map: dict) -> list[dict]
                     "topic_id": str(new_topic.id),
                 })
                 await session.commit()
+                cache_versions.bump(cache_versions.TREND_TOPICS)
 
                 # Fire and forget learning in background
                 asyncio.create_task(_run_learning_bg(str(new_topic.id), name))
@@ -646,6 +971,7 @@ async def _trigger_auto_learning(slugs: list[str], slug_map: dict) -> list[dict]
 
 async def _run_learning_bg(topic_id: str, name: str):
     """Background task to run full learning for a topic."""
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
     try:
         logger.info(f"Auto-learning started for '{name}' (topic_id={topic_id})")
         result = await run_full_learning(topic_id)
@@ -671,17 +997,46 @@ async def chat_diagnostic(
     messages = request.messages
 
     async def event_stream():
+        # Live chat goes ahead of background generation in the LLM scheduler
+        llm_scheduler.use_priority(llm_scheduler.INTERACTIVE)
+        started = time.perf_counter()
+        timings = {}
+        speculative = None
         try:
-            # P2: LLM-based context extraction
-            context = await _extract_context_llm(messages)
+            user_messages = [m for m in messages if m.role == "user"]
+            user_texts = [m.content for m in user_messages]
+            state_key, lookup_keys = _conversation_state_keys(request.conversation_id, user, user_texts)
+            state = _lookup_conversation_state(lookup_keys, user_texts)
+
+            # Stage 1 — independent of each other: LLM extraction, profile,
+            # catalogue, plus a speculative retrieval from keyword pre-extraction
+            # (first turn only: later turns reuse the conversation state)
+            speculative_query = None
+            if SPECULATIVE_RETRIEVAL and state is None:
+                speculative_query = _evidence_query(_extract_context_keywords(messages))
+            speculative = (
+                asyncio.ensure_future(_timed(timings, "retrieval_speculative", _retrieve_evidence_text(speculative_query)))
+                if speculative_query else None
+            )
+            if speculative:
+                # A discarded speculative run must not log "exception never retrieved"
+                speculative.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+            (context, extraction_source), profile, (catalogue_text, slug_map) = await asyncio.gather(
+                _timed(timings, "extraction", _extract_with_state(user_messages, state)),
+                # Always reloaded: the user may edit their profile mid-conversation
+                _timed(timings, "profile", _load_user_profile(user)),
+                _timed(timings, "catalogue", _load_procedure_catalogue()),
+            )
+            timings["extraction_source"] = extraction_source
+            extracted = dict(context)
 
             # Merge explicit context from frontend (overrides extraction)
             if request.context:
                 for key, value in request.context.items():
                     context[key] = value
 
-            # P1: Load user profile if authenticated
-            profile = await _load_user_profile(user)
+            # P1: User profile context
             profile_text = _format_profile_context(profile) if profile else ""
 
             # Enrich context from profile (fill gaps)
@@ -691,47 +1046,37 @@ async def chat_diagnostic(
                 if not context.get("age") and profile.get("age_range"):
                     context["age_range"] = profile["age_range"]
 
-            # Rules engine
-            rules_text = ""
-            rules_count = 0
-            if context.get("area") or context.get("concern"):
-                from core.rules.engine import RulesEngine
-                engine = RulesEngine()
-                rules_context = {}
-                if context.get("area"):
-                    rules_context["area"] = context["area"]
-                if context.get("wrinkle_type"):
-                    rules_context["wrinkle_type"] = context["wrinkle_type"]
-                if context.get("pregnancy"):
-                    rules_context["pregnancy"] = True
-                if context.get("age"):
-                    rules_context["age"] = context["age"]
-                # P1: inject profile-based rules
-                if context.get("skin_type"):
-                    rules_context["skin_type"] = context["skin_type"]
-
-                rule_outputs = engine.evaluate(rules_context)
-                rules_count = len(rule_outputs)
-                if rule_outputs:
-                    rules_text = "\n=== REGLES CLINIQUES ===\n"
-                    for r in rule_outputs:
-                        rules_text += f"- [{r.type.upper()}] {r.detail}\n"
-
-            # RAG retrieval
-            evidence_text = ""
-            evidence_count = 0
-            if context.get("concern") or context.get("area"):
-                from core.rag.retriever import retrieve_evidence
-                query = f"{context.get('concern', '')} {context.get('area', '')} aesthetic procedure"
-                chunks = await retrieve_evidence(query, limit=3)
-                evidence_count = len(chunks)
-                if chunks:
-                    evidence_text = "\n=== PREUVES SCIENTIFIQUES ===\n"
-                    for c in chunks:
-                        evidence_text += f"Source: {c['source']}\n{c['text'][:300]}\n---\n"
-
-            # P0: Dynamic procedure catalogue
-            catalogue_text, slug_map = await _load_procedure_catalogue()
+            # Stage 2 — needs the final context: rules + RAG retrieval,
+            # reused from the conversation state when their inputs are unchanged
+            rules_context = _rules_context(context)
+            rules_key = tuple(sorted(rules_context.items())) if rules_context is not None else None
+            if state is not None and state["rules"][0] == rules_key:
+                _, rules_text, rules_count = state["rules"]
+            else:
+                rules_text, rules_count = _evaluate_rules(rules_context)
+
+            query = _evidence_query(context)
+            if state is not None and state["evidence"][0] == query:
+                _, evidence_text, evidence_count = state["evidence"]
+                timings["retrieval_reused"] = True
+            elif speculative and query == speculative_query:
+                evidence_text, evidence_count = await speculative
+                timings["retrieval_reused"] = True
+            else:
+                if speculative:
+                    speculative.cancel()
+                evidence_text, evidence_count = (
+                    await _timed(timings, "retrieval", _retrieve_evidence_text(query)) if query else ("", 0)
+                )
+
+            # Everything the next turn needs to process only its new messages
+            _conversation_states.set(state_key, {
+                "user_count": len(user_texts),
+                "prefix_hash": _conversation_key(user_texts),
+                "context": extracted,
+                "rules": (rules_key, rules_text, rules_count),
+                "evidence": (query, evidence_text, evidence_count),
+            })
 
             # P0: Formulaic confidence score (now returns dict with split scores)
             user_msg_count = sum(1 for m in messages if m.role == "user")
@@ -758,12 +1103,16 @@ async def chat_diagnostic(
 {rules_text}{evidence_text}
 Reponds maintenant. Si tu generes la synthese, inclus OBLIGATOIREMENT le bloc $$DIAGNOSTIC_JSON$$."""
 
+            timings["pre_llm"] = _elapsed_ms(started)
+
             # Stream response
             async for token in orchestrator.llm_client.stream_response(
                 system_prompt=system_prompt,
                 user_content=enriched_prompt,
                 model_override="gpt-4o-mini"
             ):
+                if "first_token" not in timings:
+                    timings["first_token"] = _elapsed_ms(started)
                 yield f"data: {json.dumps({'token': token})}\n\n"
 
             # P1: Send enrichment metadata after stream (slug_map for TRS badges)
@@ -800,9 +1149,14 @@ Reponds maintenant. Si tu generes la synthese, inclus OBLIGATOIREMENT le bloc $$
                 if triggered:
                     yield f"data: {json.dumps({'learning_triggered': triggered})}\n\n"
 
+            timings["total"] = _elapsed_ms(started)
+            yield f"data: {json.dumps({'timings': timings})}\n\n"
+
             yield f"data: {json.dumps({'done': True})}\n\n"
 
         except Exception as e:
+            if speculative:
+                speculative.cancel()
             logger.error(f"Chat diagnostic error: {e}")
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
 
@@ -815,3 +1169,31 @@ Reponds maintenant. Si tu generes la synthese, inclus OBLIGATOIREMENT le bloc $$
             "X-Accel-Buffering": "no",
         }
     )
+
+
+@router.get("/chat/catalogue/stats")
+async def catalogue_stats(admin: AuthUser = Depends(require_admin)):
+    """Procedure catalogue cache counters and current dataset versions."""
+    age = time.monotonic() - _catalogue_cache["built_at"] if _catalogue_cache["value"] is not None else None
+    return {
+        "hits": _catalogue_cache["hits"],
+        "misses": _catalogue_cache["misses"],
+        "builds": _catalogue_cache["builds"],
+        "last_build_ms": _catalogue_cache["last_build_ms"],
+        "age_seconds": round(age, 1) if age is not None else None,
+        "ttl_seconds": CATALOGUE_CACHE_TTL,
+        "entries": len(_catalogue_cache["value"][1]) if _catalogue_cache["value"] else 0,
+        "versions": cache_versions.all_versions(),
+        "procedure_index": procedure_index.index_stats(),
+    }
+
+
+@router.get("/chat/extraction/stats")
+async def extraction_stats(admin: AuthUser = Depends(require_admin)):
+    """How chat turns got their clinical context: keyword fast path, cached or fresh LLM call."""
+    return {
+        "sources": dict(_extraction_counters),
+        "keyword_threshold": KEYWORD_CONFIDENCE_THRESHOLD,
+        "llm_cache": _extraction_cache.stats(),
+        "conversation_state": {**_conversation_states.stats(), **_conversation_counters},
+    }
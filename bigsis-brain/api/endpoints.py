@@ -1,5 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from api.schemas import AnalyzeRequest, AnalyzeResponse
+from core import llm_cache
+from core.auth import AuthUser, require_admin
+from core.llm_scheduler import scheduler
+from core.social import artifacts
 from core.orchestrator import Orchestrator
 
 router = APIRouter()
@@ -11,6 +15,16 @@ async def health_check():
     return {"status": "ok"}
 
 
+@router.get("/llm/metrics")
+async def llm_metrics(admin: AuthUser = Depends(require_admin)):
+    """LLM scheduler queues/rate, response cache hit rates and fiche stage reuse. Admin only."""
+    return {
+        "scheduler": scheduler.metrics(),
+        "response_cache": await llm_cache.cache_stats(),
+        "fiche_artifacts": artifacts.artifact_stats(),
+    }
+
+
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_wrinkles(request: AnalyzeRequest):
     try:
@@ -1,17 +1,17 @@
 import logging
-import re
-import unicodedata
 from typing import Dict, Optional
-from urllib.parse import unquote
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update
 
+from core import cache_versions
+from core import llm_scheduler
 from core.auth import AuthUser, require_admin, get_optional_user
 from core.social.generator import SocialContentGenerator
 from core.db.database import AsyncSessionLocal
 from core.db.models import SocialGeneration, FicheFeedback, TrendTopic
+from core.utils.slug import make_slug
 from api.schemas import SocialGenerationResponse, FicheFeedbackRequest
 from sqlalchemy import func as sa_func
 
@@ -23,20 +23,6 @@ class GenerateFicheRequest(BaseModel):
     titre: str
 
 
-def _make_slug(text: str) -> str:
-    """Generate a clean URL-safe slug from any text."""
-    decoded = text
-    for _ in range(3):
-        prev = decoded
-        decoded = unquote(decoded)
-        if decoded == prev:
-            break
-    normalized = unicodedata.normalize("NFKD", decoded)
-    ascii_text = normalized.encode("ascii", "ignore").decode("ascii").lower()
-    slug = re.sub(r'[^a-z0-9]+', '-', ascii_text).strip('-')
-    return re.sub(r'-+', '-', slug)
-
-
 @router.get("/fiches")
 async def list_fiches(
     include_drafts: bool = False,
@@ -46,13 +32,22 @@ async def list_fiches(
     show_drafts = include_drafts and user and user.role == "admin"
 
     async with AsyncSessionLocal() as session:
+        # Newest valid generation per slug
+        ranked = select(
+            SocialGeneration.id,
+            sa_func.row_number().over(
+                partition_by=SocialGeneration.slug, order_by=SocialGeneration.created_at.desc()
+            ).label("rank"),
+        ).where(SocialGeneration.kind == "social", ~SocialGeneration.content.has_key("error"))
+        if not show_drafts:
+            ranked = ranked.where(SocialGeneration.status == "published")
+        ranked = ranked.subquery()
         query = (
             select(SocialGeneration)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
+            .join(ranked, ranked.c.id == SocialGeneration.id)
+            .where(ranked.c.rank == 1)
+            .order_by(SocialGeneration.created_at.desc())
         )
-        if not show_drafts:
-            query = query.filter(SocialGeneration.status == "published")
-        query = query.order_by(SocialGeneration.created_at.desc()).limit(200)
 
         result = await session.execute(query)
 
@@ -61,16 +56,13 @@ async def list_fiches(
 
         for g in result.scalars().all():
             content = g.content if isinstance(g.content, dict) else {}
-            if "error" in content:
+            slug = g.slug
+            if not slug:
                 continue
 
             topic_raw = g.topic.replace("[SOCIAL] ", "")
-            slug = _make_slug(topic_raw)
-            if not slug or slug in seen_slugs:
-                continue
-
             title = content.get("nom_commercial_courant") or content.get("titre_officiel") or topic_raw
-            title_key = _make_slug(title)
+            title_key = make_slug(title)
             if title_key in seen_titles:
                 continue
 
@@ -104,20 +96,16 @@ async def list_ready_topics(admin: AuthUser = Depends(require_admin)):
         )
         ready_topics = topics_result.scalars().all()
 
-        # Get all existing [SOCIAL] fiches topics
+        # Get all existing [SOCIAL] fiche slugs
         fiches_result = await session.execute(
-            select(SocialGeneration.topic)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
+            select(SocialGeneration.slug).where(SocialGeneration.kind == "social").distinct()
         )
-        existing_fiche_slugs = set()
-        for (topic_str,) in fiches_result.all():
-            raw = topic_str.replace("[SOCIAL] ", "")
-            existing_fiche_slugs.add(_make_slug(raw))
+        existing_fiche_slugs = set(fiches_result.scalars().all())
 
         # Return topics that have no fiche yet
         pending = []
         for t in ready_topics:
-            slug = _make_slug(t.titre)
+            slug = make_slug(t.titre)
             if slug not in existing_fiche_slugs:
                 pending.append({
                     "id": str(t.id),
@@ -132,6 +120,7 @@ async def list_ready_topics(admin: AuthUser = Depends(require_admin)):
 
 async def _run_generate_fiche_bg(titre: str):
     """Background task: generate a fiche for the given topic title."""
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
     logger = logging.getLogger("uvicorn.error")
     try:
         cache_topic = f"[SOCIAL] {titre}"
@@ -156,22 +145,20 @@ async def generate_fiche(
     if not titre:
         raise HTTPException(status_code=400, detail="Le titre est requis")
 
-    slug = _make_slug(titre)
+    slug = make_slug(titre)
 
     # Check if fiche already exists
     async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(SocialGeneration)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
-            .limit(200)
+        existing = await session.execute(
+            select(SocialGeneration.id)
+            .where(SocialGeneration.kind == "social", SocialGeneration.slug == slug)
+            .limit(1)
         )
-        for g in result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            if _make_slug(topic_raw) == slug:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Une fiche existe deja pour '{titre}' (slug: {slug})",
-                )
+        if existing.first() is not None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Une fiche existe deja pour '{titre}' (slug: {slug})",
+            )
 
     background_tasks.add_task(_run_generate_fiche_bg, titre)
     return {
@@ -186,27 +173,23 @@ async def get_fiche(
     slug: str,
     user: Optional[AuthUser] = Depends(get_optional_user),
 ):
-    """Get a Fiche by slug. Matches against all cached generations."""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(SocialGeneration)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
-            .order_by(SocialGeneration.created_at.desc())
-            .limit(200)
-        )
-        for g in result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            if _make_slug(topic_raw) == slug:
-                content = g.content if isinstance(g.content, dict) else {}
-                if "error" in content:
-                    continue
-                # Draft fiches are only visible to admins
-                if getattr(g, "status", "published") == "draft":
-                    if not (user and user.role == "admin"):
-                        continue
-                return {"data": content}
+    """Get a Fiche by slug (newest valid version)."""
+    query = (
+        select(SocialGeneration)
+        .where(SocialGeneration.kind == "social", SocialGeneration.slug == slug)
+        .where(~SocialGeneration.content.has_key("error"))
+    )
+    # Draft fiches are only visible to admins
+    if not (user and user.role == "admin"):
+        query = query.where(SocialGeneration.status != "draft")
+    query = query.order_by(SocialGeneration.created_at.desc()).limit(1)
 
-        raise HTTPException(status_code=404, detail="Fiche not found")
+    async with AsyncSessionLocal() as session:
+        g = (await session.execute(query)).scalar_one_or_none()
+        if g is None:
+            raise HTTPException(status_code=404, detail="Fiche not found")
+        content = g.content if isinstance(g.content, dict) else {}
+        return {"data": content}
 
 
 @router.delete("/fiches")
@@ -214,9 +197,10 @@ async def delete_all_fiches(admin: AuthUser = Depends(require_admin)):
     """Delete ALL cached fiche generations. Admin only."""
     async with AsyncSessionLocal() as session:
         result = await session.execute(
-            delete(SocialGeneration).where(SocialGeneration.topic.like("[SOCIAL]%"))
+            delete(SocialGeneration).where(SocialGeneration.kind == "social")
         )
         await session.commit()
+        cache_versions.bump(cache_versions.FICHES)
         return {"deleted": result.rowcount}
 
 
@@ -225,56 +209,43 @@ async def delete_fiche(slug: str, admin: AuthUser = Depends(require_admin)):
     """Delete a specific fiche by slug. Admin only."""
     async with AsyncSessionLocal() as session:
         result = await session.execute(
-            select(SocialGeneration).filter(SocialGeneration.topic.like("[SOCIAL]%"))
+            delete(SocialGeneration)
+            .where(SocialGeneration.kind == "social", SocialGeneration.slug == slug)
         )
-        deleted = 0
-        for g in result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            if _make_slug(topic_raw) == slug:
-                await session.delete(g)
-                deleted += 1
+        deleted = result.rowcount or 0
         await session.commit()
+        cache_versions.bump(cache_versions.FICHES)
         if deleted == 0:
             raise HTTPException(status_code=404, detail="Fiche not found")
         return {"deleted": deleted, "slug": slug}
 
 
-@router.patch("/fiches/{slug}/publish")
-async def publish_fiche(slug: str, admin: AuthUser = Depends(require_admin)):
-    """Publish a draft fiche. Admin only."""
+async def _set_fiche_status(slug: str, status: str) -> int:
     async with AsyncSessionLocal() as session:
         result = await session.execute(
-            select(SocialGeneration).filter(SocialGeneration.topic.like("[SOCIAL]%"))
+            update(SocialGeneration)
+            .where(SocialGeneration.kind == "social", SocialGeneration.slug == slug)
+            .values(status=status)
         )
-        updated = 0
-        for g in result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            if _make_slug(topic_raw) == slug:
-                g.status = "published"
-                updated += 1
         await session.commit()
-        if updated == 0:
-            raise HTTPException(status_code=404, detail="Fiche not found")
-        return {"slug": slug, "status": "published"}
+        cache_versions.bump(cache_versions.FICHES)
+        return result.rowcount or 0
+
+
+@router.patch("/fiches/{slug}/publish")
+async def publish_fiche(slug: str, admin: AuthUser = Depends(require_admin)):
+    """Publish a draft fiche. Admin only."""
+    if await _set_fiche_status(slug, "published") == 0:
+        raise HTTPException(status_code=404, detail="Fiche not found")
+    return {"slug": slug, "status": "published"}
 
 
 @router.patch("/fiches/{slug}/unpublish")
 async def unpublish_fiche(slug: str, admin: AuthUser = Depends(require_admin)):
     """Unpublish a fiche (set back to draft). Admin only."""
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(SocialGeneration).filter(SocialGeneration.topic.like("[SOCIAL]%"))
-        )
-        updated = 0
-        for g in result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            if _make_slug(topic_raw) == slug:
-                g.status = "draft"
-                updated += 1
-        await session.commit()
-        if updated == 0:
-            raise HTTPException(status_code=404, detail="Fiche not found")
-        return {"slug": slug, "status": "draft"}
+    if await _set_fiche_status(slug, "draft") == 0:
+        raise HTTPException(status_code=404, detail="Fiche not found")
+    return {"slug": slug, "status": "draft"}
 
 
 @router.get("/fiches/{slug}/versions")
@@ -282,21 +253,24 @@ async def list_fiche_versions(slug: str, admin: AuthUser = Depends(require_admin
     """List all versions of a fiche. Admin only."""
     async with AsyncSessionLocal() as session:
         result = await session.execute(
-            select(SocialGeneration)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
+            select(
+                SocialGeneration.id,
+                SocialGeneration.created_at,
+                SocialGeneration.status,
+                SocialGeneration.content["evidence_metadata"]["trs_score"].label("trs_score"),
+            )
+            .where(SocialGeneration.kind == "social", SocialGeneration.slug == slug)
             .order_by(SocialGeneration.created_at.desc())
         )
-        versions = []
-        for g in result.scalars().all():
-            topic_raw = g.topic.replace("[SOCIAL] ", "")
-            if _make_slug(topic_raw) == slug:
-                content = g.content if isinstance(g.content, dict) else {}
-                versions.append({
-                    "id": str(g.id),
-                    "created_at": str(g.created_at) if g.created_at else "",
-                    "status": getattr(g, "status", "published"),
-                    "trs_score": (content.get("evidence_metadata") or {}).get("trs_score"),
-                })
+        versions = [
+            {
+                "id": str(row.id),
+                "created_at": str(row.created_at) if row.created_at else "",
+                "status": row.status or "published",
+                "trs_score": row.trs_score,
+            }
+            for row in result.all()
+        ]
         if not versions:
             raise HTTPException(status_code=404, detail="Fiche not found")
         # Add version numbers (newest = highest)
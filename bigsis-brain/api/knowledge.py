@@ -11,22 +11,31 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Backgro
 from pydantic import BaseModel
 from sqlalchemy import select, func, delete
 
+from core import cache_versions
+from core import http_client
+from core import jobs
+from core import llm_scheduler
 from core.auth import AuthUser, require_admin
 from core.db.database import AsyncSessionLocal
 from core.db.models import Document, DocumentVersion, Chunk, Procedure, SocialGeneration, Source
 from core.utils.pdf import extract_text_from_pdf
 from core.rag.ingestion import ingest_document
+from core.rag import embedding_cache
+from core.rag.embeddings import api_stats as embedding_api_stats
+from core.rag.vector_index import vector_index_status, rebuild_vector_index
 from core.pubmed import ingest_pubmed_results
 from core.semantic_scholar import ingest_semantic_results
 from core.sources.openfda import get_fda_adverse_events
 from core.sources.clinical import get_ongoing_trials
 from core.sources.pubchem import get_chemical_safety
 from core.sources.crossref import get_crossref_studies, ingest_crossref_results
+from core.sources import cache as scout_cache
+from core.social import artifacts
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# In-memory progress tracker for batch operations
+# In-memory progress tracker for batch ingestion (fiche batches are persistent, see core/jobs.py)
 _batch_jobs: Dict[str, dict] = {}
 
 
@@ -62,7 +71,7 @@ class BatchIngestRequest(BaseModel):
 
 class BatchFicheRequest(BaseModel):
     topics: list[str]
-    delay_seconds: int = 10  # delay between each fiche generation
+    delay_seconds: int = 10  # ignored: pacing is handled by the job engine and the LLM scheduler
 
 
 # =============================================
@@ -79,7 +88,7 @@ async def get_knowledge_stats():
 
         fiches_res = await session.execute(
             select(SocialGeneration)
-            .filter(SocialGeneration.topic.like("[SOCIAL]%"))
+            .filter(SocialGeneration.kind == "social")
             .limit(100)
         )
         fiches = fiches_res.scalars().all()
@@ -122,6 +131,38 @@ async def get_knowledge_stats():
         }
 
 
+@router.get("/knowledge/embeddings/cache-stats")
+async def get_embedding_cache_stats(admin: AuthUser = Depends(require_admin)):
+    """Embedding cache hit rates (memory + Postgres) and upstream API usage. Admin only."""
+    return {
+        "cache": await embedding_cache.cache_stats(),
+        "api": embedding_api_stats(),
+    }
+
+
+@router.post("/knowledge/embeddings/cache-evict")
+async def evict_embedding_cache(max_rows: int = None, admin: AuthUser = Depends(require_admin)):
+    """Trim the Postgres embedding cache to max_rows (LRU). Admin only."""
+    evicted = await embedding_cache.evict(max_rows)
+    return {"evicted": evicted}
+
+
+@router.get("/knowledge/vector-index")
+async def get_vector_index_status(admin: AuthUser = Depends(require_admin)):
+    """ANN index definitions and sizes for chunk/procedure embeddings. Admin only."""
+    return await vector_index_status()
+
+
+@router.post("/knowledge/vector-index/{table}/rebuild")
+async def rebuild_vector_index_endpoint(table: str, admin: AuthUser = Depends(require_admin)):
+    """Drop and rebuild the ANN index of a table (chunks | procedures). Admin only."""
+    try:
+        action = await rebuild_vector_index(table)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"table": table, "action": action}
+
+
 # =============================================
 # DOCUMENTS CRUD
 # =============================================
@@ -272,6 +313,7 @@ async def create_procedure(proc: ProcedureCreate, admin: AuthUser = Depends(requ
         )
         session.add(new_proc)
         await session.commit()
+        cache_versions.bump(cache_versions.PROCEDURES)
         return {"status": "created", "name": new_proc.name}
 
 
@@ -295,6 +337,7 @@ async def update_procedure(proc_id: str, updates: ProcedureUpdate, admin: AuthUs
             for field, value in updates.dict(exclude_unset=True).items():
                 setattr(proc, field, value)
             await session.commit()
+            cache_versions.bump(cache_versions.PROCEDURES)
             await session.refresh(proc)
             return {"status": "updated", "name": proc.name}
         except HTTPException:
@@ -316,6 +359,7 @@ async def delete_procedure(proc_id: str, admin: AuthUser = Depends(require_admin
             name = proc.name
             await session.delete(proc)
             await session.commit()
+            cache_versions.bump(cache_versions.PROCEDURES)
             return {"status": "success", "message": f"Procedure '{name}' deleted"}
         except HTTPException:
             raise
@@ -331,13 +375,34 @@ async def delete_procedure(proc_id: str, admin: AuthUser = Depends(require_admin
 class ScoutRequest(BaseModel):
     query: str
 
+@router.get("/scout/stats")
+async def scout_stats(admin: AuthUser = Depends(require_admin)):
+    """External source traffic (requests, retries, rate-limit waits) and scout cache hit rates. Admin only."""
+    return {"http": http_client.stats(), "cache": scout_cache.cache_stats()}
+
+@router.delete("/scout/cache")
+async def invalidate_scout_cache(source: str = None, query: str = None, admin: AuthUser = Depends(require_admin)):
+    """Drop cached scout results, optionally for one source (fda, pubchem, trials, scholar, crossref) and/or query. Admin only."""
+    if source and source not in scout_cache.SCOUT_CACHE_TTLS:
+        raise HTTPException(status_code=400, detail=f"Unknown scout source '{source}'")
+    deleted = await scout_cache.invalidate(source=source, query=query)
+    return {"status": "ok", "deleted": deleted}
+
+@router.delete("/knowledge/fiche-artifacts")
+async def invalidate_fiche_artifacts(topic: str = None, from_stage: str = None, admin: AuthUser = Depends(require_admin)):
+    """Drop stored fiche pipeline artifacts, optionally for one topic and/or from one stage onward (corpus, scouts, coherence, prompt, llm, post). Admin only."""
+    if from_stage and from_stage not in artifacts.STAGES:
+        raise HTTPException(status_code=400, detail=f"Unknown fiche stage '{from_stage}'")
+    deleted = await artifacts.invalidate(topic=topic, from_stage=from_stage)
+    return {"status": "ok", "deleted": deleted}
+
 @router.post("/scout/fda")
 async def test_fda(request: ScoutRequest, admin: AuthUser = Depends(require_admin)):
     """Test OpenFDA adverse events lookup. Admin only."""
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     try:
-        result = get_fda_adverse_events(request.query)
+        result = await get_fda_adverse_events(request.query)
         return {"source": "OpenFDA", "query": request.query, "result": result}
     except Exception as e:
         return {"source": "OpenFDA", "query": request.query, "error": str(e)}
@@ -348,7 +413,7 @@ async def test_trials(request: ScoutRequest, admin: AuthUser = Depends(require_a
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     try:
-        result = get_ongoing_trials(request.query)
+        result = await get_ongoing_trials(request.query)
         return {"source": "ClinicalTrials.gov", "query": request.query, "result": result}
     except Exception as e:
         return {"source": "ClinicalTrials.gov", "query": request.query, "error": str(e)}
@@ -359,7 +424,7 @@ async def test_pubchem(request: ScoutRequest, admin: AuthUser = Depends(require_
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     try:
-        result = get_chemical_safety(request.query)
+        result = await get_chemical_safety(request.query)
         return {"source": "PubChem", "query": request.query, "result": result}
     except Exception as e:
         return {"source": "PubChem", "query": request.query, "error": str(e)}
@@ -370,7 +435,7 @@ async def test_crossref(request: ScoutRequest, admin: AuthUser = Depends(require
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     try:
-        studies = get_crossref_studies(request.query)
+        studies = await get_crossref_studies(request.query)
         return {"source": "CrossRef", "query": request.query, "count": len(studies), "results": studies}
     except Exception as e:
         return {"source": "CrossRef", "query": request.query, "error": str(e)}
@@ -382,6 +447,7 @@ async def test_crossref(request: ScoutRequest, admin: AuthUser = Depends(require
 
 async def _run_batch_ingest(job_id: str, queries: list, sources: list, delay: int):
     """Background task: ingest queries one by one with delays."""
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
     job = _batch_jobs[job_id]
     job["status"] = "running"
     job["started_at"] = time.time()
@@ -423,48 +489,6 @@ async def _run_batch_ingest(job_id: str, queries: list, sources: list, delay: in
     logger.info(f"[BATCH {job_id}] Completed: {total} documents ingested from {len(queries)} queries")
 
 
-async def _run_batch_fiches(job_id: str, topics: list, delay: int):
-    """Background task: generate fiches one by one with delays."""
-    from core.social.generator import SocialContentGenerator
-    from core.prompts import APP_SYSTEM_PROMPT
-
-    job = _batch_jobs[job_id]
-    job["status"] = "running"
-    job["started_at"] = time.time()
-    gen = SocialContentGenerator()
-
-    for i, topic in enumerate(topics):
-        if job.get("cancelled"):
-            job["status"] = "cancelled"
-            return
-        job["current_index"] = i
-        job["current_query"] = topic
-        job["progress"] = f"{i + 1}/{len(topics)}"
-
-        try:
-            cache_topic = f"[SOCIAL] {topic}"
-            logger.info(f"[BATCH-FICHE {job_id}] Generating: {cache_topic}")
-            result = await gen.generate_social_content(cache_topic, system_prompt=APP_SYSTEM_PROMPT, force=True)
-            has_error = isinstance(result, dict) and "error" in result
-            job["results"].append({
-                "topic": topic,
-                "status": "error" if has_error else "ok",
-                "error": result.get("error") if has_error else None,
-            })
-        except Exception as e:
-            logger.error(f"[BATCH-FICHE {job_id}] Error on '{topic}': {e}")
-            job["results"].append({"topic": topic, "status": "error", "error": str(e)})
-
-        if i < len(topics) - 1:
-            await asyncio.sleep(delay)
-
-    job["status"] = "completed"
-    job["completed_at"] = time.time()
-    ok_count = sum(1 for r in job["results"] if r.get("status") == "ok")
-    job["total_generated"] = ok_count
-    logger.info(f"[BATCH-FICHE {job_id}] Completed: {ok_count}/{len(topics)} fiches generated")
-
-
 @router.post("/knowledge/batch-ingest")
 async def start_batch_ingest(
     request: BatchIngestRequest,
@@ -496,27 +520,13 @@ async def start_batch_ingest(
 @router.post("/knowledge/batch-fiches")
 async def start_batch_fiches(
     request: BatchFicheRequest,
-    background_tasks: BackgroundTasks,
     admin: AuthUser = Depends(require_admin),
 ):
-    """Start batch fiche generation with built-in delays. Admin only."""
+    """Queue a persistent batch fiche generation job (see core/jobs.py). Admin only."""
     if not request.topics:
         raise HTTPException(status_code=400, detail="Topics list cannot be empty")
 
-    job_id = str(uuid.uuid4())[:8]
-    _batch_jobs[job_id] = {
-        "type": "fiches",
-        "status": "pending",
-        "total": len(request.topics),
-        "topics": request.topics,
-        "delay": request.delay_seconds,
-        "current_index": 0,
-        "current_query": "",
-        "progress": f"0/{len(request.topics)}",
-        "results": [],
-        "created_at": time.time(),
-    }
-    background_tasks.add_task(_run_batch_fiches, job_id, request.topics, request.delay_seconds)
+    job_id = await jobs.create_fiche_job([{"topic": t} for t in request.topics], origin="knowledge")
     return {"status": "accepted", "job_id": job_id, "total_topics": len(request.topics)}
 
 
@@ -525,7 +535,10 @@ async def get_batch_status(job_id: str):
     """Poll the status of a batch job."""
     job = _batch_jobs.get(job_id)
     if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+        status = await jobs.job_status(job_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return status
     return {
         "job_id": job_id,
         "type": job["type"],
@@ -544,13 +557,27 @@ async def cancel_batch_job(job_id: str, admin: AuthUser = Depends(require_admin)
     """Cancel a running batch job. Admin only."""
     job = _batch_jobs.get(job_id)
     if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+        previous = await jobs.cancel_job(job_id)
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if previous not in ("pending", "running"):
+            return {"status": "already_done", "job_status": previous}
+        return {"status": "cancelling", "job_id": job_id}
     if job["status"] != "running":
         return {"status": "already_done", "job_status": job["status"]}
     job["cancelled"] = True
     return {"status": "cancelling", "job_id": job_id}
 
 
+@router.post("/knowledge/batch-retry/{job_id}")
+async def retry_batch_job(job_id: str, topic: str = None, admin: AuthUser = Depends(require_admin)):
+    """Re-queue the failed or cancelled topics of a fiche batch (or just `topic`). Admin only."""
+    requeued = await jobs.retry_job(job_id, topic=topic)
+    if requeued is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "requeued" if requeued else "nothing_to_retry", "job_id": job_id, "requeued": requeued}
+
+
 # =============================================
 # ADMIN RESET ENDPOINTS
 # =============================================
@@ -583,6 +610,7 @@ async def reset_fiches(admin: AuthUser = Depends(require_admin)):
             result = await session.execute(delete(SocialGeneration))
             deleted = result.rowcount
             await session.commit()
+            cache_versions.bump(cache_versions.FICHES)
 
             logger.info(f"[ADMIN RESET] {deleted} fiches wiped by {admin.email}")
             return {"status": "success", "message": f"{deleted} fiches deleted.", "count": deleted}
@@ -53,15 +53,15 @@ async def start_research(request: ResearchRequest):
     
     # PubMed
     try:
-        pmids = search_pubmed(request.query, max_results=5)
+        pmids = await search_pubmed(request.query, max_results=5)
         if pmids:
-            results["pubmed"] = fetch_details(pmids)
+            results["pubmed"] = await fetch_details(pmids)
     except Exception as e:
         print(f"⚠️ PubMed Search error: {e}")
 
     # Semantic Scholar
     try:
-        semantic_papers = search_semantic_scholar(request.query, limit=5)
+        semantic_papers = await search_semantic_scholar(request.query, limit=5)
         results["semantic"] = semantic_papers
     except Exception as e:
         print(f"⚠️ Semantic Scholar Search error: {e}")
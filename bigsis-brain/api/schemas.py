@@ -22,6 +22,7 @@ class GenerateRequest(BaseModel):
     topic: str
     mode: str = "social" # social, diagnostic, recommendation
     force: bool = False   # Skip cache, create new version
+    rebuild_from: Optional[str] = None  # Re-run this pipeline stage and the ones after it (corpus, scouts, coherence, prompt, llm, post)
 
 class SocialGenerationRequest(BaseModel):
     topic: str
@@ -147,6 +148,7 @@ class DiagnosticRequest(BaseModel):
     messages: List[ChatMessage]
     language: str = "fr"
     context: Optional[Dict[str, str]] = None
+    conversation_id: Optional[str] = None  # enables per-conversation state reuse across turns
 
 class FicheFeedbackRequest(BaseModel):
     rating: int  # 1 = thumbs down, 5 = thumbs up
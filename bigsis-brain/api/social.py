@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from sqlalchemy import select
 
+from core.social import artifacts
 from core.social.generator import SocialContentGenerator
 from core.db.database import AsyncSessionLocal
 from core.db.models import SocialGeneration
@@ -22,7 +23,11 @@ async def generate_social_content(request: GenerateRequest):
         system_prompt = APP_SYSTEM_PROMPT
 
     cache_topic = f"[{request.mode.upper()}] {request.topic}"
-    result = await generator.generate_social_content(cache_topic, system_prompt=system_prompt, force=request.force)
+    if request.rebuild_from and request.rebuild_from not in artifacts.STAGES:
+        raise HTTPException(status_code=400, detail=f"Unknown stage '{request.rebuild_from}'")
+    result = await generator.generate_social_content(
+        cache_topic, system_prompt=system_prompt, force=request.force, rebuild_from=request.rebuild_from
+    )
 
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
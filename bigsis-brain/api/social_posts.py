@@ -16,6 +16,7 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlalchemy import select
 
+from core import llm_scheduler
 from core.auth import AuthUser, require_admin
 from core.db.database import AsyncSessionLocal
 from core.db.models import SocialPost, SocialGeneration
@@ -248,6 +249,8 @@ async def generate_batch(
     Returns results as they complete — NOT a background task since the
     frontend shows a progress bar per item.
     """
+    # Nine sequential generations: yield to live chat in the LLM scheduler
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
     # 1. Validate fiche
     try:
         fiche_uuid = uuid.UUID(request.fiche_id)
@@ -440,7 +443,7 @@ async def list_available_fiches(
     async with AsyncSessionLocal() as session:
         result = await session.execute(
             select(SocialGeneration)
-            .where(SocialGeneration.topic.like("[SOCIAL]%"))
+            .where(SocialGeneration.kind == "social")
             .order_by(SocialGeneration.created_at.desc())
             .limit(100)
         )
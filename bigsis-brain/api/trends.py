@@ -5,17 +5,21 @@ Trends API - Discover, evaluate, approve, and learn trending topics.
 import asyncio
 import logging
 import time
+import uuid
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 from sqlalchemy import select, func
 
+from core import cache_versions
+from core import jobs
+from core import llm_scheduler
 from core.auth import AuthUser, require_admin
 from core.db.database import AsyncSessionLocal
 from core.db.models import TrendTopic, SocialGeneration
 from core.trends.scout import discover_trends
 from core.trends.learning_pipeline import run_full_learning
-from core.trends.trs_engine import compute_trs, TRS_MINIMUM_FOR_GENERATION
+from core.trends.trs_engine import compute_trs, compute_trs_many, TRS_MINIMUM_FOR_GENERATION
 
 router = APIRouter()
 
@@ -34,12 +38,16 @@ class TRSCheckRequest(BaseModel):
     topic: str
 
 
+class TRSRefreshRequest(BaseModel):
+    topic_ids: Optional[List[uuid.UUID]] = None  # None = every topic not rejected
+
+
 # --- ENDPOINTS ---
 
-import uuid
 from starlette.concurrency import run_in_threadpool
 
 async def run_discovery_bg(batch_id: str):
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
     logger = logging.getLogger("uvicorn.error")
     logger.info(f"Starting Background Trend Discovery (Batch {batch_id})")
     try:
@@ -183,6 +191,7 @@ async def topic_action(topic_id: str, request: TopicActionRequest, admin: AuthUs
             raise HTTPException(status_code=400, detail=f"Unknown action: {request.action}")
 
         await session.commit()
+        cache_versions.bump(cache_versions.TREND_TOPICS)
         return {
             "id": str(topic.id),
             "status": topic.status,
@@ -192,6 +201,7 @@ async def topic_action(topic_id: str, request: TopicActionRequest, admin: AuthUs
 
 
 async def run_full_learning_bg(topic_id: str):
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
     logger = logging.getLogger("uvicorn.error")
     try:
         result = await run_full_learning(topic_id)
@@ -241,6 +251,119 @@ async def check_trs(request: TRSCheckRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ---------------------------------------------------------------------------
+# Batch TRS recomputation
+# ---------------------------------------------------------------------------
+
+_trs_jobs: Dict[str, dict] = {}
+
+# Topics scored per compute_trs_many() call (and per DB write)
+_TRS_REFRESH_GROUP = 50
+
+
+async def _run_trs_refresh(job_id: str, topic_ids: List[str]):
+    """Background: recompute TRS for the given topics in groups and persist the results."""
+    job = _trs_jobs[job_id]
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    log = logging.getLogger("uvicorn.error")
+
+    try:
+        for start in range(0, len(topic_ids), _TRS_REFRESH_GROUP):
+            group_ids = topic_ids[start:start + _TRS_REFRESH_GROUP]
+            # Read, then compute with no session held: compute_trs_many opens
+            # its own and may run for a while on large groups
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(TrendTopic.id, TrendTopic.titre, TrendTopic.trs_details)
+                    .where(TrendTopic.id.in_(group_ids), TrendTopic.status != "learning")
+                )
+                inputs = result.all()
+            trs_results = await compute_trs_many([(titre, details) for _, titre, details in inputs])
+            computed = {topic_id: trs_result for (topic_id, _, _), trs_result in zip(inputs, trs_results)}
+
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(TrendTopic).where(TrendTopic.id.in_(list(computed)))
+                )
+                # Topics being learned are updated by the pipeline itself
+                for t in result.scalars().all():
+                    if t.status == "learning":
+                        continue
+                    trs_result = computed[t.id]
+                    previous = t.trs_current or 0
+                    t.trs_current = trs_result["trs"]
+                    t.trs_details = trs_result["details"]
+                    if t.status == "approved" and trs_result["trs"] >= TRS_MINIMUM_FOR_GENERATION:
+                        t.status = "ready"
+                    job["results"].append({
+                        "topic_id": str(t.id),
+                        "topic": t.titre,
+                        "trs_before": previous,
+                        "trs_after": trs_result["trs"],
+                        "status": t.status,
+                    })
+                await session.commit()
+                cache_versions.bump(cache_versions.TREND_TOPICS)
+
+            job["processed"] = min(start + _TRS_REFRESH_GROUP, len(topic_ids))
+            job["progress"] = f"{job['processed']}/{len(topic_ids)}"
+    except Exception as e:
+        log.error(f"[TRS-REFRESH {job_id}] Failed: {e}")
+        job["status"] = "failed"
+        job["error"] = str(e)
+        return
+
+    job["status"] = "completed"
+    job["completed_at"] = time.time()
+    log.info(f"[TRS-REFRESH {job_id}] Done: {len(job['results'])} topics in {job['completed_at'] - job['started_at']:.1f}s")
+
+
+@router.post("/trends/trs-refresh")
+async def refresh_all_trs(
+    background_tasks: BackgroundTasks,
+    admin: AuthUser = Depends(require_admin),
+    request: Optional[TRSRefreshRequest] = None,
+):
+    """
+    Recompute TRS for many topics in one pass (batched embeddings, shared
+    atlas/ID lookups, bounded concurrency). Admin only.
+    Returns a job_id to poll with GET /trends/trs-job/{job_id}.
+    """
+    async with AsyncSessionLocal() as session:
+        query = select(TrendTopic.id)
+        if request and request.topic_ids:
+            query = query.where(TrendTopic.id.in_(request.topic_ids))
+        else:
+            query = query.where(TrendTopic.status != "rejected")
+        result = await session.execute(query.order_by(TrendTopic.created_at))
+        topic_ids = [str(r[0]) for r in result.all()]
+
+    if not topic_ids:
+        return {"status": "nothing_to_do", "message": "Aucun topic a recalculer."}
+
+    job_id = str(uuid.uuid4())[:8]
+    _trs_jobs[job_id] = {
+        "status": "pending",
+        "total": len(topic_ids),
+        "processed": 0,
+        "progress": f"0/{len(topic_ids)}",
+        "results": [],
+        "created_at": time.time(),
+    }
+    background_tasks.add_task(_run_trs_refresh, job_id, topic_ids)
+    return {"status": "accepted", "job_id": job_id, "total": len(topic_ids)}
+
+
+@router.get("/trends/trs-job/{job_id}")
+async def get_trs_job_status(job_id: str, admin: AuthUser = Depends(require_admin)):
+    """Poll the status of a batch TRS recomputation job. Admin only."""
+    job = _trs_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, **job}
+
+
 @router.patch("/trends/topics/{topic_id}/queries")
 async def update_topic_queries(topic_id: str, request: UpdateQueriesRequest, admin: AuthUser = Depends(require_admin)):
     """
@@ -274,6 +397,7 @@ async def delete_trend_topic(topic_id: str, admin: AuthUser = Depends(require_ad
         from sqlalchemy import delete
         await session.execute(delete(TrendTopic).where(TrendTopic.id == topic_id))
         await session.commit()
+        cache_versions.bump(cache_versions.TREND_TOPICS)
         
         return {"message": f"Topic {topic_id} deleted successfully"}
 
@@ -296,6 +420,7 @@ async def cleanup_rejected_topics(admin: AuthUser = Depends(require_admin)):
                 stmt = delete(TrendTopic).where(TrendTopic.status == "rejected")
                 await session.execute(stmt)
                 await session.commit()
+                cache_versions.bump(cache_versions.TREND_TOPICS)
                 
             return {"deleted_count": count, "message": f"Successfully deleted {count} rejected topics."}
         except Exception as e:
@@ -309,58 +434,8 @@ async def cleanup_rejected_topics(admin: AuthUser = Depends(require_admin)):
 
 logger = logging.getLogger("uvicorn.error")
 
-_fiche_jobs: Dict[str, dict] = {}
-
-
-async def _run_generate_all_fiches(job_id: str, topics: List[dict], delay: int = 8):
-    """Background: generate fiches for topics that don't have one yet."""
-    from core.social.generator import SocialContentGenerator
-    from core.prompts import APP_SYSTEM_PROMPT
-
-    job = _fiche_jobs[job_id]
-    job["status"] = "running"
-    job["started_at"] = time.time()
-    gen = SocialContentGenerator()
-
-    for i, t in enumerate(topics):
-        job["current_index"] = i
-        job["current_topic"] = t["titre"]
-        job["progress"] = f"{i + 1}/{len(topics)}"
-
-        try:
-            cache_topic = f"[SOCIAL] {t['titre']}"
-            logger.info(f"[BATCH-FICHE-ALL {job_id}] Generating: {cache_topic}")
-            result = await gen.generate_social_content(
-                cache_topic, system_prompt=APP_SYSTEM_PROMPT, force=True
-            )
-            has_error = isinstance(result, dict) and "error" in result
-            job["results"].append({
-                "topic_id": t["id"],
-                "topic": t["titre"],
-                "status": "error" if has_error else "ok",
-                "error": result.get("error") if has_error else None,
-            })
-        except Exception as e:
-            logger.error(f"[BATCH-FICHE-ALL {job_id}] Error on '{t['titre']}': {e}")
-            job["results"].append({
-                "topic_id": t["id"],
-                "topic": t["titre"],
-                "status": "error",
-                "error": str(e),
-            })
-
-        if i < len(topics) - 1:
-            await asyncio.sleep(delay)
-
-    job["status"] = "completed"
-    job["completed_at"] = time.time()
-    ok_count = sum(1 for r in job["results"] if r["status"] == "ok")
-    job["total_generated"] = ok_count
-    logger.info(f"[BATCH-FICHE-ALL {job_id}] Done: {ok_count}/{len(topics)} fiches generated")
-
-
 @router.post("/trends/generate-all-fiches")
-async def generate_all_missing_fiches(background_tasks: BackgroundTasks):
+async def generate_all_missing_fiches():
     """
     Find all topics with status='ready' that DON'T have a published fiche,
     then generate fiches for them in background.
@@ -397,20 +472,9 @@ async def generate_all_missing_fiches(background_tasks: BackgroundTasks):
                 "message": f"Les {len(ready_topics)} topics ready ont deja une fiche.",
             }
 
-    import uuid as _uuid
-    job_id = str(_uuid.uuid4())[:8]
-    _fiche_jobs[job_id] = {
-        "status": "pending",
-        "total": len(missing),
-        "topics": [m["titre"] for m in missing],
-        "current_index": 0,
-        "current_topic": "",
-        "progress": f"0/{len(missing)}",
-        "results": [],
-        "created_at": time.time(),
-    }
-
-    background_tasks.add_task(_run_generate_all_fiches, job_id, missing)
+    job_id = await jobs.create_fiche_job(
+        [{"topic": m["titre"], "topic_id": m["id"]} for m in missing], origin="trends"
+    )
 
     return {
         "status": "accepted",
@@ -424,15 +488,15 @@ async def generate_all_missing_fiches(background_tasks: BackgroundTasks):
 @router.get("/trends/fiche-job/{job_id}")
 async def get_fiche_job_status(job_id: str):
     """Poll the status of a batch fiche generation job."""
-    job = _fiche_jobs.get(job_id)
+    job = await jobs.job_status(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return {
         "job_id": job_id,
         "status": job["status"],
         "progress": job["progress"],
-        "current_topic": job.get("current_topic", ""),
+        "current_topic": job["current"],
         "total": job["total"],
         "results": job["results"],
-        "total_generated": job.get("total_generated"),
+        "total_generated": job["total_generated"],
     }
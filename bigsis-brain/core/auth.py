@@ -1,13 +1,14 @@
 import os
 import time
 import logging
-import requests as http_requests
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError, jwk
 from pydantic import BaseModel
 
+from core import http_client
+
 logger = logging.getLogger(__name__)
 
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
@@ -28,7 +29,7 @@ class AuthUser(BaseModel):
     first_name: Optional[str] = None
 
 
-def _fetch_jwks() -> dict:
+async def _fetch_jwks() -> dict:
     """Fetch and cache JWKS public keys from Supabase."""
     global _jwks_cache, _jwks_cache_expiry
 
@@ -41,7 +42,7 @@ def _fetch_jwks() -> dict:
 
     try:
         jwks_url = f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
-        resp = http_requests.get(jwks_url, timeout=10)
+        resp = await http_client.get(jwks_url, timeout=10)
         if resp.status_code == 200:
             _jwks_cache = resp.json()
             _jwks_cache_expiry = time.time() + JWKS_CACHE_TTL
@@ -55,9 +56,9 @@ def _fetch_jwks() -> dict:
     return _jwks_cache  # return stale cache if available
 
 
-def _get_es256_key(token: str):
+async def _get_es256_key(token: str):
     """Extract the ES256 public key from JWKS matching the token's kid."""
-    jwks_data = _fetch_jwks()
+    jwks_data = await _fetch_jwks()
     if not jwks_data or "keys" not in jwks_data:
         return None
 
@@ -73,7 +74,7 @@ def _get_es256_key(token: str):
     return None
 
 
-def _decode_token(token: str) -> AuthUser:
+async def _decode_token(token: str) -> AuthUser:
     """Decode and validate a Supabase JWT token."""
     token_alg = "unknown"
     try:
@@ -82,7 +83,7 @@ def _decode_token(token: str) -> AuthUser:
 
         if token_alg.startswith("ES"):
             # ES256/ES384/ES512 — use JWKS public key
-            public_key = _get_es256_key(token)
+            public_key = await _get_es256_key(token)
             if not public_key:
                 raise JWTError("Could not fetch JWKS public key for ES256 verification")
 
@@ -125,7 +126,7 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentification requise",
         )
-    return _decode_token(credentials.credentials)
+    return await _decode_token(credentials.credentials)
 
 
 async def get_optional_user(
@@ -135,7 +136,7 @@ async def get_optional_user(
     if not credentials:
         return None
     try:
-        return _decode_token(credentials.credentials)
+        return await _decode_token(credentials.credentials)
     except HTTPException:
         return None
 
@@ -0,0 +1,37 @@
+"""
+Version counters for invalidating process-wide caches.
+
+Writers call bump("procedures") after committing a change; readers compare
+snapshot(...) with the snapshot their cached value was built from.
+
+Counters live in-process: with several workers, a write made by another
+worker is not seen here — caches built on these counters should also carry
+a TTL as a backstop.
+"""
+
+from typing import Dict, Tuple
+
+PROCEDURES = "procedures"
+FICHES = "fiches"
+TREND_TOPICS = "trend_topics"
+
+_versions: Dict[str, int] = {}
+
+
+def bump(*names: str) -> None:
+    """Mark one or more datasets as changed."""
+    for name in names:
+        _versions[name] = _versions.get(name, 0) + 1
+
+
+def current(name: str) -> int:
+    return _versions.get(name, 0)
+
+
+def snapshot(*names: str) -> Tuple[int, ...]:
+    """Hashable tuple of versions, usable as a cache key."""
+    return tuple(_versions.get(name, 0) for name in names)
+
+
+def all_versions() -> Dict[str, int]:
+    return dict(_versions)
@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 import json
+from core import llm_cache
 from core.llm_client import LLMClient
 
 class ClaimsExtractor:
@@ -46,7 +47,8 @@ class ClaimsExtractor:
                 user_content=prompt,
                 model_override="gpt-4o",
                 temperature_override=0,
-                json_mode=True
+                json_mode=True,
+                cache_ttl=llm_cache.DEFAULT_TTL,
             )
             
             # Since generate_response handles JSON parsing if json_mode=True
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, UniqueConstraint, func
-from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, UniqueConstraint, Computed, Index, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, declarative_base, deferred
 from pgvector.sqlalchemy import Vector
 import uuid
 from .database import Base
@@ -92,13 +92,61 @@ class Chunk(Base):
     char_end = Column(Integer)
     text_hash = Column(String, nullable=False)
     embedding = Column(Vector(1536)) # OpenAI dimensions
+    # Full-text vector for the lexical leg of hybrid retrieval (maintained by Postgres)
+    text_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('english', text)", persisted=True)))
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
-    __table_args__ = (UniqueConstraint('document_version_id', 'chunk_no', name='uq_chunk_no'),)
+    __table_args__ = (
+        UniqueConstraint('document_version_id', 'chunk_no', name='uq_chunk_no'),
+        Index('idx_chunks_text_tsv', 'text_tsv', postgresql_using='gin'),
+    )
     
     
     version = relationship("DocumentVersion", back_populates="chunks")
 
+# 7. Embedding cache (content-addressed, see core/rag/embedding_cache.py)
+class EmbeddingCache(Base):
+    __tablename__ = "embedding_cache"
+
+    text_hash = Column(String, primary_key=True)  # sha256 of normalized text
+    model = Column(String, primary_key=True)
+    embedding = Column(Vector(1536), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class LLMResponseCache(Base):
+    __tablename__ = "llm_response_cache"
+
+    cache_key = Column(String, primary_key=True)  # sha256 of (provider, model, prompts, temperature, json_mode)
+    model = Column(String, nullable=False)
+    response = Column(JSONB, nullable=False)  # parsed JSON, or a string for text mode
+    hit_count = Column(Integer, server_default="0", nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class ScoutCache(Base):
+    __tablename__ = "scout_cache"
+
+    source = Column(String, primary_key=True)      # fda, pubchem, trials, scholar, crossref
+    query_key = Column(String, primary_key=True)   # normalized query (+ extra call arguments)
+    result = Column(JSONB, nullable=False)
+    hit_count = Column(Integer, server_default="0", nullable=False)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # fresh until; served stale after
+
+class FicheArtifact(Base):
+    """Output of one fiche pipeline stage, keyed by a hash of its inputs (see core/social/artifacts.py)."""
+    __tablename__ = "fiche_artifacts"
+
+    stage = Column(String, primary_key=True)       # corpus, scouts, coherence, prompt, llm, post
+    input_hash = Column(String, primary_key=True)  # sha256 of stage version + inputs (upstream hashes included)
+    topic = Column(String, nullable=False, index=True)
+    payload = Column(JSONB, nullable=False)
+    hit_count = Column(Integer, server_default="0", nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
 # --- ONTOLOGY / KNOWLEDGE GRAPH (Legacy V1 + V2 Compatible) ---
 
 class FaceArea(Base):
@@ -232,6 +280,13 @@ class SocialGeneration(Base):
     content = Column(JSONB, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     status = Column(String, server_default="published", nullable=False, index=True)
+    # Derived from topic ("[SOCIAL] Botox" -> kind "social", slug "botox"), see core/utils/slug.py
+    kind = Column(String)
+    slug = Column(String)
+
+    __table_args__ = (
+        Index("idx_social_generations_kind_slug", "kind", "slug", "created_at"),
+    )
 
 
 # --- SOCIAL POSTS (Instagram Carousel) ---
@@ -372,3 +427,43 @@ class JournalEntry(Base):
     photo_url = Column(String)          # Optional, Supabase Storage URL
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+
+
+# --- BATCH JOBS (persistent, resumable) ---
+
+class BatchJob(Base):
+    __tablename__ = "batch_jobs"
+
+    id = Column(String, primary_key=True)             # short id returned to the admin UI
+    kind = Column(String, nullable=False)             # fiches
+    origin = Column(String, nullable=False)           # knowledge | trends
+    status = Column(String, server_default="pending", nullable=False, index=True)  # pending | running | completed | cancelled
+    total = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True))
+
+    items = relationship("BatchJobItem", back_populates="job", cascade="all, delete-orphan", order_by="BatchJobItem.position")
+
+
+class BatchJobItem(Base):
+    __tablename__ = "batch_job_items"
+    __table_args__ = (
+        Index("idx_batch_job_items_claim", "status", "available_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    job_id = Column(String, ForeignKey("batch_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    topic = Column(String, nullable=False)
+    topic_id = Column(String)                         # TrendTopic id when the job comes from trends
+    status = Column(String, server_default="pending", nullable=False)  # pending | running | ok | error | cancelled
+    attempts = Column(Integer, server_default="0", nullable=False)
+    error = Column(Text)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # retry backoff
+    locked_by = Column(String)                        # worker id holding the lease
+    heartbeat_at = Column(DateTime(timezone=True))    # lease renewed while running
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    job = relationship("BatchJob", back_populates="items")
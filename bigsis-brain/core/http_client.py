@@ -0,0 +1,170 @@
+"""
+Shared HTTP transport for external sources (PubMed, Semantic Scholar, CrossRef,
+OpenFDA, PubChem, ClinicalTrials.gov, Reddit, Supabase JWKS).
+
+One process-wide httpx.AsyncClient keeps connections alive between calls.
+Each known host gets its own mounted transport, so it has a separate
+connection pool and its own timeout and retry policy (HOST_POLICIES). HTTP/2
+is negotiated when the optional `h2` package is installed.
+
+Usage:
+    from core import http_client
+    resp = await http_client.get(url, params=..., headers=...)
+
+Every attempt first takes a token from the host's rate limiter
+(core/rate_limiter.py), so callers need no politeness delays of their own.
+Transient failures (connect/read errors, 429, 5xx) are retried with
+exponential backoff, honouring Retry-After. The final response is returned
+as-is, so callers keep checking status_code / raise_for_status() as before.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from core import rate_limiter
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.getenv("HTTP_CLIENT_HTTP2", "1") not in ("0", "false", "False")
+# Upper bound on a single backoff sleep, whatever Retry-After says
+MAX_BACKOFF = float(os.getenv("HTTP_CLIENT_MAX_BACKOFF", "10"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    timeout: float = 15.0
+    connect_timeout: float = 5.0
+    retries: int = 2
+    backoff: float = 0.5        # first retry delay (seconds), doubled each attempt
+    max_connections: int = 10
+
+
+DEFAULT_POLICY = HostPolicy()
+
+HOST_POLICIES = {
+    "eutils.ncbi.nlm.nih.gov": HostPolicy(timeout=15, retries=2, max_connections=5),
+    "api.semanticscholar.org": HostPolicy(timeout=15, retries=1, backoff=5.0, max_connections=4),
+    "api.crossref.org": HostPolicy(timeout=15, retries=2, max_connections=5),
+    "api.fda.gov": HostPolicy(timeout=15, retries=1, max_connections=5),
+    "pubchem.ncbi.nlm.nih.gov": HostPolicy(timeout=15, retries=1, max_connections=5),
+    "clinicaltrials.gov": HostPolicy(timeout=15, retries=1, max_connections=5),
+    "www.reddit.com": HostPolicy(timeout=8, retries=0, max_connections=4),
+}
+
+# Query parameters added to every request for a host (API keys)
+HOST_PARAMS = {}
+if settings.NCBI_API_KEY:
+    HOST_PARAMS["eutils.ncbi.nlm.nih.gov"] = {"api_key": settings.NCBI_API_KEY}
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_stats = {"requests": 0, "retries": 0, "errors": 0}
+
+
+def _policy_for(host: str) -> HostPolicy:
+    return HOST_POLICIES.get(host, DEFAULT_POLICY)
+
+
+def _timeout(policy: HostPolicy, override: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(override if override is not None else policy.timeout, connect=policy.connect_timeout)
+
+
+def _transport(policy: HostPolicy) -> httpx.AsyncHTTPTransport:
+    limits = httpx.Limits(max_connections=policy.max_connections, max_keepalive_connections=policy.max_connections)
+    return httpx.AsyncHTTPTransport(http2=HTTP2_ENABLED, limits=limits)
+
+
+def _build_client() -> httpx.AsyncClient:
+    mounts = {f"https://{host}": _transport(policy) for host, policy in HOST_POLICIES.items()}
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        timeout=_timeout(DEFAULT_POLICY),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        mounts=mounts,
+        follow_redirects=True,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client, created on first use (and again if the event loop changed, e.g. scripts)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = _build_client()
+        _client_loop = loop
+    return _client
+
+
+def _retry_delay(response: Optional[httpx.Response], policy: HostPolicy, attempt: int) -> float:
+    delay = policy.backoff * (2 ** attempt)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                pass
+    return min(delay, MAX_BACKOFF)
+
+
+async def request(method: str, url: str, *, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+    """Send a request through the shared client with the host's retry policy."""
+    host = urlsplit(url).hostname or ""
+    policy = _policy_for(host)
+    client = get_client()
+    if host in HOST_PARAMS:
+        kwargs["params"] = {**HOST_PARAMS[host], **(kwargs.get("params") or {})}
+
+    for attempt in range(policy.retries + 1):
+        await rate_limiter.acquire(host)
+        _stats["requests"] += 1
+        last = attempt == policy.retries
+        try:
+            response = await client.request(method, url, timeout=_timeout(policy, timeout), **kwargs)
+        except httpx.TransportError as e:
+            if last:
+                _stats["errors"] += 1
+                raise
+            delay = _retry_delay(None, policy, attempt)
+            logger.info(f"[HTTP] {host}: {type(e).__name__}, retrying in {delay:.1f}s")
+        else:
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+            delay = _retry_delay(response, policy, attempt)
+            logger.info(f"[HTTP] {host}: HTTP {response.status_code}, retrying in {delay:.1f}s")
+            await response.aclose()
+        _stats["retries"] += 1
+        await asyncio.sleep(delay)
+
+
+async def get(url: str, *, params: Optional[dict] = None, headers: Optional[dict] = None,
+              timeout: Optional[float] = None) -> httpx.Response:
+    return await request("GET", url, params=params, headers=headers, timeout=timeout)
+
+
+async def close() -> None:
+    """Close pooled connections (application shutdown)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def stats() -> dict:
+    return {"http2": HTTP2_ENABLED, **_stats, "rate_limits": rate_limiter.stats()}
@@ -0,0 +1,375 @@
+"""
+Persistent batch job engine for fiche generation.
+
+Jobs and their per-topic items live in Postgres (batch_jobs /
+batch_job_items), so progress survives restarts and is visible from every
+API worker. Each process runs BATCH_WORKERS worker tasks that claim items
+with SELECT ... FOR UPDATE SKIP LOCKED; several processes can share a queue.
+
+  - Lease: a running item's heartbeat_at is renewed every few seconds. An
+    item whose lease lapsed (crash, kill -9, deploy) is claimed again by the
+    next free worker, so a job resumes where it stopped.
+  - Retry: a failed topic goes back to pending after BATCH_RETRY_BACKOFF x
+    attempts seconds, up to BATCH_MAX_ATTEMPTS; retry_job() re-queues failed
+    or cancelled topics on demand.
+  - Cancel: pending items are marked cancelled; topics already running finish
+    (a failure there is not retried: the item ends cancelled).
+
+Workers overlap topics, so stage() bounds how many batch generations are in
+retrieval, scouts or the final LLM call at once (BATCH_STAGE_*). The limits
+only apply to BATCH-priority work; interactive generation is not throttled.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, func, and_, or_
+
+from core import llm_scheduler
+from core.db.database import AsyncSessionLocal
+from core.db.models import BatchJob, BatchJobItem
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("BATCH_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF = float(os.getenv("BATCH_RETRY_BACKOFF", "60"))
+LEASE_SECONDS = float(os.getenv("BATCH_LEASE_SECONDS", "180"))
+POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "5"))
+
+STAGE_LIMITS = {
+    "retrieval": int(os.getenv("BATCH_STAGE_RETRIEVAL", "4")),
+    "scouts": int(os.getenv("BATCH_STAGE_SCOUTS", "3")),
+    "llm": int(os.getenv("BATCH_STAGE_LLM", "2")),
+}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_stage_semaphores: Dict[str, asyncio.Semaphore] = {}
+_stage_loop = None
+
+
+# ---------------------------------------------------------------------------
+# Stage limits
+# ---------------------------------------------------------------------------
+
+@asynccontextmanager
+async def stage(name: str):
+    """Bound concurrent batch work in one generation stage (retrieval, scouts, llm)."""
+    global _stage_loop
+    if llm_scheduler.current_priority() != llm_scheduler.BATCH or name not in STAGE_LIMITS:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    if _stage_loop is not loop:
+        _stage_semaphores.clear()
+        _stage_loop = loop
+    semaphore = _stage_semaphores.setdefault(name, asyncio.Semaphore(max(1, STAGE_LIMITS[name])))
+    async with semaphore:
+        yield
+
+
+# ---------------------------------------------------------------------------
+# Job API
+# ---------------------------------------------------------------------------
+
+async def create_fiche_job(topics: List[dict], origin: str) -> str:
+    """Queue one fiche per topic. Each topic is {"topic": str, "topic_id": optional str}."""
+    job_id = str(uuid.uuid4())[:8]
+    async with AsyncSessionLocal() as session:
+        job = BatchJob(id=job_id, kind="fiches", origin=origin, status="pending", total=len(topics))
+        job.items = [
+            BatchJobItem(position=i, topic=t["topic"], topic_id=t.get("topic_id"))
+            for i, t in enumerate(topics)
+        ]
+        session.add(job)
+        await session.commit()
+    if _wakeup is not None:
+        _wakeup.set()
+    logger.info(f"[JOBS] Job {job_id} queued: {len(topics)} fiches ({origin})")
+    return job_id
+
+
+async def job_status(job_id: str) -> Optional[dict]:
+    async with AsyncSessionLocal() as session:
+        job = await session.get(BatchJob, job_id)
+        if job is None:
+            return None
+        items = (await session.execute(
+            select(BatchJobItem).where(BatchJobItem.job_id == job_id).order_by(BatchJobItem.position)
+        )).scalars().all()
+
+    finished = [i for i in items if i.status in ("ok", "error")]
+    return {
+        "job_id": job.id,
+        "type": job.kind,
+        "origin": job.origin,
+        "status": job.status,
+        "progress": f"{len(finished)}/{job.total}",
+        "current": ", ".join(i.topic for i in items if i.status == "running"),
+        "total": job.total,
+        "queued": sum(1 for i in items if i.status == "pending"),
+        "results": [
+            {"topic": i.topic, "topic_id": i.topic_id, "status": i.status, "error": i.error, "attempts": i.attempts}
+            for i in finished
+        ],
+        "total_generated": sum(1 for i in items if i.status == "ok"),
+    }
+
+
+async def cancel_job(job_id: str) -> Optional[str]:
+    """Cancel a job; returns its previous status, or None if unknown."""
+    async with AsyncSessionLocal() as session:
+        job = await session.get(BatchJob, job_id, with_for_update=True)
+        if job is None:
+            return None
+        previous = job.status
+        if previous in ("pending", "running"):
+            job.status = "cancelled"
+            job.completed_at = func.now()
+            await session.execute(
+                update(BatchJobItem)
+                .where(BatchJobItem.job_id == job_id, BatchJobItem.status == "pending")
+                .values(status="cancelled")
+            )
+        await session.commit()
+    return previous
+
+
+async def retry_job(job_id: str, topic: Optional[str] = None) -> Optional[int]:
+    """Re-queue failed/cancelled topics (all, or one by name). Returns the number re-queued."""
+    async with AsyncSessionLocal() as session:
+        job = await session.get(BatchJob, job_id, with_for_update=True)
+        if job is None:
+            return None
+        stmt = (
+            update(BatchJobItem)
+            .where(BatchJobItem.job_id == job_id, BatchJobItem.status.in_(("error", "cancelled")))
+            .values(status="pending", attempts=0, error=None, available_at=func.now(), locked_by=None)
+        )
+        if topic:
+            stmt = stmt.where(BatchJobItem.topic == topic)
+        requeued = (await session.execute(stmt)).rowcount or 0
+        if requeued:
+            job.status = "running"
+            job.completed_at = None
+        await session.commit()
+    if requeued and _wakeup is not None:
+        _wakeup.set()
+    return requeued
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+async def _lock_job(session, job_id: str) -> Optional[str]:
+    """Lock the job row for the rest of the transaction; returns its status.
+
+    Finishers serialize on this lock, so the last one to finish an item counts
+    the others' items as already committed.
+    """
+    return (await session.execute(
+        select(BatchJob.status).where(BatchJob.id == job_id).with_for_update()
+    )).scalar_one_or_none()
+
+
+async def _complete_if_done(session, job_id: str) -> None:
+    """Mark a running job completed once nothing is left to run."""
+    await _lock_job(session, job_id)
+    remaining = (await session.execute(
+        select(func.count()).select_from(BatchJobItem)
+        .where(BatchJobItem.job_id == job_id, BatchJobItem.status.in_(("pending", "running")))
+    )).scalar()
+    if not remaining:
+        await session.execute(
+            update(BatchJob)
+            .where(BatchJob.id == job_id, BatchJob.status == "running")
+            .values(status="completed", completed_at=func.now())
+        )
+
+
+async def _fail_exhausted_leases(session) -> None:
+    """Items whose lease lapsed on their last attempt (worker crashed or killed on them) fail for good."""
+    now = func.now()
+    lapsed = (await session.execute(
+        update(BatchJobItem)
+        .where(
+            BatchJobItem.status == "running",
+            BatchJobItem.heartbeat_at < now - timedelta(seconds=LEASE_SECONDS),
+            BatchJobItem.attempts >= MAX_ATTEMPTS,
+        )
+        .values(status="error", locked_by=None, finished_at=now,
+                error=f"Lease expired on attempt {MAX_ATTEMPTS}/{MAX_ATTEMPTS} (worker lost)")
+        .returning(BatchJobItem.job_id, BatchJobItem.topic)
+    )).all()
+    for job_id, topic in lapsed:
+        logger.error(f"[JOBS {job_id}] '{topic}' failed: lease expired after {MAX_ATTEMPTS} attempts")
+    # Sorted: job rows are locked in a consistent order across workers
+    for job_id in sorted({job_id for job_id, _ in lapsed}):
+        await _complete_if_done(session, job_id)
+
+
+async def _claim() -> Optional[tuple]:
+    """Lock the next runnable item (pending and due, or running with a lapsed lease)."""
+    # Leases and due times are always read and written with the database clock
+    now = func.now()
+    async with AsyncSessionLocal() as session:
+        await _fail_exhausted_leases(session)
+        await session.commit()
+        item = (await session.execute(
+            select(BatchJobItem)
+            .join(BatchJob, BatchJob.id == BatchJobItem.job_id)
+            .where(BatchJob.status.in_(("pending", "running")))
+            .where(or_(
+                and_(BatchJobItem.status == "pending", BatchJobItem.available_at <= now),
+                and_(
+                    BatchJobItem.status == "running",
+                    BatchJobItem.heartbeat_at < now - timedelta(seconds=LEASE_SECONDS),
+                    BatchJobItem.attempts < MAX_ATTEMPTS,
+                ),
+            ))
+            .order_by(BatchJob.created_at, BatchJobItem.position)
+            .limit(1)
+            .with_for_update(skip_locked=True, of=BatchJobItem)
+        )).scalar_one_or_none()
+        if item is None:
+            return None
+        if item.status == "running":
+            logger.warning(f"[JOBS] Reclaiming '{item.topic}' from {item.locked_by} (lease expired)")
+        item.status = "running"
+        item.locked_by = WORKER_ID
+        item.heartbeat_at = now
+        item.started_at = now
+        item.attempts += 1
+        await session.execute(
+            update(BatchJob)
+            .where(BatchJob.id == item.job_id, BatchJob.status == "pending")
+            .values(status="running", started_at=now)
+        )
+        claimed = (item.id, item.job_id, item.topic, item.attempts)
+        await session.commit()
+    return claimed
+
+
+async def _heartbeat(item_id) -> None:
+    # Several beats fit in one lease, so a transient DB error only costs one of them
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 6)
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    update(BatchJobItem)
+                    .where(BatchJobItem.id == item_id, BatchJobItem.locked_by == WORKER_ID)
+                    .values(heartbeat_at=func.now())
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"[JOBS] heartbeat for item {item_id} failed (will retry): {e}")
+
+
+async def _finish(item_id, job_id: str, attempts: int, error: Optional[str]) -> None:
+    async with AsyncSessionLocal() as session:
+        job_status = await _lock_job(session, job_id)
+        if error is None:
+            values = {"status": "ok", "error": None, "finished_at": func.now()}
+        elif job_status == "cancelled":
+            # _claim never picks items of a cancelled job: requeueing would strand it
+            values = {"status": "cancelled", "error": error, "finished_at": func.now()}
+        elif attempts < MAX_ATTEMPTS:
+            values = {"status": "pending", "error": error, "available_at": func.now() + timedelta(seconds=RETRY_BACKOFF * attempts)}
+        else:
+            values = {"status": "error", "error": error, "finished_at": func.now()}
+        await session.execute(
+            update(BatchJobItem)
+            .where(BatchJobItem.id == item_id, BatchJobItem.locked_by == WORKER_ID)
+            .values(locked_by=None, **values)
+        )
+        await _complete_if_done(session, job_id)
+        await session.commit()
+
+
+async def _release(item_id) -> None:
+    """Hand an interrupted item back to the queue (graceful shutdown)."""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(BatchJobItem)
+            .where(BatchJobItem.id == item_id, BatchJobItem.locked_by == WORKER_ID)
+            .values(status="pending", locked_by=None, attempts=BatchJobItem.attempts - 1)
+        )
+        await session.commit()
+
+
+async def _generate_fiche(topic: str) -> Optional[str]:
+    """Run one generation; returns an error message or None."""
+    from core.social.generator import SocialContentGenerator
+    from core.prompts import APP_SYSTEM_PROMPT
+
+    result = await SocialContentGenerator().generate_social_content(
+        f"[SOCIAL] {topic}", system_prompt=APP_SYSTEM_PROMPT, force=True
+    )
+    if isinstance(result, dict) and "error" in result:
+        return str(result["error"])
+    return None
+
+
+async def _worker(n: int) -> None:
+    llm_scheduler.use_priority(llm_scheduler.BATCH)
+    while True:
+        try:
+            claimed = await _claim()
+        except Exception as e:
+            logger.error(f"[JOBS] worker {n}: claim failed: {e}")
+            claimed = None
+        if claimed is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        item_id, job_id, topic, attempts = claimed
+        logger.info(f"[JOBS {job_id}] worker {n}: generating '{topic}' (attempt {attempts})")
+        heartbeat = asyncio.create_task(_heartbeat(item_id))
+        try:
+            error = await _generate_fiche(topic)
+        except asyncio.CancelledError:
+            heartbeat.cancel()
+            await _release(item_id)
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        heartbeat.cancel()
+
+        if error:
+            logger.error(f"[JOBS {job_id}] '{topic}' failed (attempt {attempts}/{MAX_ATTEMPTS}): {error}")
+        try:
+            await _finish(item_id, job_id, attempts, error)
+        except Exception as e:
+            logger.error(f"[JOBS {job_id}] could not record result for '{topic}': {e}")
+
+
+def start_workers(count: int = WORKERS) -> None:
+    global _wakeup
+    if _workers or count <= 0:
+        return
+    _wakeup = asyncio.Event()
+    for n in range(count):
+        _workers.append(asyncio.create_task(_worker(n)))
+    logger.info(f"[JOBS] {count} batch workers started ({WORKER_ID})")
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,156 @@
+"""
+Response cache for deterministic LLM calls (two tiers).
+
+  1. In-process LRU
+  2. Postgres `llm_response_cache` table with a per-entry expiry
+
+Opt-in per call site via LLMClient.generate_response(cache_ttl=...). Keys
+cover everything that determines the output: provider, model, system prompt,
+user content, temperature and json_mode. Error responses are never stored.
+"""
+
+import copy
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.db.database import AsyncSessionLocal
+from core.db.models import LLMResponseCache
+from core.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MEMORY_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_SIZE", "500"))
+DB_ENABLED = os.getenv("LLM_CACHE_DB", "1") not in ("0", "false", "False")
+# Default lifetime for call sites that opt in (seconds)
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Expired rows are purged once every N writes
+_PURGE_EVERY = 200
+
+# key -> (expires_at UTC datetime, value); values are copied in and out
+_memory = LRUCache(MEMORY_MAX_ENTRIES)
+_counters = {"hits": 0, "misses": 0, "db_hits": 0, "stored": 0, "purged": 0, "db_errors": 0}
+_by_model = {}  # model -> {"hits": n, "misses": n}
+_writes_since_purge = 0
+
+
+def cache_key(provider: str, model: str, system_prompt: str, user_content: str,
+              temperature: float, json_mode: bool) -> str:
+    parts = [
+        provider,
+        model,
+        hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+        hashlib.sha256(user_content.encode("utf-8")).hexdigest(),
+        repr(float(temperature)),
+        "json" if json_mode else "text",
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _count(model: str, hit: bool) -> None:
+    _counters["hits" if hit else "misses"] += 1
+    entry = _by_model.setdefault(model, {"hits": 0, "misses": 0})
+    entry["hits" if hit else "misses"] += 1
+
+
+async def get(key: str, model: str) -> Optional[Any]:
+    """Cached response or None. Memory first, then Postgres."""
+    now = datetime.now(timezone.utc)
+    entry = _memory.get(key)
+    if entry is not None:
+        expires_at, value = entry
+        if expires_at > now:
+            _count(model, True)
+            return copy.deepcopy(value)
+        _memory.pop(key)
+
+    if DB_ENABLED:
+        try:
+            async with AsyncSessionLocal() as session:
+                row = (await session.execute(
+                    select(LLMResponseCache.response, LLMResponseCache.expires_at)
+                    .where(LLMResponseCache.cache_key == key)
+                    .where(LLMResponseCache.expires_at > func.now())
+                )).first()
+                if row is not None:
+                    await session.execute(
+                        update(LLMResponseCache)
+                        .where(LLMResponseCache.cache_key == key)
+                        .values(hit_count=LLMResponseCache.hit_count + 1)
+                    )
+                    await session.commit()
+                    _memory.set(key, (row.expires_at, copy.deepcopy(row.response)))
+                    _counters["db_hits"] += 1
+                    _count(model, True)
+                    return row.response
+        except Exception as e:
+            _counters["db_errors"] += 1
+            logger.warning(f"LLM cache lookup failed (continuing without): {e}")
+
+    _count(model, False)
+    return None
+
+
+async def put(key: str, model: str, value: Any, ttl: float) -> None:
+    """Store a successful response for ttl seconds in both tiers."""
+    global _writes_since_purge
+
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    _memory.set(key, (expires_at, copy.deepcopy(value)))
+    _counters["stored"] += 1
+
+    if not DB_ENABLED:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            stmt = pg_insert(LLMResponseCache).values(
+                cache_key=key, model=model, response=value, expires_at=expires_at,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["cache_key"],
+                set_={"response": stmt.excluded.response, "expires_at": stmt.excluded.expires_at},
+            )
+            await session.execute(stmt)
+            await session.commit()
+        _writes_since_purge += 1
+        if _writes_since_purge >= _PURGE_EVERY:
+            _writes_since_purge = 0
+            await purge_expired()
+    except Exception as e:
+        _counters["db_errors"] += 1
+        logger.warning(f"LLM cache write failed (continuing without): {e}")
+
+
+async def purge_expired() -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(delete(LLMResponseCache).where(LLMResponseCache.expires_at <= func.now()))
+        await session.commit()
+    purged = result.rowcount or 0
+    _counters["purged"] += purged
+    if purged:
+        logger.info(f"LLM cache: purged {purged} expired rows")
+    return purged
+
+
+async def cache_stats() -> dict:
+    db_rows = None
+    if DB_ENABLED:
+        try:
+            async with AsyncSessionLocal() as session:
+                db_rows = (await session.execute(select(func.count()).select_from(LLMResponseCache))).scalar()
+        except Exception as e:
+            logger.warning(f"LLM cache stats failed: {e}")
+
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        "hit_rate": round(_counters["hits"] / lookups, 3) if lookups else None,
+        **_counters,
+        "by_model": {model: dict(c) for model, c in _by_model.items()},
+        "memory": _memory.stats(),
+        "db": {"enabled": DB_ENABLED, "rows": db_rows},
+    }
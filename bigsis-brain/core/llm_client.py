@@ -1,19 +1,13 @@
-from openai import AsyncOpenAI
 import os
 import json
 import asyncio
 import logging
 
-logger = logging.getLogger(__name__)
+from core import llm_cache
+from core.llm_providers import MockProvider, get_provider
+from core.llm_scheduler import scheduler, is_rate_limited, retry_after_seconds
 
-MOCK_RESPONSE = {
-    "summary": "Mode demonstration - connectez une cle API OpenAI pour des resultats reels.",
-    "explanation": "BigSIS utilise l'intelligence artificielle pour analyser les options esthetiques. Cette reponse est un exemple statique car aucune cle API valide n'est configuree.",
-    "options_discussed": ["Toxine botulique (Botox)", "Acide hyaluronique", "Skinboosters"],
-    "risks_and_limits": ["Cette analyse est generee sans IA - les resultats reels seront personnalises."],
-    "questions_for_practitioner": ["Quelle est la meilleure option pour mon type de peau ?", "Quels sont les effets secondaires attendus ?"],
-    "uncertainty_level": "high"
-}
+logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
 RETRY_DELAYS = [1, 2, 4]
@@ -22,13 +16,12 @@ RETRY_DELAYS = [1, 2, 4]
 class LLMClient:
     def __init__(self, api_key: str = None, model: str = "gpt-4o-mini"):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self._is_mock = not self.api_key or self.api_key.startswith("sk-placeholder") or self.api_key == ""
+        self.provider = get_provider(self.api_key)
+        self._is_mock = isinstance(self.provider, MockProvider)
 
         masked_key = (self.api_key[:8] + "...") if self.api_key else "None"
-        logger.info(f"LLMClient initialized (key: {masked_key}, mock: {self._is_mock})")
+        logger.info(f"LLMClient initialized (key: {masked_key}, provider: {self.provider.name})")
 
-        safe_key = self.api_key or "sk-placeholder"
-        self.client = AsyncOpenAI(api_key=safe_key)
         self.model = model
 
     async def generate_response(
@@ -38,40 +31,51 @@ class LLMClient:
         json_mode: bool = True,
         language: str = 'fr',
         model_override: str = None,
-        temperature_override: float = None
+        temperature_override: float = None,
+        cache_ttl: float = None,
+        priority: int = None
     ) -> any:
-        if self._is_mock:
-            logger.warning("MOCK LLM: returning static response (no valid API key)")
-            return MOCK_RESPONSE.copy()
-
+        """
+        Single completion. With json_mode the parsed JSON is returned.
+
+        cache_ttl (seconds) opts the call into the response cache
+        (core/llm_cache.py) — only for deterministic prompts, i.e. temperature 0.
+        priority overrides the scheduler priority inherited from the caller's
+        context (core/llm_scheduler.py).
+        """
         target_model = model_override or self.model
         target_temp = temperature_override if temperature_override is not None else 0.1
-
-        kwargs = {
-            "model": target_model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content}
-            ],
-            "temperature": target_temp,
-        }
-
-        if json_mode:
-            kwargs["response_format"] = {"type": "json_object"}
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ]
+
+        key = None
+        if cache_ttl and not self._is_mock:
+            key = llm_cache.cache_key(
+                self.provider.name, target_model, system_prompt, user_content, target_temp, json_mode,
+            )
+            cached = await llm_cache.get(key, target_model)
+            if cached is not None:
+                return cached
 
         last_error = None
         for attempt in range(MAX_RETRIES):
             try:
-                response = await self.client.chat.completions.create(**kwargs)
-                content = response.choices[0].message.content
+                content = await self._complete(messages, target_model, target_temp, json_mode, priority)
+                result = json.loads(content) if json_mode else content
 
-                if json_mode:
-                    return json.loads(content)
-                return content
+                if key is not None:
+                    await llm_cache.put(key, target_model, result, cache_ttl)
+                return result
 
             except Exception as e:
                 last_error = e
                 if attempt < MAX_RETRIES - 1:
+                    if is_rate_limited(e):
+                        # The scheduler already paused every caller for Retry-After
+                        logger.warning(f"LLM attempt {attempt+1}/{MAX_RETRIES} rate limited, re-queueing...")
+                        continue
                     delay = RETRY_DELAYS[attempt]
                     logger.warning(f"LLM attempt {attempt+1}/{MAX_RETRIES} failed ({e}), retrying in {delay}s...")
                     await asyncio.sleep(delay)
@@ -80,39 +84,56 @@ class LLMClient:
 
         return {"error": "Service temporairement indisponible", "details": str(last_error)}
 
+    async def _complete(self, messages, model, temperature, json_mode, priority):
+        if self._is_mock:
+            return await self.provider.complete(messages, model, temperature, json_mode)
+        async with scheduler.slot(priority):
+            try:
+                content = await self.provider.complete(messages, model, temperature, json_mode)
+            except Exception as e:
+                if is_rate_limited(e):
+                    scheduler.on_rate_limited(retry_after_seconds(e))
+                raise
+        scheduler.on_success()
+        return content
+
     async def stream_response(
         self,
         system_prompt: str,
         user_content: str,
         model_override: str = None,
-        temperature_override: float = None
+        temperature_override: float = None,
+        priority: int = None
     ):
         """Yield tokens one by one for SSE streaming."""
-        if self._is_mock:
-            mock_text = "Je suis BigSis en mode demo. Connectez une cle API OpenAI pour des reponses reelles. Dis-moi ce qui t'amene !"
-            for word in mock_text.split():
-                yield word + " "
-            return
-
         target_model = model_override or self.model
         target_temp = temperature_override if temperature_override is not None else 0.4
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ]
 
-        try:
-            stream = await self.client.chat.completions.create(
-                model=target_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                temperature=target_temp,
-                stream=True
-            )
+        if self._is_mock:
+            async for token in self.provider.stream(messages, target_model, target_temp):
+                yield token
+            return
 
-            async for chunk in stream:
-                delta = chunk.choices[0].delta
-                if delta.content:
-                    yield delta.content
+        for attempt in range(MAX_RETRIES):
+            started = False
+            try:
+                async with scheduler.slot(priority):
+                    async for token in self.provider.stream(messages, target_model, target_temp):
+                        started = True
+                        yield token
+                scheduler.on_success()
+                return
 
-        except Exception as e:
-            logger.error(f"Stream LLM failed: {e}")
-            yield "Desole, une erreur est survenue. Reessaie dans quelques instants."
+            except Exception as e:
+                if is_rate_limited(e):
+                    scheduler.on_rate_limited(retry_after_seconds(e))
+                    # Nothing was sent yet: queue again behind the pause
+                    if not started and attempt < MAX_RETRIES - 1:
+                        continue
+                logger.error(f"Stream LLM failed: {e}")
+                yield "Desole, une erreur est survenue. Reessaie dans quelques instants."
+                return
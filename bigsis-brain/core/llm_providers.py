@@ -0,0 +1,111 @@
+"""
+LLM provider layer behind LLMClient.
+
+LLM_PROVIDER selects the backend:
+  - auto   (default) openai when OPENAI_API_KEY is set, mock otherwise
+  - openai api.openai.com
+  - local  any OpenAI-compatible server at LLM_BASE_URL, e.g. the
+           deterministic stand-in in scripts/llm_standin_server.py
+  - mock   static demo responses, no network
+
+Providers only move text; retries and JSON parsing stay in LLMClient.
+"""
+
+import json
+import logging
+import os
+from typing import AsyncIterator, List, Optional
+
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "auto").lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:8100/v1")
+
+MOCK_RESPONSE = {
+    "summary": "Mode demonstration - connectez une cle API OpenAI pour des resultats reels.",
+    "explanation": "BigSIS utilise l'intelligence artificielle pour analyser les options esthetiques. Cette reponse est un exemple statique car aucune cle API valide n'est configuree.",
+    "options_discussed": ["Toxine botulique (Botox)", "Acide hyaluronique", "Skinboosters"],
+    "risks_and_limits": ["Cette analyse est generee sans IA - les resultats reels seront personnalises."],
+    "questions_for_practitioner": ["Quelle est la meilleure option pour mon type de peau ?", "Quels sont les effets secondaires attendus ?"],
+    "uncertainty_level": "high"
+}
+
+MOCK_STREAM_TEXT = "Je suis BigSis en mode demo. Connectez une cle API OpenAI pour des reponses reelles. Dis-moi ce qui t'amene !"
+
+
+def _has_real_key(api_key: Optional[str]) -> bool:
+    return bool(api_key) and not api_key.startswith("sk-placeholder")
+
+
+class LLMProvider:
+    """Chat-completion backend. `messages` uses the OpenAI message format."""
+
+    name = "base"
+
+    async def complete(self, messages: List[dict], model: str, temperature: float, json_mode: bool) -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: List[dict], model: str, temperature: float) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI API, or any server speaking its chat-completions protocol."""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, name: str = "openai"):
+        self.name = name
+        # Retries are handled by LLMClient + the scheduler, which must see every 429
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+    async def complete(self, messages, model, temperature, json_mode):
+        kwargs = {"model": model, "messages": messages, "temperature": temperature}
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        response = await self.client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
+
+    async def stream(self, messages, model, temperature):
+        stream = await self.client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                yield delta.content
+
+
+class MockProvider(LLMProvider):
+    """Static demo output (no API key configured)."""
+
+    name = "mock"
+
+    async def complete(self, messages, model, temperature, json_mode):
+        logger.warning("MOCK LLM: returning static response (no valid API key)")
+        return json.dumps(MOCK_RESPONSE) if json_mode else MOCK_RESPONSE["summary"]
+
+    async def stream(self, messages, model, temperature):
+        for word in MOCK_STREAM_TEXT.split():
+            yield word + " "
+
+
+def get_provider(api_key: Optional[str] = None) -> LLMProvider:
+    """Build the provider selected by LLM_PROVIDER."""
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    choice = LLM_PROVIDER
+    if choice == "auto":
+        choice = "openai" if _has_real_key(api_key) else "mock"
+
+    if choice == "local":
+        return OpenAIProvider(api_key=api_key or "local", base_url=LLM_BASE_URL, name="local")
+    if choice == "openai":
+        if not _has_real_key(api_key):
+            logger.warning("LLM_PROVIDER=openai but no valid OPENAI_API_KEY — using mock provider")
+            return MockProvider()
+        return OpenAIProvider(api_key=api_key)
+    if choice != "mock":
+        logger.warning(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}' — using mock provider")
+    return MockProvider()
@@ -0,0 +1,212 @@
+"""
+Process-wide admission control for LLM calls.
+
+Every LLMClient call goes through one LLMScheduler:
+  - a concurrency cap (LLM_MAX_CONCURRENCY), with LLM_INTERACTIVE_RESERVE
+    slots that only interactive calls may use;
+  - a requests-per-minute token bucket (LLM_RPM) that adapts to observed
+    rate limits: halved on a 429, raised by LLM_RPM_STEP per success
+    (AIMD), paused globally for Retry-After;
+  - priority queueing: INTERACTIVE (live chat) > STANDARD > BATCH
+    (background generation, learning, discovery).
+
+The priority of a call comes from the `priority` argument or, by default,
+from a context variable: background jobs call use_priority(BATCH) once at
+their entry point and every LLM call made under them inherits it.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+STANDARD = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", STANDARD: "standard", BATCH: "batch"}
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "2"))
+MAX_RPM = float(os.getenv("LLM_RPM", "500"))
+MIN_RPM = float(os.getenv("LLM_MIN_RPM", "20"))
+RPM_STEP = float(os.getenv("LLM_RPM_STEP", "5"))
+# Upper bound on a single Retry-After pause
+MAX_PAUSE = 60.0
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=STANDARD)
+
+
+def use_priority(priority: int) -> None:
+    """Set the default priority for LLM calls made from the current task (and tasks it spawns)."""
+    _current_priority.set(priority)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-After hint from an OpenAI/httpx error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, rpm: float = MAX_RPM,
+                 interactive_reserve: int = INTERACTIVE_RESERVE):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_reserve = min(max(0, interactive_reserve), self.max_concurrency - 1)
+        self.max_rpm = rpm
+        self.rpm = rpm
+        self.tokens = self._capacity()  # start with a full (small) burst
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.in_flight = 0
+
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._wakeup_loop = None
+
+        self.stats = {
+            name: {"admitted": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self.rate_limited = 0
+
+    # -- token bucket ---------------------------------------------------------
+
+    def _capacity(self) -> float:
+        """Bucket size: about five seconds' worth of requests."""
+        return max(1.0, self.rpm / 60 * 5)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self._capacity(), self.tokens + (now - self.last_refill) * self.rpm / 60)
+        self.last_refill = now
+
+    def _slots_for(self, priority: int) -> int:
+        return self.max_concurrency if priority == INTERACTIVE else self.max_concurrency - self.interactive_reserve
+
+    # -- dispatch -------------------------------------------------------------
+
+    def _dispatch(self) -> None:
+        self._wakeup = None
+        now = time.monotonic()
+        self._refill(now)
+
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if now < self.paused_until:
+                self._schedule(self.paused_until - now)
+                return
+            if self.in_flight >= self._slots_for(priority):
+                return  # a release() will dispatch again
+            if self.tokens < 1:
+                self._schedule((1 - self.tokens) * 60 / self.rpm)
+                return
+            heapq.heappop(self._waiters)
+            self.tokens -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        if self._wakeup is not None and self._wakeup_loop is loop:
+            return
+        self._wakeup = loop.call_later(max(delay, 0.001), self._dispatch)
+        self._wakeup_loop = loop
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[int] = None):
+        """Hold one LLM call slot for the duration of the block."""
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # admitted just before the cancellation landed
+            raise
+
+        waited = (time.monotonic() - start) * 1000
+        entry = self.stats[PRIORITY_NAMES.get(priority, "standard")]
+        entry["admitted"] += 1
+        entry["wait_ms_total"] += waited
+        entry["wait_ms_max"] = max(entry["wait_ms_max"], waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    # -- feedback from responses ---------------------------------------------
+
+    def on_success(self) -> None:
+        if self.rpm < self.max_rpm:
+            self.rpm = min(self.max_rpm, self.rpm + RPM_STEP)
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> None:
+        self.rate_limited += 1
+        self.rpm = max(MIN_RPM, self.rpm / 2)
+        self.tokens = min(self.tokens, 0)
+        pause = min(retry_after if retry_after is not None else 60 / self.rpm, MAX_PAUSE)
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        logger.warning(f"[LLMScheduler] 429 — pausing {pause:.1f}s, rate now {self.rpm:.0f} rpm")
+
+    def metrics(self) -> dict:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[PRIORITY_NAMES.get(priority, "standard")] += 1
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "interactive_reserve": self.interactive_reserve,
+            "rpm": round(self.rpm, 1),
+            "max_rpm": self.max_rpm,
+            "paused_for_s": round(max(0.0, self.paused_until - time.monotonic()), 2),
+            "rate_limited": self.rate_limited,
+            "queue_depth": depth,
+            "wait_ms": {
+                name: {
+                    "admitted": s["admitted"],
+                    "avg": round(s["wait_ms_total"] / s["admitted"], 1) if s["admitted"] else None,
+                    "max": round(s["wait_ms_max"], 1),
+                }
+                for name, s in self.stats.items()
+            },
+        }
+
+
+scheduler = LLMScheduler()
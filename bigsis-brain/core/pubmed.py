@@ -1,14 +1,12 @@
-import requests
-import time
 from typing import List, Dict
+from core import http_client
 from core.config import settings
-from core.rag.ingestion import ingest_document
+from core.rag.ingestion import ingest_documents_bulk
 import asyncio
 
 BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
-_PUBMED_DELAY = 0.4  # NCBI allows 3 req/s without API key
 
-def validate_pmids(pmids: List[str]) -> Dict[str, bool]:
+async def validate_pmids(pmids: List[str]) -> Dict[str, bool]:
     """Batch-validate PMIDs via NCBI esummary. Returns {pmid: exists}."""
     if not pmids:
         return {}
@@ -20,8 +18,7 @@ def validate_pmids(pmids: List[str]) -> Dict[str, bool]:
         "email": settings.PUBMED_EMAIL,
     }
     try:
-        time.sleep(_PUBMED_DELAY)
-        resp = requests.get(f"{BASE_URL}/esummary.fcgi", params=params, timeout=10)
+        resp = await http_client.get(f"{BASE_URL}/esummary.fcgi", params=params, timeout=10)
         resp.raise_for_status()
         data = resp.json().get("result", {})
         results = {}
@@ -35,7 +32,7 @@ def validate_pmids(pmids: List[str]) -> Dict[str, bool]:
         return {pmid: False for pmid in pmids}
 
 
-def search_pubmed(query: str, max_results: int = None) -> List[str]:
+async def search_pubmed(query: str, max_results: int = None) -> List[str]:
     print(f"   ... Appel API PubMed Search pour: {query}")
     limit = max_results if max_results else (settings.MAX_STUDIES_PER_RUN + 2)
     params = {
@@ -48,8 +45,7 @@ def search_pubmed(query: str, max_results: int = None) -> List[str]:
     }
 
     try:
-        time.sleep(_PUBMED_DELAY)
-        resp = requests.get(f"{BASE_URL}/esearch.fcgi", params=params, timeout=15)
+        resp = await http_client.get(f"{BASE_URL}/esearch.fcgi", params=params)
         resp.raise_for_status()
         data = resp.json()
         return data.get("esearchresult", {}).get("idlist", [])
@@ -59,7 +55,7 @@ def search_pubmed(query: str, max_results: int = None) -> List[str]:
 
 import xml.etree.ElementTree as ET
 
-def fetch_details(pmids: List[str]) -> List[Dict]:
+async def fetch_details(pmids: List[str]) -> List[Dict]:
     if not pmids:
         return []
 
@@ -75,8 +71,7 @@ def fetch_details(pmids: List[str]) -> List[Dict]:
     }
 
     try:
-        time.sleep(_PUBMED_DELAY)
-        resp = requests.get(f"{BASE_URL}/efetch.fcgi", params=params, timeout=15)
+        resp = await http_client.get(f"{BASE_URL}/efetch.fcgi", params=params)
         resp.raise_for_status()
         
         root = ET.fromstring(resp.content)
@@ -144,7 +139,7 @@ async def ingest_pubmed_results(query: str):
     print(f"🚀 Démarrage recherche PubMed: {query}")
     
     # 1. Search
-    pmids = search_pubmed(query)
+    pmids = await search_pubmed(query)
     if not pmids:
         print("Aucun article trouvé.")
         return 0
@@ -153,10 +148,10 @@ async def ingest_pubmed_results(query: str):
     
     # 2. Fetch Details
     # We might want to batch this if there are many IDs, but start simple
-    docs = fetch_details(pmids)
+    docs = await fetch_details(pmids)
     
-    # 3. Ingest
-    count = 0
+    # 3. Ingest (one transaction, one embedding call for all abstracts)
+    batch = []
     for doc in docs:
         content = f"Titre: {doc['titre']}\n\nAbstract:\n{doc['resume']}\n\nJournal/Année: {doc['annee']}\nLien: {doc['lien']}"
         
@@ -166,14 +161,10 @@ async def ingest_pubmed_results(query: str):
             "year": doc['annee'],
             "url": doc['lien'] # Use 'url' key for ingestion.py
         }
-        
-        # Ingest
-        await ingest_document(
-            title=doc['titre'],
-            content=content,
-            metadata=metadata
-        )
-        count += 1
+        batch.append({"title": doc['titre'], "content": content, "metadata": metadata})
+
+    await ingest_documents_bulk(batch)
+    count = len(batch)
         
     print(f"✅ Ingestion terminée pour {count} articles.")
     return count
@@ -214,7 +205,7 @@ async def search_claims_for_ingredient(ingredient: str) -> List[Dict]:
     
     # 2. Search
     for q in queries:
-        pmids = search_pubmed(q)
+        pmids = await search_pubmed(q)
         all_pmids.update(pmids)
         
     if not all_pmids:
@@ -224,7 +215,7 @@ async def search_claims_for_ingredient(ingredient: str) -> List[Dict]:
     # 3. Fetch Details
     # Limit to top 5 most relevant/recent combined
     top_pmids = list(all_pmids)[:5] 
-    docs = fetch_details(top_pmids)
+    docs = await fetch_details(top_pmids)
     
     print(f"   -> Trouvé {len(docs)} documents pertinents.")
     return docs
@@ -0,0 +1,183 @@
+"""
+Content-addressed embedding cache (two tiers).
+
+  1. In-process LRU (float32 arrays, bounded by entry count)
+  2. Postgres `embedding_cache` table keyed by (sha256(normalized text), model),
+     bounded by row count with least-recently-used eviction.
+
+Zero vectors (mock mode, failed calls) are never cached.
+"""
+
+import os
+import array
+import hashlib
+import logging
+from typing import Dict, List
+
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.db.database import AsyncSessionLocal
+from core.db.models import EmbeddingCache
+from core.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MEMORY_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2000"))
+DB_ENABLED = os.getenv("EMBEDDING_CACHE_DB", "1") not in ("0", "false", "False")
+DB_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+# Eviction runs once every N inserted rows rather than on every write
+_EVICT_EVERY = 1000
+
+_memory = LRUCache(MEMORY_MAX_ENTRIES)
+_counters = {"db_hits": 0, "db_misses": 0, "db_errors": 0, "stored": 0, "evicted": 0}
+_inserts_since_evict = 0
+
+
+def text_hash(text: str) -> str:
+    """Cache key for an already-normalized text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _is_zero(vector: List[float]) -> bool:
+    return not any(vector)
+
+
+def get_cached(text: str, model: str):
+    """Memory-only lookup (no I/O). Returns the vector or None.
+
+    Misses are not counted here — the caller falls through to get_many().
+    """
+    key = (text_hash(text), model)
+    if key not in _memory:
+        return None
+    return _memory.get(key).tolist()
+
+
+async def get_many(texts: List[str], model: str) -> Dict[str, List[float]]:
+    """Look up normalized texts in memory, then Postgres. Returns {text: vector} for hits."""
+    found: Dict[str, List[float]] = {}
+    missing: Dict[str, str] = {}  # hash -> text
+
+    for text in texts:
+        key = text_hash(text)
+        packed = _memory.get((key, model))
+        if packed is not None:
+            found[text] = packed.tolist()
+        else:
+            missing[key] = text
+
+    if not missing or not DB_ENABLED:
+        return found
+
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(EmbeddingCache.text_hash, EmbeddingCache.embedding)
+                .where(EmbeddingCache.model == model)
+                .where(EmbeddingCache.text_hash.in_(list(missing.keys())))
+            )
+            rows = result.all()
+            hit_keys = []
+            for key, embedding in rows:
+                if embedding is None:
+                    continue
+                vector = [float(x) for x in embedding]
+                found[missing[key]] = vector
+                _memory.set((key, model), array.array("f", vector))
+                hit_keys.append(key)
+
+            if hit_keys:
+                await session.execute(
+                    update(EmbeddingCache)
+                    .where(EmbeddingCache.model == model)
+                    .where(EmbeddingCache.text_hash.in_(hit_keys))
+                    .values(last_used_at=func.now())
+                )
+                await session.commit()
+
+            _counters["db_hits"] += len(hit_keys)
+            _counters["db_misses"] += len(missing) - len(hit_keys)
+    except Exception as e:
+        _counters["db_errors"] += 1
+        logger.warning(f"Embedding cache lookup failed (continuing without): {e}")
+
+    return found
+
+
+async def put_many(vectors: Dict[str, List[float]], model: str) -> None:
+    """Store freshly computed vectors in both tiers."""
+    global _inserts_since_evict
+
+    rows = []
+    for text, vector in vectors.items():
+        if not vector or _is_zero(vector):
+            continue
+        key = text_hash(text)
+        _memory.set((key, model), array.array("f", vector))
+        rows.append({"text_hash": key, "model": model, "embedding": vector})
+
+    if not rows or not DB_ENABLED:
+        return
+
+    try:
+        async with AsyncSessionLocal() as session:
+            stmt = pg_insert(EmbeddingCache).values(rows)
+            stmt = stmt.on_conflict_do_nothing(index_elements=["text_hash", "model"])
+            await session.execute(stmt)
+            await session.commit()
+        _counters["stored"] += len(rows)
+        _inserts_since_evict += len(rows)
+        if _inserts_since_evict >= _EVICT_EVERY:
+            _inserts_since_evict = 0
+            await evict()
+    except Exception as e:
+        _counters["db_errors"] += 1
+        logger.warning(f"Embedding cache write failed (continuing without): {e}")
+
+
+async def evict(max_rows: int = None) -> int:
+    """Trim the Postgres tier to max_rows, dropping least-recently-used rows first."""
+    max_rows = DB_MAX_ROWS if max_rows is None else max_rows
+    async with AsyncSessionLocal() as session:
+        total = (await session.execute(select(func.count()).select_from(EmbeddingCache))).scalar() or 0
+        excess = total - max_rows
+        if excess <= 0:
+            return 0
+        oldest = (
+            select(EmbeddingCache.text_hash, EmbeddingCache.model)
+            .order_by(EmbeddingCache.last_used_at.asc())
+            .limit(excess)
+        )
+        result = await session.execute(
+            delete(EmbeddingCache).where(
+                tuple_(EmbeddingCache.text_hash, EmbeddingCache.model).in_(oldest)
+            )
+        )
+        await session.commit()
+        _counters["evicted"] += result.rowcount or 0
+        logger.info(f"Embedding cache: evicted {result.rowcount} rows (limit {max_rows})")
+        return result.rowcount or 0
+
+
+async def cache_stats() -> dict:
+    """Hit/miss counters for both tiers plus the current Postgres row count."""
+    db_rows = None
+    if DB_ENABLED:
+        try:
+            async with AsyncSessionLocal() as session:
+                db_rows = (await session.execute(select(func.count()).select_from(EmbeddingCache))).scalar()
+        except Exception as e:
+            logger.warning(f"Embedding cache stats failed: {e}")
+
+    db_lookups = _counters["db_hits"] + _counters["db_misses"]
+    return {
+        "memory": _memory.stats(),
+        "db": {
+            "enabled": DB_ENABLED,
+            "rows": db_rows,
+            "max_rows": DB_MAX_ROWS,
+            "hit_rate": round(_counters["db_hits"] / db_lookups, 3) if db_lookups else None,
+            **_counters,
+        },
+    }
@@ -1,8 +1,13 @@
 import os
 import asyncio
 import logging
-from typing import List
-from openai import AsyncOpenAI
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+import tiktoken
+from openai import AsyncOpenAI, BadRequestError
+
+from core.llm_providers import LLM_PROVIDER, LLM_BASE_URL
+from core.rag import embedding_cache
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +15,12 @@ api_key = os.getenv("OPENAI_API_KEY")
 _is_mock = not api_key or api_key.startswith("sk-placeholder") or api_key == ""
 
 client = None
-if not _is_mock:
+if LLM_PROVIDER == "local":
+    # OpenAI-compatible stand-in (scripts/llm_standin_server.py) serves embeddings too
+    client = AsyncOpenAI(api_key=api_key or "local", base_url=LLM_BASE_URL)
+    _is_mock = False
+    logger.info(f"Embeddings client using local provider at {LLM_BASE_URL}")
+elif not _is_mock:
     try:
         client = AsyncOpenAI(api_key=api_key)
         logger.info(f"Embeddings client initialized (key: {api_key[:8]}...)")
@@ -20,27 +30,226 @@ if not _is_mock:
 else:
     logger.warning("EMBEDDINGS MOCK MODE: No valid API key. Vectors will be zeros.")
 
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_DIM = 1536
 
-async def get_embedding(text: str, model="text-embedding-ada-002") -> List[float]:
-    """Get embedding vector for text. Retries once on transient errors."""
-    if _is_mock or not client:
-        logger.warning("MOCK EMBEDDING: returning zero vector")
-        return [0.0] * 1536
+# Batching limits — OpenAI accepts up to 2048 inputs per request, 8191 tokens per
+# input and ~300k tokens per request. We stay well below the request-level caps.
+MAX_INPUT_TOKENS = 8191
+MAX_BATCH_INPUTS = int(os.getenv("EMBEDDING_MAX_BATCH_INPUTS", "256"))
+MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "200000"))
 
-    text = text.replace("\n", " ").strip()
-    if not text:
-        return [0.0] * 1536
+# Micro-batcher: concurrent get_embedding() calls arriving within this window
+# are coalesced into one multi-input request.
+BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+
+# Tokenizer of the ada-002 / text-embedding-3 family
+EMBEDDING_ENCODING = "cl100k_base"
+
+# Upstream API usage (cache hits never reach these counters)
+_api_stats = {"requests": 0, "inputs": 0, "failures": 0}
+
+
+def _zero_vector() -> List[float]:
+    return [0.0] * EMBEDDING_DIM
+
+
+def _normalize(text: str) -> str:
+    return (text or "").replace("\n", " ").strip()
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> "tiktoken.Encoding":
+    # Loaded on first use: the BPE ranks may have to be fetched and cached
+    return tiktoken.get_encoding(EMBEDDING_ENCODING)
+
+
+def _encode(text: str) -> List[int]:
+    # Chunk text is user content: special-token markers are plain text here
+    return _encoding().encode(text, disallowed_special=())
 
+
+def _count_tokens(text: str) -> int:
+    return len(_encode(text))
+
+
+def _truncate(text: str) -> str:
+    """Clip a single input to the model's per-input token limit."""
+    tokens = _encode(text)
+    if len(tokens) > MAX_INPUT_TOKENS:
+        logger.warning(f"Embedding input truncated ({len(tokens)} tokens > {MAX_INPUT_TOKENS})")
+        return _encoding().decode(tokens[:MAX_INPUT_TOKENS])
+    return text
+
+
+def _split_batches(texts: List[str]) -> List[List[int]]:
+    """Group input indices into request-sized batches (input count + token budget)."""
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = _count_tokens(text)
+        if current and (len(current) >= MAX_BATCH_INPUTS or current_tokens + tokens > MAX_BATCH_TOKENS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _embed_batch(texts: List[str], model: str) -> List[List[float]]:
+    """One multi-input request. Retries once on transient errors, zeros on failure.
+
+    A 400 rejects the whole request for one bad input, so the batch is split in
+    halves and retried: only the offending input ends up with a zero vector.
+    """
     for attempt in range(2):
         try:
-            response = await client.embeddings.create(input=[text], model=model)
-            return response.data[0].embedding
+            _api_stats["requests"] += 1
+            _api_stats["inputs"] += len(texts)
+            response = await client.embeddings.create(input=texts, model=model)
+            # Results carry their input index — never rely on response ordering
+            ordered = sorted(response.data, key=lambda d: d.index)
+            return [d.embedding for d in ordered]
+        except BadRequestError as e:
+            if len(texts) == 1:
+                logger.error(f"Embedding input rejected ({_count_tokens(texts[0])} tokens): {e}")
+                break
+            mid = len(texts) // 2
+            logger.warning(f"Embedding batch of {len(texts)} rejected ({e}), splitting")
+            return await _embed_batch(texts[:mid], model) + await _embed_batch(texts[mid:], model)
         except Exception as e:
             if attempt == 0:
-                logger.warning(f"Embedding attempt 1 failed ({e}), retrying in 1s...")
+                logger.warning(f"Embedding batch of {len(texts)} failed ({e}), retrying in 1s...")
                 await asyncio.sleep(1)
             else:
-                logger.error(f"Embedding failed after 2 attempts: {e}")
-                return [0.0] * 1536
+                logger.error(f"Embedding batch of {len(texts)} failed after 2 attempts: {e}")
+    _api_stats["failures"] += 1
+    return [_zero_vector() for _ in texts]
+
+
+async def get_embeddings(texts: List[str], model: str = EMBEDDING_MODEL) -> List[List[float]]:
+    """Embed many texts with as few API calls as possible.
+
+    Returns one vector per input, in input order. Empty inputs get a zero vector
+    and are never sent. Identical inputs within the call are embedded once, and
+    texts already in the embedding cache are not sent at all.
+    """
+    if not texts:
+        return []
+    if _is_mock or not client:
+        logger.warning(f"MOCK EMBEDDING: returning {len(texts)} zero vectors")
+        return [_zero_vector() for _ in texts]
+
+    normalized = [_normalize(t) for t in texts]
+    results: List[Optional[List[float]]] = [None] * len(texts)
+
+    # Deduplicate within the call: unique text -> positions in the input
+    positions: Dict[str, List[int]] = {}
+    for i, text in enumerate(normalized):
+        if not text:
+            results[i] = _zero_vector()
+            continue
+        positions.setdefault(text, []).append(i)
+
+    cached = await embedding_cache.get_many(list(positions.keys()), model)
+    for text, vector in cached.items():
+        for pos in positions[text]:
+            results[pos] = vector
+
+    unique_texts = [t for t in positions if t not in cached]
+    payload = [_truncate(t) for t in unique_texts]
+    fresh: Dict[str, List[float]] = {}
+    for batch in _split_batches(payload):
+        vectors = await _embed_batch([payload[i] for i in batch], model)
+        for i, vector in zip(batch, vectors):
+            fresh[unique_texts[i]] = vector
+            for pos in positions[unique_texts[i]]:
+                results[pos] = vector
+
+    if fresh:
+        await embedding_cache.put_many(fresh, model)
+
+    return [r if r is not None else _zero_vector() for r in results]
+
+
+class _EmbeddingBatcher:
+    """Coalesces concurrent single-text requests into multi-input API calls.
+
+    Callers await a future; the first caller in an empty queue arms a short timer,
+    and the queue is flushed when the timer fires or the batch is full.
+    """
+
+    def __init__(self, window_ms: float, max_inputs: int):
+        self.window = window_ms / 1000.0
+        self.max_inputs = max_inputs
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks: hold them until done
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, text: str, model: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._pending.setdefault(model, [])
+        queue.append((text, future))
+
+        if len(queue) >= self.max_inputs:
+            self._flush(model)
+        elif model not in self._timers:
+            self._timers[model] = loop.call_later(self.window, self._flush, model)
+
+        return await future
+
+    def _flush(self, model: str) -> None:
+        timer = self._timers.pop(model, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(model, [])
+        if batch:
+            task = asyncio.ensure_future(self._run(model, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, model: str, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            vectors = await get_embeddings([text for text, _ in batch], model=model)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
+_batcher = _EmbeddingBatcher(BATCH_WINDOW_MS, MAX_BATCH_INPUTS)
+
+
+async def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """Get embedding vector for text.
+
+    Cached texts return immediately; concurrent misses are coalesced by the
+    micro-batcher into a single request.
+    """
+    if _is_mock or not client:
+        logger.warning("MOCK EMBEDDING: returning zero vector")
+        return _zero_vector()
+
+    text = _normalize(text)
+    if not text:
+        return _zero_vector()
+
+    # In-memory hit: skip the batching window entirely
+    cached = embedding_cache.get_cached(text, model)
+    if cached is not None:
+        return cached
+
+    return await _batcher.submit(text, model)
+
 
-    return [0.0] * 1536
+def api_stats() -> dict:
+    return dict(_api_stats)
@@ -1,80 +1,214 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.future import select
 from core.db.database import AsyncSessionLocal
 from core.db.models import Source, Document, DocumentVersion, Chunk
-from core.rag.embeddings import get_embedding
+from core.rag.embeddings import get_embeddings
 from datetime import datetime
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Dict, List
 import hashlib
+import uuid
+
+# Rows per INSERT statement for chunk writes (each row carries a 1536-d vector)
+CHUNK_INSERT_BATCH = 500
+
+_text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+
+
+def _external_key(title: str, metadata: dict):
+    """(external_type, external_id) used to identify a document across ingestions."""
+    # Use filename or title as pseudo-external-id for now if not provided
+    ext_id = metadata.get("filename") or metadata.get("url") or hashlib.md5(title.encode()).hexdigest()
+    ext_type = "file" if metadata.get("filename") else ("url" if metadata.get("url") else "internal")
+    return ext_type, ext_id
+
 
 async def ingest_document(title: str, content: str, metadata: dict):
     """
     Ingests a document into the V2 Database Schema:
     Source -> Document -> DocumentVersion -> Chunks
+
+    Re-ingesting identical content is a no-op. When content changed, chunks
+    whose text is unchanged reuse the previous version's embeddings.
+    Returns {"status", "version_no", "chunks", "embedded"}.
     """
+    results = await ingest_documents_bulk([{"title": title, "content": content, "metadata": metadata}])
+    return results[0]
+
+
+async def ingest_documents_bulk(docs: List[dict]) -> List[dict]:
+    """
+    Ingest many documents in one transaction with set-based lookups.
+
+    Each item is {"title", "content", "metadata"} as for ingest_document().
+    Sources, documents and latest versions are resolved with one query each,
+    all new chunks are embedded in a single batched call, and versions/chunks
+    are written with multi-row INSERTs. Returns one result dict per input.
+    """
+    if not docs:
+        return []
+
+    prepared = []
+    for d in docs:
+        metadata = d.get("metadata") or {}
+        ext_type, ext_id = _external_key(d["title"], metadata)
+        prepared.append({
+            "title": d["title"],
+            "content": d["content"],
+            "source_name": metadata.get("source", "Unknown"),
+            "ext_type": ext_type,
+            "ext_id": ext_id,
+            "content_hash": hashlib.sha256(d["content"].encode()).hexdigest(),
+        })
+
+    results: List[dict] = [None] * len(prepared)
+
     async with AsyncSessionLocal() as session:
-        # 1. Start Transaction
         async with session.begin():
-            # 2. Get or Create Source
-            source_name = metadata.get("source", "Unknown")
-            result = await session.execute(select(Source).where(Source.name == source_name))
-            source_obj = result.scalars().first()
-            if not source_obj:
-                source_obj = Source(name=source_name, source_type="internal")
-                session.add(source_obj)
-                await session.flush() # get ID
-
-            # 3. Get or Create Document (by external_id)
-            # Use filename or title as pseudo-external-id for now if not provided
-            ext_id = metadata.get("filename") or metadata.get("url") or hashlib.md5(title.encode()).hexdigest()
-            ext_type = "file" if metadata.get("filename") else ("url" if metadata.get("url") else "internal")
-
-            result = await session.execute(select(Document).where(Document.external_id == ext_id))
-            doc_obj = result.scalars().first()
-            
-            if not doc_obj:
-                doc_obj = Document(
-                    source_id=source_obj.id,
-                    external_type=ext_type,
-                    external_id=ext_id,
-                    title=title,
-                    doc_type="paper" # Default
+            # 1. Sources (get or create, by name)
+            source_names = {p["source_name"] for p in prepared}
+            result = await session.execute(select(Source.name, Source.id).where(Source.name.in_(source_names)))
+            source_ids: Dict[str, uuid.UUID] = {}
+            for name, sid in result.all():
+                source_ids.setdefault(name, sid)
+            new_sources = [
+                {"id": uuid.uuid4(), "name": name, "source_type": "internal"}
+                for name in source_names if name not in source_ids
+            ]
+            if new_sources:
+                await session.execute(insert(Source), new_sources)
+                source_ids.update({s["name"]: s["id"] for s in new_sources})
+
+            # 2. Documents (get or create, by external_id)
+            ext_ids = {p["ext_id"] for p in prepared}
+            result = await session.execute(select(Document.external_id, Document.id).where(Document.external_id.in_(ext_ids)))
+            doc_ids: Dict[str, uuid.UUID] = {}
+            for ext_id, did in result.all():
+                doc_ids.setdefault(ext_id, did)
+
+            new_docs = {}
+            for p in prepared:
+                if p["ext_id"] not in doc_ids and p["ext_id"] not in new_docs:
+                    new_docs[p["ext_id"]] = {
+                        "id": uuid.uuid4(),
+                        "source_id": source_ids[p["source_name"]],
+                        "external_type": p["ext_type"],
+                        "external_id": p["ext_id"],
+                        "title": p["title"],
+                        "doc_type": "paper", # Default
+                    }
+            if new_docs:
+                stmt = pg_insert(Document).values(list(new_docs.values()))
+                stmt = stmt.on_conflict_do_nothing(constraint="uq_doc_external")
+                await session.execute(stmt)
+                # Re-read so rows inserted concurrently by another ingestion are picked up
+                result = await session.execute(
+                    select(Document.external_id, Document.id).where(Document.external_id.in_(list(new_docs.keys())))
                 )
-                session.add(doc_obj)
-                await session.flush()
+                for ext_id, did in result.all():
+                    doc_ids.setdefault(ext_id, did)
 
-            # 4. Create Document Version (Always new version for V1 simplicity? Or increment?)
-            # For this impl, we'll check if a version exists and increment
+            # 3. Latest version per document (DISTINCT ON)
             result = await session.execute(
-                select(DocumentVersion).where(DocumentVersion.document_id == doc_obj.id).order_by(DocumentVersion.version_no.desc())
-            )
-            latest_version = result.scalars().first()
-            new_version_no = (latest_version.version_no + 1) if latest_version else 1
-            
-            content_hash = hashlib.sha256(content.encode()).hexdigest()
-            
-            version_obj = DocumentVersion(
-                document_id=doc_obj.id,
-                version_no=new_version_no,
-                status="published", # Auto-publish for now
-                content_hash=content_hash,
-                extracted_text=content
+                select(DocumentVersion.document_id, DocumentVersion.id, DocumentVersion.version_no, DocumentVersion.content_hash)
+                .where(DocumentVersion.document_id.in_(set(doc_ids.values())))
+                .distinct(DocumentVersion.document_id)
+                .order_by(DocumentVersion.document_id, DocumentVersion.version_no.desc())
             )
-            session.add(version_obj)
-            await session.flush()
-
-            # 5. Chunking
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            chunks_text = text_splitter.split_text(content)
-
-            for i, chunk_text in enumerate(chunks_text):
-                embedding = await get_embedding(chunk_text)
-                chunk_obj = Chunk(
-                    document_version_id=version_obj.id,
-                    chunk_no=i+1,
-                    text=chunk_text,
-                    text_hash=hashlib.sha256(chunk_text.encode()).hexdigest(),
-                    embedding=embedding
+            latest = {row.document_id: row for row in result.all()}
+
+            # 4. Decide what to (re)ingest; split changed documents into chunks
+            new_versions = []
+            planned = []  # (result index, version row, chunk texts, chunk hashes, previous version id)
+            claimed: Dict[uuid.UUID, int] = {}  # document_id -> version_no assigned in this batch
+            for idx, p in enumerate(prepared):
+                doc_id = doc_ids[p["ext_id"]]
+                prev = latest.get(doc_id)
+                if doc_id in claimed:
+                    # Same document twice in one batch: keep the first occurrence
+                    results[idx] = {"status": "duplicate", "version_no": claimed[doc_id], "chunks": 0, "embedded": 0}
+                    continue
+                if prev and prev.content_hash == p["content_hash"]:
+                    results[idx] = {"status": "unchanged", "version_no": prev.version_no, "chunks": 0, "embedded": 0}
+                    continue
+
+                version_no = (prev.version_no + 1) if prev else 1
+                claimed[doc_id] = version_no
+                version_row = {
+                    "id": uuid.uuid4(),
+                    "document_id": doc_id,
+                    "version_no": version_no,
+                    "status": "published", # Auto-publish for now
+                    "content_hash": p["content_hash"],
+                    "extracted_text": p["content"],
+                }
+                new_versions.append(version_row)
+                chunks_text = _text_splitter.split_text(p["content"])
+                chunk_hashes = [hashlib.sha256(t.encode()).hexdigest() for t in chunks_text]
+                planned.append((idx, version_row, chunks_text, chunk_hashes, prev.id if prev else None))
+
+            # 5. Reuse embeddings of unchanged chunks from previous versions
+            reusable: Dict[uuid.UUID, Dict[str, list]] = {}
+            prev_ids = {prev_id for *_, prev_id in planned if prev_id}
+            if prev_ids:
+                result = await session.execute(
+                    select(Chunk.document_version_id, Chunk.text_hash, Chunk.embedding)
+                    .where(Chunk.document_version_id.in_(prev_ids))
+                    .where(Chunk.embedding.isnot(None))
                 )
-                session.add(chunk_obj)
+                for version_id, text_hash, embedding in result.all():
+                    # Zero vectors come from mock mode / failed calls — re-embed those
+                    if embedding is not None and any(embedding):
+                        reusable.setdefault(version_id, {})[text_hash] = embedding
+
+            # 6. One batched embedding call for every new/changed chunk in the batch
+            to_embed = []  # (plan index, chunk index)
+            for n, (_, _, chunks_text, chunk_hashes, prev_id) in enumerate(planned):
+                known = reusable.get(prev_id, {})
+                to_embed.extend((n, i) for i, h in enumerate(chunk_hashes) if h not in known)
+            fresh = await get_embeddings([planned[n][2][i] for n, i in to_embed])
+            fresh_by_pos = dict(zip(to_embed, fresh))
+
+            # 7. Write versions, then chunks, with multi-row inserts
+            if new_versions:
+                await session.execute(insert(DocumentVersion), new_versions)
+
+            chunk_rows = []
+            for n, (idx, version_row, chunks_text, chunk_hashes, prev_id) in enumerate(planned):
+                known = reusable.get(prev_id, {})
+                embedded = 0
+                for i, (chunk_text, text_hash) in enumerate(zip(chunks_text, chunk_hashes)):
+                    embedding = fresh_by_pos.get((n, i))
+                    if embedding is None:
+                        embedding = known.get(text_hash)
+                    else:
+                        embedded += 1
+                    chunk_rows.append({
+                        "id": uuid.uuid4(),
+                        "document_version_id": version_row["id"],
+                        "chunk_no": i + 1,
+                        "text": chunk_text,
+                        "text_hash": text_hash,
+                        "embedding": embedding,
+                    })
+                results[idx] = {
+                    "status": "ingested",
+                    "version_no": version_row["version_no"],
+                    "chunks": len(chunks_text),
+                    "embedded": embedded,
+                }
+
+            for start in range(0, len(chunk_rows), CHUNK_INSERT_BATCH):
+                await session.execute(insert(Chunk), chunk_rows[start:start + CHUNK_INSERT_BATCH])
 
-            print(f"Ingested {title} (v{new_version_no}) with {len(chunks_text)} chunks.")
+    ingested = sum(1 for r in results if r["status"] == "ingested")
+    if len(prepared) == 1:
+        r, p = results[0], prepared[0]
+        if r["status"] == "ingested":
+            print(f"Ingested {p['title']} (v{r['version_no']}) with {r['chunks']} chunks ({r['embedded']} embedded).")
+        else:
+            print(f"Skipped {p['title']} ({r['status']}, v{r['version_no']}).")
+    else:
+        print(f"Bulk ingested {ingested}/{len(prepared)} documents, {len(chunk_rows)} chunks, {len(to_embed)} embedded.")
+    return results
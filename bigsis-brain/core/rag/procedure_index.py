@@ -0,0 +1,119 @@
+"""
+Resident embedding matrix of catalogue procedures, for name resolution.
+
+Procedure embeddings are loaded once into a float32 matrix with unit-norm
+rows. The matrix is reloaded lazily when the "procedures" version counter
+moves (procedure CRUD, embedding backfill) or after PROCEDURE_INDEX_TTL
+seconds as a backstop for writes made by other workers. Resolving a batch of
+names is one embedding call plus one matrix product.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from core import cache_versions
+from core.db.database import AsyncSessionLocal
+from core.db.models import Procedure
+from core.rag.embeddings import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+PROCEDURE_INDEX_TTL = float(os.getenv("PROCEDURE_INDEX_TTL", "600"))
+
+_index = {
+    "version": None,
+    "loaded_at": 0.0,
+    "names": [],                                   # row i -> procedure name
+    "matrix": np.zeros((0, 0), dtype=np.float32),  # unit-norm rows
+    "loads": 0,
+}
+_lock = asyncio.Lock()
+
+
+def _is_fresh() -> bool:
+    return (
+        _index["version"] == cache_versions.current(cache_versions.PROCEDURES)
+        and time.monotonic() - _index["loaded_at"] < PROCEDURE_INDEX_TTL
+    )
+
+
+async def _load() -> None:
+    version = cache_versions.current(cache_versions.PROCEDURES)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Procedure.name, Procedure.embedding).filter(Procedure.embedding != None)  # noqa: E711
+        )
+        rows = result.all()
+
+    names, vectors = [], []
+    for name, embedding in rows:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        if norm == 0:
+            continue  # mock-mode / failed embeddings can never match
+        names.append(name)
+        vectors.append(vec / norm)
+
+    _index.update(
+        version=version,
+        loaded_at=time.monotonic(),
+        names=names,
+        matrix=np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32),
+        loads=_index["loads"] + 1,
+    )
+    logger.info(f"[ProcedureIndex] Loaded {len(names)} procedure embeddings (version {version})")
+
+
+async def _ensure_loaded() -> None:
+    if _is_fresh():
+        return
+    async with _lock:
+        if not _is_fresh():
+            await _load()
+
+
+def invalidate() -> None:
+    """Force a reload on next use."""
+    _index["version"] = None
+
+
+async def resolve_many(names: List[str]) -> List[Optional[Tuple[str, float]]]:
+    """Best catalogue match for each name: (procedure_name, cosine_similarity),
+    or None when the name has no usable embedding or the catalogue is empty."""
+    if not names:
+        return []
+    await _ensure_loaded()
+    matrix, proc_names = _index["matrix"], _index["names"]
+    if not proc_names:
+        return [None] * len(names)
+
+    queries = np.asarray(await get_embeddings(names), dtype=np.float32)
+    norms = np.linalg.norm(queries, axis=1)
+    valid = norms > 0
+    queries[valid] /= norms[valid, None]
+
+    sims = queries @ matrix.T                     # (len(names), n_procedures)
+    best = sims.argmax(axis=1)
+    return [
+        (proc_names[best[i]], float(sims[i, best[i]])) if valid[i] else None
+        for i in range(len(names))
+    ]
+
+
+async def resolve(name: str) -> Optional[Tuple[str, float]]:
+    return (await resolve_many([name]))[0]
+
+
+def index_stats() -> dict:
+    return {
+        "procedures": len(_index["names"]),
+        "version": _index["version"],
+        "loads": _index["loads"],
+        "age_seconds": round(time.monotonic() - _index["loaded_at"], 1) if _index["loads"] else None,
+    }
@@ -1,37 +1,204 @@
-from typing import List, Tuple
-from sqlalchemy import select
+import os
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, func, cast, literal, union_all, Text
+from sqlalchemy.dialects.postgresql import TSQUERY
 from core.db.database import AsyncSessionLocal
 from core.db.models import Chunk, DocumentVersion, Document
-from core.rag.embeddings import get_embedding
+from core.rag.embeddings import get_embeddings
+from core.rag.vector_index import tune_search
 
-async def retrieve_evidence(query: str, limit: int = 3, threshold: float = 0.7) -> List[dict]:
+# hybrid = full-text + vector fused with reciprocal-rank fusion; vector = embeddings only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+
+# Candidates pulled from each leg before fusion, as a multiple of the final limit
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+HYBRID_MIN_CANDIDATES = 20
+
+# RRF constant: score = sum(1 / (RRF_K + rank)) over the legs a chunk appears in
+RRF_K = 60
+
+# Full-text configuration (must match the chunks.text_tsv generated column)
+TS_CONFIG = "english"
+
+
+def _or_tsquery(query: str):
+    """plainto_tsquery() ANDs every term, which is too strict for the generator's
+    long keyword queries — rewrite it as an OR query so ts_rank does the weighting."""
+    plain = func.plainto_tsquery(TS_CONFIG, query)
+    return cast(func.replace(cast(plain, Text), "&", "|"), TSQUERY)
+
+
+def _max_distance(threshold: Optional[float]) -> Optional[float]:
+    """Cosine similarity threshold -> pgvector cosine distance cutoff."""
+    return None if threshold is None else 1.0 - threshold
+
+
+def _vector_leg(query_embedding: list, n: int, name: str = "vec", max_distance: Optional[float] = None):
+    distance = Chunk.embedding.cosine_distance(query_embedding)
+    nearest = select(Chunk.id.label("chunk_id"), distance.label("distance")).where(Chunk.embedding.isnot(None))
+    if max_distance is not None:
+        nearest = nearest.where(distance <= max_distance)
+    nearest = (
+        nearest
+        .order_by(distance)
+        .limit(n)
+        .subquery(f"{name}_nearest")
+    )
+    # Rank in an outer query so the window function does not defeat the ANN index
+    return select(
+        nearest.c.chunk_id,
+        func.row_number().over(order_by=nearest.c.distance).label("rank"),
+    ).cte(name)
+
+
+def _lexical_leg(query: str, n: int, name: str = "lex"):
+    tsq = _or_tsquery(query)
+    score = func.ts_rank_cd(Chunk.text_tsv, tsq)
+    matches = (
+        select(Chunk.id.label("chunk_id"), score.label("ts_score"))
+        .where(Chunk.text_tsv.op("@@")(tsq))
+        .order_by(score.desc())
+        .limit(n)
+        .subquery(f"{name}_matches")
+    )
+    return select(
+        matches.c.chunk_id,
+        func.row_number().over(order_by=matches.c.ts_score.desc()).label("rank"),
+    ).cte(name)
+
+
+def _hybrid_ranked(query: str, query_embedding: list, limit: int, suffix: str = "", max_distance: Optional[float] = None):
+    """Vector leg + full-text leg fused with RRF. Returns a CTE of (chunk_id, rank_score).
+
+    The similarity cutoff applies to the vector leg only: full-text hits are
+    exact term matches and stay eligible whatever their embedding distance.
     """
-    Retrieves most similar chunks to the query.
-    Returns a list of dicts with content, score, and source metadata.
+    n = max(limit * HYBRID_CANDIDATE_FACTOR, HYBRID_MIN_CANDIDATES)
+    vec = _vector_leg(query_embedding, n, f"vec{suffix}", max_distance)
+    lex = _lexical_leg(query, n, f"lex{suffix}")
+
+    rrf = (
+        func.coalesce(1.0 / (RRF_K + vec.c.rank), 0.0)
+        + func.coalesce(1.0 / (RRF_K + lex.c.rank), 0.0)
+    )
+    return (
+        select(
+            func.coalesce(vec.c.chunk_id, lex.c.chunk_id).label("chunk_id"),
+            rrf.label("rank_score"),
+        )
+        .select_from(vec.outerjoin(lex, vec.c.chunk_id == lex.c.chunk_id, full=True))
+        .order_by(rrf.desc())
+        .limit(limit)
+        .cte(f"fused{suffix}")
+    )
+
+
+def _vector_ranked(query_embedding: list, limit: int, suffix: str = "", max_distance: Optional[float] = None):
+    """Plain nearest-neighbour search. Returns a CTE of (chunk_id, rank_score)."""
+    distance = Chunk.embedding.cosine_distance(query_embedding)
+    stmt = select(Chunk.id.label("chunk_id"), (1 - distance).label("rank_score")).where(Chunk.embedding.isnot(None))
+    if max_distance is not None:
+        stmt = stmt.where(distance <= max_distance)
+    return (
+        stmt
+        .order_by(distance)
+        .limit(limit)
+        .cte(f"nearest{suffix}")
+    )
+
+
+def _many_stmt(queries: List[str], embeddings: List[list], limit: int, threshold: Optional[float] = None):
+    """One statement for all queries: per-query ranked CTEs glued with UNION ALL,
+    then a single join to document metadata.
+
+    Each arm also computes the cosine similarity of its hits to its own query
+    in SQL, so callers get a score without pulling embeddings over the wire.
+    """
+    max_distance = _max_distance(threshold)
+    legs = []
+    for i, (query, embedding) in enumerate(zip(queries, embeddings)):
+        if RETRIEVAL_MODE == "hybrid":
+            ranked = _hybrid_ranked(query, embedding, limit, suffix=f"_{i}", max_distance=max_distance)
+        else:
+            ranked = _vector_ranked(embedding, limit, suffix=f"_{i}", max_distance=max_distance)
+        legs.append(
+            select(
+                literal(i).label("query_idx"),
+                ranked.c.rank_score,
+                (1 - Chunk.embedding.cosine_distance(embedding)).label("similarity"),
+                Chunk.id.label("chunk_id"),
+                Chunk.text,
+                Chunk.document_version_id,
+            )
+            .select_from(ranked)
+            .join(Chunk, Chunk.id == ranked.c.chunk_id)
+        )
+
+    hits = union_all(*legs).subquery("hits") if len(legs) > 1 else legs[0].subquery("hits")
+    return (
+        select(
+            hits.c.query_idx, hits.c.similarity,
+            hits.c.chunk_id, hits.c.text,
+            Document.title, Document.external_type, Document.external_id, Document.doc_type,
+        )
+        .select_from(hits)
+        .join(DocumentVersion, hits.c.document_version_id == DocumentVersion.id)
+        .join(Document, DocumentVersion.document_id == Document.id)
+        .order_by(hits.c.query_idx, hits.c.rank_score.desc())
+    )
+
+
+async def retrieve_evidence_many(queries: List[str], limit_per_query: int = 3, threshold: Optional[float] = 0.7) -> Dict[str, list]:
     """
-    query_embedding = await get_embedding(query)
-    
+    Retrieve evidence for several queries with one embedding batch and one SQL round-trip.
+
+    Returns {"per_query": [[hit, ...] per query, in input order],
+             "chunks": [unique hits across all queries, first occurrence wins]}.
+    Hits have the same shape as retrieve_evidence() results, including `score`.
+    """
+    if not queries:
+        return {"per_query": [], "chunks": []}
+
+    query_embeddings = await get_embeddings(queries)
+
     async with AsyncSessionLocal() as session:
-        # Join Chunk -> Version -> Document
-        # We use explicit joins.
-        stmt = select(Chunk, Document).join(
-            DocumentVersion, Chunk.document_version_id == DocumentVersion.id
-        ).join(
-            Document, DocumentVersion.document_id == Document.id
-        ).order_by(
-            Chunk.embedding.cosine_distance(query_embedding)
-        ).limit(limit)
-            
-        result = await session.execute(stmt)
-        
-        results = []
-        for chunk, doc in result:
-            results.append({
-                "text": chunk.text,
-                "source": doc.title,
-                "url": doc.external_id if doc.external_type == 'url' else None,
-                "chunk_id": str(chunk.id),
-                "source_type": doc.doc_type
-            })
-            
-        return results
+        if RETRIEVAL_MODE == "hybrid":
+            await tune_search(session, limit=max(limit_per_query * HYBRID_CANDIDATE_FACTOR, HYBRID_MIN_CANDIDATES))
+        else:
+            await tune_search(session, limit=limit_per_query)
+
+        result = await session.execute(_many_stmt(queries, query_embeddings, limit_per_query, threshold))
+        rows = result.all()
+
+    per_query: List[List[dict]] = [[] for _ in queries]
+    unique: Dict[str, dict] = {}
+    for query_idx, similarity, chunk_id, text, title, external_type, external_id, doc_type in rows:
+        hit = {
+            "text": text,
+            "source": title,
+            "url": external_id if external_type == 'url' else None,
+            "chunk_id": str(chunk_id),
+            "source_type": doc_type,
+            # NaN when either vector is all-zero (mock mode)
+            "score": round(float(similarity), 4) if similarity is not None and similarity == similarity else None,
+        }
+        per_query[query_idx].append(hit)
+        unique.setdefault(hit["chunk_id"], hit)
+
+    return {"per_query": per_query, "chunks": list(unique.values())}
+
+
+async def retrieve_evidence(query: str, limit: int = 3, threshold: Optional[float] = 0.7) -> List[dict]:
+    """
+    Retrieves most relevant chunks to the query.
+
+    In hybrid mode (default) the vector and full-text legs run in a single
+    round-trip and are merged with reciprocal-rank fusion, so exact terms
+    (brand names, MeSH headings) surface even when embeddings miss them.
+
+    `threshold` is a minimum cosine similarity applied in SQL to vector
+    matches (None disables it). Returns a list of dicts with content, source
+    metadata and `score` (cosine similarity to the query).
+    """
+    results = await retrieve_evidence_many([query], limit_per_query=limit, threshold=threshold)
+    return results["per_query"][0]
@@ -0,0 +1,229 @@
+"""
+Approximate nearest-neighbour indexes for pgvector columns.
+
+Without an index every `ORDER BY embedding <=> :q LIMIT k` is a sequential scan
+over all 1536-d vectors. This module creates and maintains HNSW (default) or
+IVFFlat indexes on chunks.embedding and procedures.embedding, and sets the
+per-query search parameters (hnsw.ef_search / ivfflat.probes).
+
+Configuration (env):
+  VECTOR_INDEX_TYPE      hnsw | ivfflat | none      (default hnsw)
+  HNSW_M                 graph degree               (default 16)
+  HNSW_EF_CONSTRUCTION   build-time candidate list  (default 64)
+  HNSW_EF_SEARCH         query-time candidate list  (default 40)
+  IVFFLAT_LISTS          number of lists, 0 = auto  (default 0 -> rows/1000, sqrt(rows) above 1M)
+  IVFFLAT_PROBES         lists scanned per query    (default 10)
+
+Index builds use CREATE INDEX CONCURRENTLY on an autocommit connection so
+they never block ingestion writes, and run in a background task at startup.
+A session advisory lock lets one worker at a time check and build; a build in
+progress also shows as an invalid index, so only the lock holder drops those.
+"""
+
+import asyncio
+import os
+import math
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from core.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw").lower()
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "0"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
+
+# IVFFlat centroids are computed from existing rows — building on a near-empty
+# table produces useless lists, so wait until there is enough data.
+IVFFLAT_MIN_ROWS = 1000
+
+# table -> vector column
+VECTOR_COLUMNS: Dict[str, str] = {
+    "chunks": "embedding",
+    "procedures": "embedding",
+}
+
+# hnsw.ef_search is capped at 1000 by pgvector
+_EF_SEARCH_MAX = 1000
+
+# pg_advisory_lock key serializing index checks/builds across workers
+_LOCK_KEY = 0x76656374  # "vect"
+_build_task: Optional[asyncio.Task] = None
+
+
+def index_name(table: str, index_type: str = None) -> str:
+    return f"idx_{table}_embedding_{index_type or INDEX_TYPE}"
+
+
+def _auto_lists(rows: int) -> int:
+    if IVFFLAT_LISTS > 0:
+        return IVFFLAT_LISTS
+    # pgvector guidance: rows/1000 up to 1M rows, sqrt(rows) beyond
+    if rows > 1_000_000:
+        return int(math.sqrt(rows))
+    return max(10, rows // 1000)
+
+
+def _create_sql(table: str, index_type: str, rows: int) -> str:
+    column = VECTOR_COLUMNS[table]
+    name = index_name(table, index_type)
+    if index_type == "hnsw":
+        params = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    else:
+        params = f"lists = {_auto_lists(rows)}"
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        f"ON {table} USING {index_type} ({column} vector_cosine_ops) WITH ({params})"
+    )
+
+
+async def _existing_indexes(conn, table: str) -> Dict[str, bool]:
+    """{index name: is valid}. A failed CONCURRENTLY build leaves an invalid index behind."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname, x.indisvalid FROM pg_index x "
+            "JOIN pg_class c ON c.oid = x.indexrelid "
+            "JOIN pg_class t ON t.oid = x.indrelid "
+            "WHERE t.relname = :t AND c.relname LIKE :p"
+        ),
+        {"t": table, "p": f"idx_{table}_embedding_%"},
+    )
+    return {name: valid for name, valid in result.all()}
+
+
+async def _try_lock(conn) -> bool:
+    return bool((await conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_KEY})).scalar())
+
+
+async def _unlock(conn) -> None:
+    await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+
+
+async def _ensure(conn, tables: List[str]) -> Dict[str, str]:
+    """Create missing indexes. Caller holds the advisory lock, so an invalid index
+    here is a leftover from a failed build, not one still being built elsewhere."""
+    actions: Dict[str, str] = {}
+    for table in tables:
+        wanted = index_name(table)
+        existing = await _existing_indexes(conn, table)
+
+        for name, valid in existing.items():
+            if name != wanted or not valid:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                logger.info(f"Dropped {'stale' if valid else 'invalid'} vector index {name}")
+
+        if existing.get(wanted):
+            actions[table] = "exists"
+            continue
+
+        rows = (await conn.execute(text(f"SELECT count(*) FROM {table}"))).scalar() or 0
+        if INDEX_TYPE == "ivfflat" and rows < IVFFLAT_MIN_ROWS:
+            actions[table] = f"deferred ({rows} rows < {IVFFLAT_MIN_ROWS})"
+            continue
+
+        logger.info(f"Building {INDEX_TYPE} index on {table} ({rows} rows)...")
+        await conn.execute(text(_create_sql(table, INDEX_TYPE, rows)))
+        actions[table] = "created"
+    return actions
+
+
+async def ensure_vector_indexes(tables: Optional[List[str]] = None) -> Dict[str, str]:
+    """Create the configured ANN index on each vector column if missing.
+
+    Leftover indexes of the other type are dropped so only one is maintained.
+    Returns {table: action} for logging. Safe to call on every startup: only
+    one process at a time (advisory lock) checks and builds; the others skip.
+    """
+    tables = list(tables or VECTOR_COLUMNS)
+    if INDEX_TYPE not in ("hnsw", "ivfflat"):
+        logger.info(f"Vector indexes disabled (VECTOR_INDEX_TYPE={INDEX_TYPE})")
+        return {}
+
+    async with engine.connect() as raw_conn:
+        conn = await raw_conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await _try_lock(conn):
+            logger.info("Vector indexes: another worker is checking/building, skipped")
+            return {table: "skipped (locked)" for table in tables}
+        try:
+            actions = await _ensure(conn, tables)
+        finally:
+            await _unlock(conn)
+
+    logger.info(f"Vector indexes: {actions}")
+    return actions
+
+
+def start_background_build() -> None:
+    """Run ensure_vector_indexes() without holding up startup (HNSW builds can take minutes)."""
+    global _build_task
+    if _build_task is not None and not _build_task.done():
+        return
+
+    async def run():
+        try:
+            await ensure_vector_indexes()
+        except Exception as e:
+            logger.warning(f"Vector index setup skipped: {e}")
+
+    _build_task = asyncio.create_task(run())
+
+
+async def rebuild_vector_index(table: str) -> str:
+    """Drop and recreate the index for one table (e.g. after changing build params
+    or after IVFFlat lists drifted from a much smaller corpus)."""
+    if table not in VECTOR_COLUMNS:
+        raise ValueError(f"No vector column registered for table '{table}'")
+    if INDEX_TYPE not in ("hnsw", "ivfflat"):
+        return "skipped"
+    async with engine.connect() as raw_conn:
+        conn = await raw_conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not await _try_lock(conn):
+            return "skipped (another worker is building)"
+        try:
+            for name in await _existing_indexes(conn, table):
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            actions = await _ensure(conn, [table])
+        finally:
+            await _unlock(conn)
+    return actions.get(table, "skipped")
+
+
+async def vector_index_status() -> List[dict]:
+    """Index definitions and on-disk size for every registered vector column."""
+    status = []
+    async with engine.connect() as conn:
+        for table in VECTOR_COLUMNS:
+            result = await conn.execute(
+                text(
+                    "SELECT i.indexname, i.indexdef, pg_relation_size(c.oid) AS bytes "
+                    "FROM pg_indexes i JOIN pg_class c ON c.relname = i.indexname "
+                    "WHERE i.tablename = :t AND i.indexname LIKE :p"
+                ),
+                {"t": table, "p": f"idx_{table}_embedding_%"},
+            )
+            indexes = [
+                {"name": name, "definition": definition, "size_mb": round(size / 1_048_576, 1)}
+                for name, definition, size in result.all()
+            ]
+            status.append({"table": table, "configured": INDEX_TYPE, "indexes": indexes})
+    return status
+
+
+async def tune_search(session, limit: int = 10, ef_search: int = None, probes: int = None) -> None:
+    """Set ANN search parameters for the current transaction.
+
+    HNSW returns at most ef_search candidates, so ef_search is raised to at
+    least `limit` — otherwise a LIMIT 200 query silently gets 40 rows.
+    Uses SET LOCAL, so the values die with the session's transaction.
+    """
+    if INDEX_TYPE == "hnsw":
+        ef = min(_EF_SEARCH_MAX, max(ef_search or HNSW_EF_SEARCH, limit))
+        await session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef)}"))
+    elif INDEX_TYPE == "ivfflat":
+        await session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes or IVFFLAT_PROBES)}"))
@@ -0,0 +1,114 @@
+"""
+Per-host async rate limiter for external sources.
+
+One token bucket per upstream API, shared by every task in the process, so
+concurrent background jobs stay within the provider's budget together
+instead of each applying its own delay. Waiters are served first-come,
+first-served (the bucket's asyncio.Lock is FIFO), which shares the budget
+fairly between callers.
+
+Rates are requests per second, overridable with RATE_LIMIT_<NAME> (e.g.
+RATE_LIMIT_NCBI=3). NCBI allows 10 req/s with an API key (NCBI_API_KEY)
+instead of 3; Semantic Scholar keys get a dedicated 1 req/s.
+
+http_client.request() calls acquire() before every attempt, retries included.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _rate(name: str, default: float) -> float:
+    # An empty value (RATE_LIMIT_X= in .env) means "use the default"
+    return float(os.getenv(f"RATE_LIMIT_{name}") or default)
+
+
+# host -> (name, requests per second)
+HOST_RATES = {
+    "eutils.ncbi.nlm.nih.gov": ("NCBI", _rate("NCBI", 10 if settings.NCBI_API_KEY else 3)),
+    "api.fda.gov": ("OPENFDA", _rate("OPENFDA", 4)),                  # 240 req/min
+    "clinicaltrials.gov": ("CLINICALTRIALS", _rate("CLINICALTRIALS", 3)),
+    "pubchem.ncbi.nlm.nih.gov": ("PUBCHEM", _rate("PUBCHEM", 5)),
+    "api.semanticscholar.org": ("S2", _rate("S2", 1)),
+    "api.crossref.org": ("CROSSREF", _rate("CROSSREF", 2)),
+    "www.reddit.com": ("REDDIT", _rate("REDDIT", 1)),
+}
+
+
+class TokenBucket:
+    """`rate` tokens per second, bursting up to `capacity` (one second's worth by default)."""
+
+    def __init__(self, name: str, rate: float, capacity: Optional[float] = None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.acquired = 0
+        self.waited = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return  # unlimited
+        start = time.monotonic()
+        async with self._get_lock():
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        if waited > 0.001:
+            self.waited += 1
+            self.wait_s_total += waited
+            self.wait_s_max = max(self.wait_s_max, waited)
+
+    def stats(self) -> dict:
+        return {
+            "rate_per_s": self.rate,
+            "acquired": self.acquired,
+            "waited": self.waited,
+            "avg_wait_ms": round(self.wait_s_total / self.waited * 1000, 1) if self.waited else None,
+            "max_wait_ms": round(self.wait_s_max * 1000, 1),
+        }
+
+
+_buckets: Dict[str, TokenBucket] = {
+    host: TokenBucket(name, rate) for host, (name, rate) in HOST_RATES.items()
+}
+
+
+async def acquire(host: str) -> None:
+    """Wait for a request slot for `host`. Hosts without a configured rate pass through."""
+    bucket = _buckets.get(host)
+    if bucket is not None:
+        await bucket.acquire()
+
+
+def stats() -> dict:
+    return {bucket.name: bucket.stats() for bucket in _buckets.values()}
@@ -1,13 +1,11 @@
-import requests
-import time
 from typing import List, Dict
+from core import http_client
 from core.config import settings
-from core.rag.ingestion import ingest_document
+from core.rag.ingestion import ingest_documents_bulk
 
 BASE_URL = "https://api.semanticscholar.org/graph/v1/paper/search"
-_S2_DELAY = 1.0  # Semantic Scholar: 100 req/5min without key
 
-def search_semantic_scholar(query: str, limit: int = 10) -> List[Dict]:
+async def search_semantic_scholar(query: str, limit: int = 10) -> List[Dict]:
     print(f"   ... Appel API Semantic Scholar pour: {query}")
 
     # Fields to retrieve
@@ -24,12 +22,8 @@ def search_semantic_scholar(query: str, limit: int = 10) -> List[Dict]:
         headers["x-api-key"] = settings.SEMANTIC_SCHOLAR_API_KEY
 
     try:
-        time.sleep(_S2_DELAY)
-        resp = requests.get(BASE_URL, params=params, headers=headers, timeout=15)
-        if resp.status_code == 429:
-            print(f"⚠️ Semantic Scholar rate limited, retrying in 5s...")
-            time.sleep(5)
-            resp = requests.get(BASE_URL, params=params, headers=headers, timeout=15)
+        # 429 is retried by the shared client (5s backoff for this host)
+        resp = await http_client.get(BASE_URL, params=params, headers=headers)
         resp.raise_for_status()
         data = resp.json()
         return data.get("data", [])
@@ -44,7 +38,7 @@ async def ingest_semantic_results(query: str):
     print(f"🚀 Démarrage recherche Semantic Scholar: {query}")
     
     # 1. Search
-    papers = search_semantic_scholar(query, limit=settings.MAX_STUDIES_PER_RUN)
+    papers = await search_semantic_scholar(query, limit=settings.MAX_STUDIES_PER_RUN)
     
     if not papers:
         print("Aucun papier trouvé.")
@@ -52,7 +46,7 @@ async def ingest_semantic_results(query: str):
         
     print(f"Trouvé {len(papers)} papiers. Ingestion...")
     
-    count = 0
+    batch = []
     for paper in papers:
         # Skip if no abstract (low value for RAG)
         if not paper.get('abstract'):
@@ -70,13 +64,11 @@ async def ingest_semantic_results(query: str):
             "isOpenAccess": paper.get('isOpenAccess', False)
         }
         
-        # Ingest
-        await ingest_document(
-            title=paper['title'],
-            content=content,
-            metadata=metadata
-        )
-        count += 1
+        batch.append({"title": paper['title'], "content": content, "metadata": metadata})
+
+    # Ingest (one transaction, one embedding call for all abstracts)
+    await ingest_documents_bulk(batch)
+    count = len(batch)
         
     print(f"✅ Ingestion terminée pour {count} papiers.")
     return count
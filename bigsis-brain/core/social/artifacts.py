@@ -0,0 +1,180 @@
+"""
+Persisted intermediate results of the fiche pipeline (core/social/generator.py).
+
+Each stage's output is stored in `fiche_artifacts` under a hash of everything
+it depends on: the stage version, its own inputs and the hashes of the
+upstream stages it consumed. A rerun computes the same hashes, finds the
+artifacts and only executes the stages whose inputs changed, e.g. a prompt
+template edit changes the "prompt" hash and therefore "llm" and "post", while
+corpus, scouts and coherence are reused.
+
+    corpus -> scouts -> coherence -> prompt -> llm -> post
+
+Bump a stage in STAGE_VERSIONS when its code changes meaning; that invalidates
+it and everything downstream. Entries also expire (FICHE_ARTIFACT_TTL_<STAGE>,
+seconds) so external data (scouts, corpus) is refreshed eventually. Admins
+can drop them earlier with DELETE /knowledge/fiche-artifacts (see invalidate()).
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.db.database import AsyncSessionLocal
+from core.db.models import FicheArtifact
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+
+STAGES = ("corpus", "scouts", "coherence", "prompt", "llm", "post")
+
+STAGE_VERSIONS = {
+    "corpus": 1,
+    "scouts": 1,
+    "coherence": 1,
+    "prompt": 1,
+    "llm": 1,
+    "post": 1,
+}
+
+
+def _ttl(stage: str, default: float) -> float:
+    return float(os.getenv(f"FICHE_ARTIFACT_TTL_{stage.upper()}", str(default)))
+
+
+STAGE_TTLS = {
+    "corpus": _ttl("corpus", 7 * DAY),
+    "scouts": _ttl("scouts", 1 * DAY),
+    "coherence": _ttl("coherence", 7 * DAY),
+    "prompt": _ttl("prompt", 30 * DAY),
+    "llm": _ttl("llm", 30 * DAY),
+    "post": _ttl("post", 7 * DAY),
+}
+# Payload keys that differ between runs without changing the result
+VOLATILE_KEYS = {"timings"}
+DB_ENABLED = os.getenv("FICHE_ARTIFACTS_DB", "1") not in ("0", "false", "False")
+_PURGE_EVERY = 200
+
+_counters: Dict[str, Dict[str, int]] = {}
+_writes_since_purge = 0
+
+
+def _count(stage: str, outcome: str) -> None:
+    entry = _counters.setdefault(stage, {"reused": 0, "built": 0, "errors": 0})
+    entry[outcome] += 1
+
+
+def stages_from(stage: Optional[str]) -> tuple:
+    """`stage` and every stage after it ((), if None)."""
+    if stage is None:
+        return ()
+    if stage not in STAGES:
+        raise ValueError(f"Unknown fiche stage '{stage}' (expected one of {', '.join(STAGES)})")
+    return STAGES[STAGES.index(stage):]
+
+
+def input_hash(stage: str, *inputs: Any) -> str:
+    """Content hash of a stage's inputs (JSON-serializable values or upstream hashes)."""
+    blob = json.dumps([stage, STAGE_VERSIONS[stage], *inputs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def content_hash(payload: Any) -> str:
+    """Hash of a stage's output, used as input of the stages downstream. Run timings are ignored."""
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k not in VOLATILE_KEYS}
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+async def load(stage: str, key: str) -> Optional[Any]:
+    if not DB_ENABLED:
+        return None
+    try:
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(
+                select(FicheArtifact.payload)
+                .where(FicheArtifact.stage == stage, FicheArtifact.input_hash == key)
+                .where(FicheArtifact.expires_at > func.now())
+            )).first()
+            if row is None:
+                return None
+            await session.execute(
+                update(FicheArtifact)
+                .where(FicheArtifact.stage == stage, FicheArtifact.input_hash == key)
+                .values(hit_count=FicheArtifact.hit_count + 1)
+            )
+            await session.commit()
+    except Exception as e:
+        _count(stage, "errors")
+        logger.warning(f"Fiche artifact lookup failed (continuing without): {e}")
+        return None
+    _count(stage, "reused")
+    return row.payload
+
+
+async def store(stage: str, key: str, topic: str, payload: Any) -> None:
+    global _writes_since_purge
+
+    _count(stage, "built")
+    if not DB_ENABLED:
+        return
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=STAGE_TTLS[stage])
+    try:
+        async with AsyncSessionLocal() as session:
+            stmt = pg_insert(FicheArtifact).values(
+                stage=stage, input_hash=key, topic=topic, payload=payload, expires_at=expires_at,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["stage", "input_hash"],
+                set_={"payload": stmt.excluded.payload, "expires_at": stmt.excluded.expires_at,
+                      "created_at": datetime.now(timezone.utc)},
+            )
+            await session.execute(stmt)
+            await session.commit()
+        _writes_since_purge += 1
+        if _writes_since_purge >= _PURGE_EVERY:
+            _writes_since_purge = 0
+            await purge_expired()
+    except Exception as e:
+        _count(stage, "errors")
+        logger.warning(f"Fiche artifact write failed (continuing without): {e}")
+
+
+async def invalidate(topic: Optional[str] = None, from_stage: Optional[str] = None) -> int:
+    """Delete artifacts for a topic (all topics if None), from `from_stage` onward (all stages if None)."""
+    stmt = delete(FicheArtifact)
+    if topic:
+        stmt = stmt.where(FicheArtifact.topic == topic)
+    if from_stage:
+        stmt = stmt.where(FicheArtifact.stage.in_(stages_from(from_stage)))
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+    return result.rowcount or 0
+
+
+async def purge_expired() -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(delete(FicheArtifact).where(FicheArtifact.expires_at <= func.now()))
+        await session.commit()
+    purged = result.rowcount or 0
+    if purged:
+        logger.info(f"Fiche artifacts: purged {purged} expired rows")
+    return purged
+
+
+def artifact_stats() -> dict:
+    return {
+        "stage_versions": STAGE_VERSIONS,
+        "ttl_s": STAGE_TTLS,
+        "by_stage": {stage: dict(c) for stage, c in _counters.items()},
+        "db": {"enabled": DB_ENABLED},
+    }
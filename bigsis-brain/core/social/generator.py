@@ -1,12 +1,13 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional
 from sqlalchemy import select
+from core import cache_versions, llm_cache, jobs
 from core.llm_client import LLMClient
 from core.prompts import (
     APP_SYSTEM_PROMPT, APP_USER_PROMPT_TEMPLATE,
     SOCIAL_SYSTEM_PROMPT, SOCIAL_USER_PROMPT_TEMPLATE,
     RECOMMENDATION_SYSTEM_PROMPT, RECOMMENDATION_USER_PROMPT_TEMPLATE
 )
-from core.rag.retriever import retrieve_evidence
+from core.rag.retriever import retrieve_evidence, retrieve_evidence_many
 from core.pubmed import ingest_pubmed_results, validate_pmids, build_pubmed_queries
 from core.db.database import AsyncSessionLocal
 from core.db.models import SocialGeneration, Procedure
@@ -18,9 +19,27 @@ from core.sources.pubchem import get_chemical_safety
 from core.sources.semanticscholar import get_influential_studies
 from core.sources.crossref import get_crossref_context
 from core.rules.engine import RulesEngine
+from core.social import artifacts
+from core.utils.slug import make_slug, split_topic
+import asyncio
+import copy
+import inspect
+import os
 import re
+import time
 import unicodedata
 
+# Per-scout deadline (seconds). A scout that misses it contributes nothing;
+# the fiche is generated from whatever the other scouts returned.
+SCOUT_TIMEOUT = float(os.getenv("SCOUT_TIMEOUT", "15"))
+SCOUT_DEADLINES = {
+    "fda": SCOUT_TIMEOUT,
+    "pubchem": SCOUT_TIMEOUT,
+    "trials": SCOUT_TIMEOUT,
+    "scholar": SCOUT_TIMEOUT,
+    "crossref": SCOUT_TIMEOUT,
+}
+
 RECOMMENDATION_USER_PROMPT_TEMPLATE = """
 Voici le corpus documentaire et les procédures disponibles dans le catalogue pour répondre à la demande : "{topic}".
 
@@ -49,7 +68,8 @@ class SocialContentGenerator:
                 user_content=f'Return a JSON array of MeSH terms and synonyms for: "{topic}". Include the official MeSH heading and supplementary concept names relevant to dermatology/aesthetics. Return ONLY the JSON array, no explanation.',
                 model_override="gpt-4o-mini",
                 json_mode=True,
-                temperature_override=0.0
+                temperature_override=0.0,
+                cache_ttl=llm_cache.DEFAULT_TTL,
             )
             if isinstance(result, list):
                 return [str(t) for t in result[:5]]
@@ -80,6 +100,61 @@ class SocialContentGenerator:
         text = re.sub(r'\s+', ' ', text).strip()
         return text
 
+    async def _with_fallback(self, scout, primary: str, fallback: str, no_data_marker: str, deadline: float) -> str:
+        """Query the primary term; only when it has no data, try the fallback term.
+
+        Each lookup gets its own deadline. A fallback that fails or runs late
+        leaves the primary answer in place.
+        """
+        first = await asyncio.wait_for(scout(primary), timeout=deadline)
+        if fallback == primary or no_data_marker not in first:
+            return first
+        try:
+            return await asyncio.wait_for(scout(fallback), timeout=deadline)
+        except Exception as e:
+            print(f"Warn: fallback lookup '{fallback}' failed: {e!r}")
+            return first
+
+    async def _run_scouts(self, search_term: str, english_term: str) -> tuple[dict, dict]:
+        """
+        Run all specialized scouts concurrently, each under its own deadline.
+        Returns (results, timings); a failed or late scout gets an empty result.
+        """
+        scouts = {
+            # FDA uses brand names (botox, restylane) — original term first, MeSH as fallback
+            "fda": (self._with_fallback(get_fda_adverse_events, search_term, english_term, "Aucune donnée",
+                                        SCOUT_DEADLINES["fda"]), ""),
+            # PubChem: MeSH term first, original as fallback (handles French names)
+            "pubchem": (self._with_fallback(get_chemical_safety, english_term, search_term, "Pas de données",
+                                            SCOUT_DEADLINES["pubchem"]), ""),
+            "trials": (get_ongoing_trials(english_term), ""),
+            "scholar": (get_influential_studies(f"{english_term} efficacy skin"), []),
+            "crossref": (get_crossref_context(f"{english_term} skin dermatology"), ("", [])),
+        }
+        # Scouts with a fallback term enforce the deadline per lookup themselves
+        self_timed = {"fda", "pubchem"}
+
+        async def timed(name, coro, default):
+            start = time.perf_counter()
+            deadline = None if name in self_timed else SCOUT_DEADLINES[name]
+            try:
+                result, status = await asyncio.wait_for(coro, timeout=deadline), "ok"
+            except asyncio.TimeoutError:
+                result, status = default, "timeout"
+            except Exception as e:
+                print(f"Warn: scout {name} failed: {e}")
+                result, status = default, "error"
+            return name, result, {"ms": round((time.perf_counter() - start) * 1000), "status": status}
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(timed(name, coro, default) for name, (coro, default) in scouts.items()))
+        results = {name: result for name, result, _ in outcomes}
+        timings = {name: timing for name, _, timing in outcomes}
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000)
+        late = [name for name, _, t in outcomes if t["status"] != "ok"]
+        print(f"[SocialAgent] ⏱️ Scouts done in {timings['total_ms']}ms" + (f" (missing: {', '.join(late)})" if late else ""))
+        return results, timings
+
     def _normalize_text(self, value: str) -> str:
         if not value: return ""
         normalized = unicodedata.normalize("NFKD", value)
@@ -234,7 +309,7 @@ class SocialContentGenerator:
             return "relachement"
         return None
         
-    def _validate_sources(self, response_data: dict) -> None:
+    async def _validate_sources(self, response_data: dict) -> None:
         """Validate PMIDs cited in annexe_sources_retenues via NCBI API."""
         sources = response_data.get("annexe_sources_retenues", [])
         if not sources:
@@ -252,7 +327,7 @@ class SocialContentGenerator:
                 s["verified"] = False
             return
 
-        validation = validate_pmids(real_pmids)
+        validation = await validate_pmids(real_pmids)
 
         verified_count = 0
         invalid_count = 0
@@ -422,69 +497,82 @@ class SocialContentGenerator:
 
         return {"efficacy": round(eff, 1), "safety": round(saf, 1)}
 
-    async def generate_social_content(self, topic: str, system_prompt: str = None, force: bool = False) -> Dict:
-        # Step 0: Check Cache (skip if force regeneration)
-        if not force:
-            async with AsyncSessionLocal() as session:
-                stmt = select(SocialGeneration).where(SocialGeneration.topic == topic).order_by(SocialGeneration.created_at.desc()).limit(1)
-                result = await session.execute(stmt)
-                cached_gen = result.scalar_one_or_none()
 
-                if cached_gen:
-                    print(f"[SocialAgent] ✅ Cache hit for: {topic}")
-                    return cached_gen.content
-        else:
-            print(f"[SocialAgent] 🔄 Force regeneration for: {topic}")
+    # ------------------------------------------------------------------
+    # Pipeline stages (outputs persisted in fiche_artifacts, see core/social/artifacts.py)
+    # ------------------------------------------------------------------
+
+    async def _stage(self, name: str, key: str, topic: str, build: Callable[[], Any],
+                     rebuild: set, trace: dict, keep: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return the stored artifact for (name, key), or build it and store it when `keep` allows."""
+        if name not in rebuild:
+            payload = await artifacts.load(name, key)
+            if payload is not None:
+                print(f"[SocialAgent] ♻️ Reusing {name} artifact")
+                trace[name] = "reused"
+                return payload
+        payload = build()
+        if inspect.isawaitable(payload):
+            payload = await payload
+        trace[name] = "built"
+        if keep is None or keep(payload):
+            await artifacts.store(name, key, topic, payload)
+        return payload
 
-        # Step 1: Check existing knowledge (RAG)
-        print(f"[SocialAgent] Checking RAG for: {topic}")
-        # Search queries adapted to the topic — one per TRS section for better coverage
-        sub_queries = [
+    @staticmethod
+    def _add_chunks(chunks: list, parts: list, seen: set, url_map: Optional[dict] = None) -> None:
+        for c in chunks:
+            chunk_id = str(c['chunk_id'])
+            if chunk_id in seen:
+                continue
+            url_line = f"\nURL: {c['url']}" if c.get('url') else ""
+            parts.append(f"Source: {c['source']}{url_line}\nContent: {c['text']}\n---")
+            seen.add(chunk_id)
+            if url_map is not None and c.get('url') and c.get('source'):
+                url_map[c['source'].lower().strip()] = c['url']
+
+    @staticmethod
+    def _corpus_queries(topic: str) -> list:
+        """Search queries adapted to the topic — one per TRS section for better coverage."""
+        return [
             f"efficacy mechanism clinical outcome {topic}",
             f"side effects safety adverse events {topic}",
             f"recovery downtime healing bruising swelling {topic}",
             f"contraindications drug interactions {topic}",
         ]
 
+    async def _retrieve_corpus(self, topic: str) -> dict:
+        """All corpus sub-queries in one embedding batch + one SQL round-trip (deduplicated)."""
+        print(f"[SocialAgent] Checking RAG for: {topic}")
+        async with jobs.stage("retrieval"):
+            return await retrieve_evidence_many(self._corpus_queries(topic), limit_per_query=10)
+
+    async def _build_corpus(self, topic: str, retrieved: dict) -> dict:
+        """Stage 'corpus': retrieved chunks, PubMed enrichment when the base is thin, sorted by study type."""
         corpus_parts = []
         seen_chunks = set()
         # Track real URLs from RAG for post-correction of LLM output
-        _source_url_map: dict[str, str] = {}  # title -> url
-
-        for q in sub_queries:
-            chunks = await retrieve_evidence(q, limit=10)
-            for c in chunks:
-                if c['chunk_id'] not in seen_chunks:
-                    url_line = f"\nURL: {c['url']}" if c.get('url') else ""
-                    corpus_parts.append(f"Source: {c['source']}{url_line}\nContent: {c['text']}\n---")
-                    seen_chunks.add(c['chunk_id'])
-                    if c.get('url') and c.get('source'):
-                        _source_url_map[c['source'].lower().strip()] = c['url']
-        
-        # Step 2: Ingest only if needed (Threshold: 3 chunks)
-        # Skip ingestion for pure Diagnostic/Recommendation if data is OK
-        # Track MeSH terms for reuse in scouts (Step 4)
-        _mesh_cache = []
+        url_map: dict[str, str] = {}  # title -> url
 
+        self._add_chunks(retrieved["chunks"], corpus_parts, seen_chunks, url_map)
+
+        # Ingest only if needed (Threshold: 3 chunks)
+        # Skip ingestion for pure Diagnostic/Recommendation if data is OK
+        # MeSH terms are kept for reuse by the scouts stage
+        mesh_terms = []
         if len(corpus_parts) < 3 and "RECOMMENDATION" not in topic:
             search_term_raw = re.sub(r'^\[.*?\]\s*', '', topic)
             print(f"[SocialAgent] 🧪 Knowledge low, enriching PubMed for: {search_term_raw}")
-            _mesh_cache = await self._expand_mesh_terms(search_term_raw)
-            if _mesh_cache:
-                print(f"[SocialAgent] 🔬 MeSH expansion: {_mesh_cache}")
-            queries = build_pubmed_queries(search_term_raw, mesh_synonyms=_mesh_cache)
+            mesh_terms = await self._expand_mesh_terms(search_term_raw)
+            if mesh_terms:
+                print(f"[SocialAgent] 🔬 MeSH expansion: {mesh_terms}")
+            queries = build_pubmed_queries(search_term_raw, mesh_synonyms=mesh_terms)
             for q in queries:
                 await ingest_pubmed_results(q)
 
             # Re-retrieve after ingestion
             new_chunks = await retrieve_evidence(f"clinical data for {topic}", limit=10)
-            for c in new_chunks:
-                if c['chunk_id'] not in seen_chunks:
-                    url_line = f"\nURL: {c['url']}" if c.get('url') else ""
-                    corpus_parts.append(f"Source: {c['source']}{url_line}\nContent: {c['text']}\n---")
-                    seen_chunks.add(c['chunk_id'])
-                    if c.get('url') and c.get('source'):
-                        _source_url_map[c['source'].lower().strip()] = c['url']
+            self._add_chunks(new_chunks, corpus_parts, seen_chunks, url_map)
 
         # Annotate and sort corpus by study type (meta-analyses first, then RCTs)
         annotated = []
@@ -494,123 +582,271 @@ class SocialContentGenerator:
             annotated.append((study_type, f"{prefix}{part}"))
         type_order = {"META": 0, "RCT": 1, "OTHER": 2}
         annotated.sort(key=lambda x: type_order[x[0]])
-        corpus_parts = [text for _, text in annotated]
 
-        corpus_text = "\n".join(corpus_parts)
+        return {
+            "parts": [text for _, text in annotated],
+            "chunk_ids": sorted(seen_chunks),
+            "url_map": url_map,
+            "mesh_terms": mesh_terms,
+        }
+
+    async def _build_scouts(self, search_term: str, mesh_terms: list) -> dict:
+        """Stage 'scouts': FDA, PubChem, trials, Scholar and CrossRef, rendered as prompt context."""
+        # Get English scientific name via MeSH expansion (APIs are English-only)
+        # Reuse MeSH terms from the corpus stage if available
+        mesh_terms = mesh_terms or await self._expand_mesh_terms(search_term)
+        english_term = mesh_terms[0] if mesh_terms else search_term
+        print(f"[SocialAgent] 🔍 Gathering specialized context for: {search_term} (EN: {english_term})")
+        if mesh_terms:
+            print(f"[SocialAgent] 🔬 MeSH expansion: {mesh_terms}")
+
+        async with jobs.stage("scouts"):
+            scouts, timings = await self._run_scouts(search_term, english_term)
+        scout_crossref, crossref_studies = scouts["crossref"]
+        url_map = {}
+        for cs in crossref_studies:
+            if cs.get('titre') and cs.get('url'):
+                url_map[cs['titre'].lower().strip()] = cs['url']
+
+        context = f"\n=== FDA ADVERSE EVENTS ===\n{scouts['fda']}\n"
+        context += f"\n=== CLINICAL TRIALS ===\n{scouts['trials']}\n"
+        context += f"\n=== CHEMICAL SAFETY ===\n{scouts['pubchem']}\n"
+        if scouts["scholar"]:
+            context += "\n=== SCHOLAR STUDIES ===\n"
+            for s in scouts["scholar"][:3]:
+                s_url = s.get('url', '')
+                context += f"- {s.get('titre')}\n  URL: {s_url}\n  {self._clean_abstract(s.get('resume'))[:300]}...\n"
+                if s.get('titre') and s_url and s_url != 'N/A':
+                    url_map[s['titre'].lower().strip()] = s_url
+        if scout_crossref:
+            context += f"\n{scout_crossref}\n"
+
+        return {
+            "search_term": search_term,
+            "english_term": english_term,
+            "fda": scouts["fda"],
+            "pubchem": scouts["pubchem"],
+            "trials": scouts["trials"],
+            "scholar": scouts["scholar"],
+            "crossref": scout_crossref,
+            "context": context,
+            "url_map": url_map,
+            "timings": timings,
+        }
+
+    async def _build_coherence(self, corpus: dict, scouts: dict) -> dict:
+        """Stage 'coherence': English scoring corpus for the TRS and cross-source contradiction report."""
+        corpus_parts = corpus["parts"]
+        english_term = scouts["english_term"]
+        # Build a scoring corpus using English queries so methodology
+        # keywords (meta-analysis, RCT, recovery) are actually found.
+        # corpus_parts uses the French topic which may miss English chunks.
+        scoring_parts = list(corpus_parts)  # start with FR corpus, then enrich
+        if english_term and english_term.lower() != scouts["search_term"].lower():
+            scoring_queries = [
+                f"meta-analysis systematic review {english_term}",
+                f"randomized controlled trial efficacy {english_term}",
+                f"recovery downtime healing {english_term}",
+                f"drug interactions contraindications {english_term}",
+            ]
+            extra = await retrieve_evidence_many(scoring_queries, limit_per_query=10)
+            self._add_chunks(extra["chunks"], scoring_parts, set(corpus["chunk_ids"]))
+            print(f"[SocialAgent] 📊 Scoring corpus: {len(scoring_parts)} chunks ({len(scoring_parts)-len(corpus_parts)} EN added for TRS)")
+
+        preliminary_meta = self._build_evidence_metadata(
+            scouts["fda"], scouts["trials"], scouts["scholar"], scoring_parts, scouts["pubchem"],
+            has_crossref=bool(scouts["crossref"])
+        )
+        sc = preliminary_meta.get("section_confidence", {})
+        print(f"[SocialAgent] 📊 TRS debug — meta:{sum(1 for p in scoring_parts if 'meta-anal' in p.lower() or 'systematic review' in p.lower())} rct:{sum(1 for p in scoring_parts if 'randomized controlled' in p.lower() or '[rct]' in p.lower())} safety:{sum(1 for p in scoring_parts if any(k in p.lower() for k in ['safety','adverse','side effect']))} recovery:{sum(1 for p in scoring_parts if any(k in p.lower() for k in ['recovery','downtime','healing']))} interaction:{sum(1 for p in scoring_parts if 'interaction' in p.lower() or 'contraindication' in p.lower())}")
+        print(f"[SocialAgent] 📊 TRS sections — eff:{sc.get('efficacite',{}).get('score')} sec:{sc.get('securite',{}).get('score')} rec:{sc.get('recuperation',{}).get('score')} int:{sc.get('interactions',{}).get('score')} → TRS:{preliminary_meta.get('trs_score')}")
+        report = self._cross_validate(preliminary_meta, corpus_parts, scouts["trials"])
+        if report.get("flags"):
+            print(f"[SocialAgent] 🔍 Coherence flags: {report['flags']}")
+        return {"scoring_parts": scoring_parts, "report": report}
+
+    def _build_prompt(self, topic: str, system_prompt: str, user_template: str, kb_context: str,
+                      corpus: dict, scouts: dict, coherence: dict) -> dict:
+        """Stage 'prompt': the final system/user prompts."""
+        corpus_text = "\n".join(corpus["parts"])
         if not corpus_text:
             corpus_text = "Aucune donnée scientifique spécifique trouvée dans la base. Utilise tes connaissances expertes générales."
 
-        # Step 3: Retrieve catalog procedures (Structured context)
-        context_procedures = []
-        async with AsyncSessionLocal() as session:
-            result_db = await session.execute(select(Procedure))
-            procedures = result_db.scalars().all()
-            for p in procedures:
-                context_procedures.append(f"- Name: {p.name}\n  Desc: {p.description}\n  Downtime: {p.downtime}\n  Price: {p.price_range}")
-        
-        kb_context = "\n".join(context_procedures) if context_procedures else "AUCUNE PROCÉDURE STRUCTUREE DANS LE CATALOGUE."
+        specialized_context = scouts.get("context", "")
+        flags = coherence.get("report", {}).get("flags")
+        if flags:
+            specialized_context += "\n=== COHERENCE ALERTS ===\n"
+            for flag in flags:
+                specialized_context += f"- ALERT: {flag}\n"
+            specialized_context += "Prends en compte ces alertes dans ton verdict.\n"
 
-        # Step 4: Specialized Scouts (Scraping FDA, Trials, etc.)
-        # We only do this for FICHE mode to keep it rich
-        specialized_context = ""
+        user_prompt = user_template.format(
+            topic=topic,
+            corpus_text=f"{corpus_text}\n{specialized_context}\n\n=== CATALOGUE DE PROCEDURES ===\n{kb_context}"
+        )
+        return {"system_prompt": system_prompt, "user_prompt": user_prompt}
+
+    @staticmethod
+    def _is_valid_output(response_data: Any, is_recommendation: bool) -> bool:
+        if not isinstance(response_data, dict):
+            return False
+        if is_recommendation:
+            return "recommendations" in response_data
+        try:
+            # Internal validation against schema
+            FicheMaster(**response_data)
+            return True
+        except Exception as ve:
+            print(f"Warn: LLM output failed schema validation: {ve}")
+            return False
+
+    async def _post_process(self, topic: str, response_data: dict, corpus: dict, scouts: dict, coherence: dict) -> dict:
+        """Stage 'post': evidence metadata, safety warnings, PMID/URL checks and formulaic scores."""
+        response_data = copy.deepcopy(response_data)
+        scout_chem = scouts.get("pubchem", "")
+
+        # Attach evidence_metadata
+        # Use scoring_parts (FR + EN enriched) for accurate TRS calculation
+        _scoring = coherence.get("scoring_parts") or corpus["parts"]
+        response_data["evidence_metadata"] = self._build_evidence_metadata(
+            scouts.get("fda", ""), scouts.get("trials", ""), scouts.get("scholar", []), _scoring, scout_chem,
+            has_crossref=bool(scouts.get("crossref"))
+        )
+        # Attach coherence report from cross-validation
+        if coherence.get("report"):
+            response_data["evidence_metadata"]["coherence_report"] = coherence["report"]
+        if scouts.get("timings"):
+            response_data["evidence_metadata"]["scout_timings"] = scouts["timings"]
+
+        # Attach safety_warnings from rules engine
+        try:
+            engine = RulesEngine()
+            zones = (response_data.get("meta") or {}).get("zones_concernees", [])
+            wt = self._infer_wrinkle_type(scouts.get("search_term") or topic)
+
+            # Evaluate rules against ALL zones (not just the first)
+            all_warnings = []
+            seen_keys = set()
+            for z in zones:
+                normalized = self._normalize_zone(z)
+                context = {"area": normalized}
+                if wt:
+                    context["wrinkle_type"] = wt
+                for w in engine.evaluate(context):
+                    if w.key not in seen_keys:
+                        all_warnings.append(w)
+                        seen_keys.add(w.key)
+
+            # Also evaluate with just wrinkle_type (no zone) for transversal rules
+            if wt and not zones:
+                for w in engine.evaluate({"wrinkle_type": wt}):
+                    if w.key not in seen_keys:
+                        all_warnings.append(w)
+                        seen_keys.add(w.key)
+
+            if all_warnings:
+                response_data["safety_warnings"] = [w.dict() for w in all_warnings]
+                print(f"[SocialAgent] ⚠️ {len(all_warnings)} safety warnings attached")
+        except Exception as e:
+            print(f"Warn: Rules engine failed: {e}")
+
+        # Validate PMIDs in cited sources
+        try:
+            await self._validate_sources(response_data)
+        except Exception as e:
+            print(f"Warn: PMID validation failed: {e}")
+
+        # Fix source URLs using real URLs from corpus/scouts
+        try:
+            self._fix_source_urls(response_data, {**corpus["url_map"], **scouts.get("url_map", {})})
+        except Exception as e:
+            print(f"Warn: URL fix failed: {e}")
+
+        # Override LLM scores with formulaic calculation
+        try:
+            scores = self._calculate_scores(
+                response_data.get("evidence_metadata", {}),
+                response_data.get("safety_warnings", []),
+                topic,
+                scout_chem,
+            )
+            response_data["score_global"]["note_efficacite_sur_10"] = scores["efficacy"]
+            response_data["score_global"]["note_securite_sur_10"] = scores["safety"]
+            response_data.setdefault("evidence_metadata", {})["score_method"] = "formulaic_v1"
+            print(f"[SocialAgent] 📊 Formulaic scores: efficacy={scores['efficacy']}, safety={scores['safety']}")
+        except Exception as e:
+            print(f"Warn: Formulaic scoring failed: {e}")
+
+        return response_data
+
+    async def generate_social_content(self, topic: str, system_prompt: str = None, force: bool = False,
+                                      rebuild_from: Optional[str] = None) -> Dict:
+        """
+        Run the fiche pipeline: corpus -> scouts -> coherence -> prompt -> llm -> post.
+
+        Stages whose inputs are unchanged are loaded from fiche_artifacts instead
+        of recomputed. `force` skips the stored fiche and re-runs the LLM call;
+        `rebuild_from` re-runs that stage and everything after it (e.g. "corpus"
+        for a full refresh).
+        """
+        rebuild = set(artifacts.stages_from(rebuild_from or ("llm" if force else None)))
+
+        # Step 0: Check Cache (skip if force regeneration)
+        if not force and not rebuild_from:
+            async with AsyncSessionLocal() as session:
+                stmt = select(SocialGeneration).where(SocialGeneration.topic == topic).order_by(SocialGeneration.created_at.desc()).limit(1)
+                result = await session.execute(stmt)
+                cached_gen = result.scalar_one_or_none()
+
+                if cached_gen:
+                    print(f"[SocialAgent] ✅ Cache hit for: {topic}")
+                    return cached_gen.content
+        else:
+            print(f"[SocialAgent] 🔄 Force regeneration for: {topic} (rebuilding: {', '.join(s for s in artifacts.STAGES if s in rebuild)})")
+
+        trace: dict = {}
         is_recommendation = (system_prompt == RECOMMENDATION_SYSTEM_PROMPT or "[RECOMMENDATION]" in topic)
 
-        # Store raw scout results for evidence_metadata
-        scout_fda = ""
-        scout_trials = ""
-        scout_chem = ""
-        scoring_parts = []  # English-enriched corpus used only for TRS scoring
-        scout_scholar: list = []
-        scout_crossref = ""
+        # Step 1: Corpus — RAG retrieval (+ PubMed enrichment if the knowledge base is thin).
+        # Keyed on the chunks retrieved for this topic, so only ingestion that
+        # changes them rebuilds the corpus (and, through its hash, what follows).
+        retrieved = await self._retrieve_corpus(topic)
+        corpus = await self._stage(
+            "corpus", artifacts.input_hash("corpus", topic, [str(c["chunk_id"]) for c in retrieved["chunks"]]), topic,
+            lambda: self._build_corpus(topic, retrieved), rebuild, trace,
+        )
 
+        # Step 2: Specialized Scouts (Scraping FDA, Trials, etc.)
+        # We only do this for FICHE mode to keep it rich
+        scouts: dict = {}
+        coherence: dict = {}
         if not is_recommendation:
             # Strip mode prefixes ([SOCIAL], [DIAGNOSTIC], etc.) for clean scout queries
             search_term = re.sub(r'^\[.*?\]\s*', '', topic)
-
-            # Get English scientific name via MeSH expansion (APIs are English-only)
-            # Reuse cached MeSH terms from Step 2 if available
-            mesh_terms = _mesh_cache if _mesh_cache else await self._expand_mesh_terms(search_term)
-            english_term = mesh_terms[0] if mesh_terms else search_term
-            print(f"[SocialAgent] 🔍 Gathering specialized context for: {search_term} (EN: {english_term})")
-            if mesh_terms:
-                print(f"[SocialAgent] 🔬 MeSH expansion: {mesh_terms}")
-
             try:
-                # FDA uses brand names (botox, restylane) — try original term first, fall back to MeSH
-                scout_fda = get_fda_adverse_events(search_term)
-                if "Aucune donnée" in scout_fda and english_term != search_term:
-                    scout_fda = get_fda_adverse_events(english_term)
-                # PubChem: try MeSH term first, fall back to original (handles French names)
-                scout_chem = get_chemical_safety(english_term)
-                if "Pas de données" in scout_chem and english_term != search_term:
-                    scout_chem = get_chemical_safety(search_term)
-                scout_trials = get_ongoing_trials(english_term)
-                scout_scholar = get_influential_studies(f"{english_term} efficacy skin")
-                scout_crossref, crossref_studies = get_crossref_context(f"{english_term} skin dermatology")
-                for cs in crossref_studies:
-                    if cs.get('titre') and cs.get('url'):
-                        _source_url_map[cs['titre'].lower().strip()] = cs['url']
-
-                specialized_context = f"\n=== FDA ADVERSE EVENTS ===\n{scout_fda}\n"
-                specialized_context += f"\n=== CLINICAL TRIALS ===\n{scout_trials}\n"
-                specialized_context += f"\n=== CHEMICAL SAFETY ===\n{scout_chem}\n"
-                if scout_scholar:
-                    specialized_context += "\n=== SCHOLAR STUDIES ===\n"
-                    for s in scout_scholar[:3]:
-                        s_url = s.get('url', '')
-                        specialized_context += f"- {s.get('titre')}\n  URL: {s_url}\n  {self._clean_abstract(s.get('resume'))[:300]}...\n"
-                        if s.get('titre') and s_url and s_url != 'N/A':
-                            _source_url_map[s['titre'].lower().strip()] = s_url
-                if scout_crossref:
-                    specialized_context += f"\n{scout_crossref}\n"
+                scouts = await self._stage(
+                    "scouts", artifacts.input_hash("scouts", search_term, corpus["mesh_terms"]), topic,
+                    lambda: self._build_scouts(search_term, corpus["mesh_terms"]), rebuild, trace,
+                    # A timed-out or failed scout would pin an empty section until the TTL
+                    keep=lambda p: all(t.get("status") == "ok" for t in p["timings"].values() if isinstance(t, dict)),
+                )
             except Exception as e:
                 print(f"Warn: Specialized scouts failed: {e}")
 
-        # Step 4b: Cross-validate sources for coherence
-        coherence_report = {}
-        if not is_recommendation and specialized_context:
+        # Step 3: Cross-validate sources for coherence
+        if scouts:
             try:
-                # Build a scoring corpus using English queries so methodology
-                # keywords (meta-analysis, RCT, recovery) are actually found.
-                # corpus_parts uses the French topic which may miss English chunks.
-                scoring_parts = list(corpus_parts)  # start with FR corpus, then enrich
-                if english_term and english_term.lower() != re.sub(r'^\[.*?\]\s*', '', topic).lower():
-                    scoring_queries = [
-                        f"meta-analysis systematic review {english_term}",
-                        f"randomized controlled trial efficacy {english_term}",
-                        f"recovery downtime healing {english_term}",
-                        f"drug interactions contraindications {english_term}",
-                    ]
-                    seen_scoring = set(seen_chunks)
-                    for q in scoring_queries:
-                        extra = await retrieve_evidence(q, limit=10)
-                        for c in extra:
-                            if c['chunk_id'] not in seen_scoring:
-                                url_line = f"\nURL: {c['url']}" if c.get('url') else ""
-                                scoring_parts.append(f"Source: {c['source']}{url_line}\nContent: {c['text']}\n---")
-                                seen_scoring.add(c['chunk_id'])
-                    print(f"[SocialAgent] 📊 Scoring corpus: {len(scoring_parts)} chunks ({len(scoring_parts)-len(corpus_parts)} EN added for TRS)")
-
-                preliminary_meta = self._build_evidence_metadata(
-                    scout_fda, scout_trials, scout_scholar, scoring_parts, scout_chem,
-                    has_crossref=bool(scout_crossref)
+                coherence = await self._stage(
+                    "coherence",
+                    artifacts.input_hash("coherence", artifacts.content_hash(corpus), artifacts.content_hash(scouts)),
+                    topic, lambda: self._build_coherence(corpus, scouts), rebuild, trace,
                 )
-                sc = preliminary_meta.get("section_confidence", {})
-                print(f"[SocialAgent] 📊 TRS debug — meta:{sum(1 for p in scoring_parts if 'meta-anal' in p.lower() or 'systematic review' in p.lower())} rct:{sum(1 for p in scoring_parts if 'randomized controlled' in p.lower() or '[rct]' in p.lower())} safety:{sum(1 for p in scoring_parts if any(k in p.lower() for k in ['safety','adverse','side effect']))} recovery:{sum(1 for p in scoring_parts if any(k in p.lower() for k in ['recovery','downtime','healing']))} interaction:{sum(1 for p in scoring_parts if 'interaction' in p.lower() or 'contraindication' in p.lower())}")
-                print(f"[SocialAgent] 📊 TRS sections — eff:{sc.get('efficacite',{}).get('score')} sec:{sc.get('securite',{}).get('score')} rec:{sc.get('recuperation',{}).get('score')} int:{sc.get('interactions',{}).get('score')} → TRS:{preliminary_meta.get('trs_score')}")
-                coherence_report = self._cross_validate(preliminary_meta, corpus_parts, scout_trials)
-                if coherence_report.get("flags"):
-                    print(f"[SocialAgent] 🔍 Coherence flags: {coherence_report['flags']}")
-                    specialized_context += "\n=== COHERENCE ALERTS ===\n"
-                    for flag in coherence_report["flags"]:
-                        specialized_context += f"- ALERT: {flag}\n"
-                    specialized_context += "Prends en compte ces alertes dans ton verdict.\n"
             except Exception as e:
                 print(f"Warn: Cross-validation failed: {e}")
 
-        # Step 5: Determine Template & System Prompt
+        # Step 4: Determine Template & System Prompt, with the catalog procedures as structured context
         is_social = "[SOCIAL]" in topic
-        
+
         if is_recommendation:
             system_prompt = RECOMMENDATION_SYSTEM_PROMPT
             user_template = RECOMMENDATION_USER_PROMPT_TEMPLATE
@@ -622,119 +858,69 @@ class SocialContentGenerator:
             system_prompt = APP_SYSTEM_PROMPT
             user_template = APP_USER_PROMPT_TEMPLATE
 
-        user_prompt = user_template.format(
-            topic=topic,
-            corpus_text=f"{corpus_text}\n{specialized_context}\n\n=== CATALOGUE DE PROCEDURES ===\n{kb_context}"
+        context_procedures = []
+        async with AsyncSessionLocal() as session:
+            result_db = await session.execute(select(Procedure))
+            procedures = result_db.scalars().all()
+            for p in procedures:
+                context_procedures.append(f"- Name: {p.name}\n  Desc: {p.description}\n  Downtime: {p.downtime}\n  Price: {p.price_range}")
+
+        kb_context = "\n".join(context_procedures) if context_procedures else "AUCUNE PROCÉDURE STRUCTUREE DANS LE CATALOGUE."
+
+        upstream = [artifacts.content_hash(corpus), artifacts.content_hash(scouts), artifacts.content_hash(coherence)]
+        prompt = await self._stage(
+            "prompt",
+            artifacts.input_hash("prompt", topic, system_prompt, user_template, kb_context, *upstream),
+            topic,
+            lambda: self._build_prompt(topic, system_prompt, user_template, kb_context, corpus, scouts, coherence),
+            rebuild, trace,
         )
-        
+
         print(f"[SocialAgent] 🧠 Generating with LLM (gpt-4o)... Mode: {'Recs' if is_recommendation else 'Fiche'}")
         try:
-            response_data = await self.llm.generate_response(
-                system_prompt=system_prompt,
-                user_content=user_prompt,
-                model_override="gpt-4o",
-                json_mode=True
-            )
-            
-            # Step 6: Cache & Return
-            # We cache if it's a valid response
-            is_valid = False
-            if isinstance(response_data, dict):
-                if is_recommendation and "recommendations" in response_data:
-                    is_valid = True
-                elif not is_recommendation:
-                    try:
-                        # Internal validation against schema
-                        FicheMaster(**response_data)
-                        is_valid = True
-                    except Exception as ve:
-                        print(f"Warn: LLM output failed schema validation: {ve}")
-                        is_valid = False
-
-            # Step 6a: Attach evidence_metadata (for fiches only)
-            if is_valid and not is_recommendation and isinstance(response_data, dict):
-                # Use scoring_parts (FR + EN enriched) for accurate TRS calculation
-                _scoring = scoring_parts if scoring_parts else corpus_parts
-                response_data["evidence_metadata"] = self._build_evidence_metadata(
-                    scout_fda, scout_trials, scout_scholar, _scoring, scout_chem,
-                    has_crossref=bool(scout_crossref)
-                )
-                # Attach coherence report from cross-validation
-                if coherence_report:
-                    response_data["evidence_metadata"]["coherence_report"] = coherence_report
-
-            # Step 6b: Attach safety_warnings from rules engine (for fiches only)
-            if is_valid and not is_recommendation and isinstance(response_data, dict):
-                try:
-                    engine = RulesEngine()
-                    zones = (response_data.get("meta") or {}).get("zones_concernees", [])
-                    wt = self._infer_wrinkle_type(search_term if 'search_term' in dir() else topic)
-
-                    # Evaluate rules against ALL zones (not just the first)
-                    all_warnings = []
-                    seen_keys = set()
-                    for z in zones:
-                        normalized = self._normalize_zone(z)
-                        context = {"area": normalized}
-                        if wt:
-                            context["wrinkle_type"] = wt
-                        for w in engine.evaluate(context):
-                            if w.key not in seen_keys:
-                                all_warnings.append(w)
-                                seen_keys.add(w.key)
-
-                    # Also evaluate with just wrinkle_type (no zone) for transversal rules
-                    if wt and not zones:
-                        for w in engine.evaluate({"wrinkle_type": wt}):
-                            if w.key not in seen_keys:
-                                all_warnings.append(w)
-                                seen_keys.add(w.key)
-
-                    if all_warnings:
-                        response_data["safety_warnings"] = [w.dict() for w in all_warnings]
-                        print(f"[SocialAgent] ⚠️ {len(all_warnings)} safety warnings attached")
-                except Exception as e:
-                    print(f"Warn: Rules engine failed: {e}")
-
-            # Step 6c: Validate PMIDs in cited sources
-            if is_valid and not is_recommendation and isinstance(response_data, dict):
-                try:
-                    self._validate_sources(response_data)
-                except Exception as e:
-                    print(f"Warn: PMID validation failed: {e}")
-
-            # Step 6c2: Fix source URLs using real URLs from corpus/scouts
-            if is_valid and not is_recommendation and isinstance(response_data, dict):
-                try:
-                    self._fix_source_urls(response_data, _source_url_map)
-                except Exception as e:
-                    print(f"Warn: URL fix failed: {e}")
-
-            # Step 6d: Override LLM scores with formulaic calculation
-            if is_valid and not is_recommendation and isinstance(response_data, dict):
-                try:
-                    scores = self._calculate_scores(
-                        response_data.get("evidence_metadata", {}),
-                        response_data.get("safety_warnings", []),
-                        topic,
-                        scout_chem,
+            # Step 5: LLM — only schema-valid outputs are kept, so a rejected answer is retried next run
+            async def call_llm():
+                async with jobs.stage("llm"):
+                    return await self.llm.generate_response(
+                        system_prompt=prompt["system_prompt"],
+                        user_content=prompt["user_prompt"],
+                        model_override="gpt-4o",
+                        json_mode=True
                     )
-                    response_data["score_global"]["note_efficacite_sur_10"] = scores["efficacy"]
-                    response_data["score_global"]["note_securite_sur_10"] = scores["safety"]
-                    response_data.setdefault("evidence_metadata", {})["score_method"] = "formulaic_v1"
-                    print(f"[SocialAgent] 📊 Formulaic scores: efficacy={scores['efficacy']}, safety={scores['safety']}")
-                except Exception as e:
-                    print(f"Warn: Formulaic scoring failed: {e}")
 
+            validity = {"ok": True}  # stored answers were validated when built
+
+            def check(response):
+                validity["ok"] = self._is_valid_output(response, is_recommendation)
+                return validity["ok"]
+
+            llm_key = artifacts.input_hash("llm", artifacts.content_hash(prompt), "gpt-4o")
+            response_data = await self._stage("llm", llm_key, topic, call_llm, rebuild, trace, keep=check)
+            is_valid = validity["ok"]
+
+            # Step 6: Post-processing (fiches only)
+            if is_valid and not is_recommendation:
+                response_data = await self._stage(
+                    "post", artifacts.input_hash("post", artifacts.content_hash(response_data), topic, *upstream), topic,
+                    lambda: self._post_process(topic, response_data, corpus, scouts, coherence), rebuild, trace,
+                )
+                response_data = copy.deepcopy(response_data)
+                response_data["evidence_metadata"]["pipeline"] = trace
+            print(f"[SocialAgent] 🧩 Stages: {', '.join(f'{s}={v}' for s, v in trace.items())}")
+
+            # Step 7: Cache & Return
+            # We cache if it's a valid response
             if is_valid:
                 print(f"[SocialAgent] 💾 Caching result for: {topic}")
                 async with AsyncSessionLocal() as session:
-                    new_gen = SocialGeneration(topic=topic, content=response_data, status="draft")
+                    kind, name = split_topic(topic)
+                    new_gen = SocialGeneration(topic=topic, kind=kind, slug=make_slug(name), content=response_data, status="draft")
                     session.add(new_gen)
                     await session.commit()
+                    cache_versions.bump(cache_versions.FICHES)
 
             return response_data
-            
+
         except Exception as e:
             print(f"❌ Social Generation Failed: {e}")
             return {"error": str(e)}
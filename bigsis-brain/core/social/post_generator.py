@@ -15,7 +15,7 @@ import logging
 from typing import Dict, Any, List, Optional
 
 from core.llm_client import LLMClient
-from core.rag.retriever import retrieve_evidence
+from core.rag.retriever import retrieve_evidence, retrieve_evidence_many
 from core.prompts.social_posts import (
     VERDICT_SYSTEM_PROMPT, VERDICT_USER_TEMPLATE,
     VRAI_FAUX_SYSTEM_PROMPT, VRAI_FAUX_USER_TEMPLATE,
@@ -207,19 +207,25 @@ class SocialPostGenerator:
         seen_ids: set = set()
         all_chunks: List[dict] = []
 
-        for query_template in queries:
-            query = query_template.format(proc=procedure_name)
-            try:
-                chunks = await retrieve_evidence(query, limit=5)
-                for c in chunks:
-                    cid = c.get("chunk_id", "")
-                    if cid and cid not in seen_ids:
-                        seen_ids.add(cid)
-                        c["study_type"] = self._classify_study_type(c.get("text", ""))
-                        all_chunks.append(c)
-            except Exception as e:
-                logger.warning(f"RAG retrieval failed for query '{query[:60]}': {e}")
-                continue
+        formatted = [q.format(proc=procedure_name) for q in queries]
+        retrieved: List[dict] = []
+        try:
+            retrieved = (await retrieve_evidence_many(formatted, limit_per_query=5))["chunks"]
+        except Exception as e:
+            # One bad query fails the whole batch: retry them one by one
+            logger.warning(f"RAG retrieval failed for query batch for '{procedure_name}', retrying per query: {e}")
+            for query in formatted:
+                try:
+                    retrieved.extend(await retrieve_evidence(query, limit=5))
+                except Exception as e:
+                    logger.warning(f"RAG retrieval failed for query '{query[:60]}': {e}")
+
+        for c in retrieved:
+            cid = c.get("chunk_id", "")
+            if cid and cid not in seen_ids:
+                seen_ids.add(cid)
+                c["study_type"] = self._classify_study_type(c.get("text", ""))
+                all_chunks.append(c)
 
         # Sort: META first, then RCT, then OTHER
         type_order = {"META": 0, "RCT": 1, "OTHER": 2}
@@ -0,0 +1,250 @@
+"""
+Read-through cache for scout results (OpenFDA, PubChem, ClinicalTrials.gov,
+Semantic Scholar, CrossRef).
+
+    @cached_scout("fda")
+    async def get_fda_adverse_events(query: str) -> str: ...
+
+Entries are keyed by (source, normalized query + extra arguments) and kept in
+two tiers: an in-process LRU and the Postgres `scout_cache` table, so batch
+runs and restarts reuse earlier lookups.
+
+Freshness per source (SCOUT_CACHE_TTLS, overridable with
+SCOUT_CACHE_TTL_<SOURCE> in seconds). Past its TTL an entry is still served
+for up to SCOUT_CACHE_STALE_FACTOR x TTL while one background task refreshes
+it (stale-while-revalidate); beyond that the caller waits for a fresh fetch.
+Concurrent misses for the same key share one upstream call.
+
+Empty / "no data" answers are cached for SCOUT_CACHE_NEGATIVE_TTL only, since
+the sources report network failures the same way. Explicit error strings
+are never stored.
+"""
+
+import asyncio
+import copy
+import functools
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from core.db.database import AsyncSessionLocal
+from core.db.models import ScoutCache
+from core.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 3600
+
+
+def _ttl(source: str, default: float) -> float:
+    return float(os.getenv(f"SCOUT_CACHE_TTL_{source.upper()}", str(default)))
+
+
+SCOUT_CACHE_TTLS = {
+    "fda": _ttl("fda", 7 * DAY),
+    "trials": _ttl("trials", 1 * DAY),
+    "pubchem": _ttl("pubchem", 30 * DAY),
+    "scholar": _ttl("scholar", 7 * DAY),
+    "crossref": _ttl("crossref", 7 * DAY),
+}
+STALE_FACTOR = float(os.getenv("SCOUT_CACHE_STALE_FACTOR", "1"))
+NEGATIVE_TTL = float(os.getenv("SCOUT_CACHE_NEGATIVE_TTL", "3600"))
+DB_ENABLED = os.getenv("SCOUT_CACHE_DB", "1") not in ("0", "false", "False")
+MEMORY_MAX_ENTRIES = int(os.getenv("SCOUT_CACHE_MEMORY_SIZE", "1000"))
+
+# (source, query_key) -> (expires_at, stale_until, value)
+_memory = LRUCache(MEMORY_MAX_ENTRIES)
+_inflight: Dict[tuple, asyncio.Task] = {}  # shared upstream fetches
+_refreshing: Dict[tuple, asyncio.Task] = {}  # strong refs to background refreshes
+_counters: Dict[str, Dict[str, int]] = {}
+
+
+def normalize_query(query: str) -> str:
+    """Case-, accent- and whitespace-insensitive form of a scout query."""
+    text = unicodedata.normalize("NFKD", query or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _count(source: str, outcome: str) -> None:
+    entry = _counters.setdefault(source, {"hits": 0, "stale": 0, "misses": 0, "stored": 0, "errors": 0})
+    entry[outcome] += 1
+
+
+def _is_error(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith("Erreur")
+
+
+def _is_negative(value: Any) -> bool:
+    if not value:
+        return True
+    if isinstance(value, (list, tuple)):
+        return not any(value)
+    if isinstance(value, str):
+        return any(marker in value for marker in ("Aucune", "Pas de données", "pas de données"))
+    return False
+
+
+async def _load(source: str, key: str) -> Optional[tuple]:
+    entry = _memory.get((source, key))
+    if entry is not None or not DB_ENABLED:
+        return entry
+    try:
+        async with AsyncSessionLocal() as session:
+            row = (await session.execute(
+                select(ScoutCache.result, ScoutCache.expires_at)
+                .where(ScoutCache.source == source, ScoutCache.query_key == key)
+            )).first()
+            if row is None:
+                return None
+            await session.execute(
+                update(ScoutCache)
+                .where(ScoutCache.source == source, ScoutCache.query_key == key)
+                .values(hit_count=ScoutCache.hit_count + 1)
+            )
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Scout cache lookup failed (continuing without): {e}")
+        return None
+    ttl = NEGATIVE_TTL if _is_negative(row.result) else SCOUT_CACHE_TTLS[source]
+    entry = (row.expires_at, row.expires_at + timedelta(seconds=ttl * STALE_FACTOR), row.result)
+    _memory.set((source, key), entry)
+    return entry
+
+
+async def _store(source: str, key: str, value: Any) -> None:
+    ttl = NEGATIVE_TTL if _is_negative(value) else SCOUT_CACHE_TTLS[source]
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    stale_until = expires_at + timedelta(seconds=ttl * STALE_FACTOR)
+    _memory.set((source, key), (expires_at, stale_until, copy.deepcopy(value)))
+    _count(source, "stored")
+    if not DB_ENABLED:
+        return
+    try:
+        async with AsyncSessionLocal() as session:
+            stmt = pg_insert(ScoutCache).values(source=source, query_key=key, result=value, expires_at=expires_at)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["source", "query_key"],
+                set_={"result": stmt.excluded.result, "expires_at": stmt.excluded.expires_at, "fetched_at": datetime.now(timezone.utc)},
+            )
+            await session.execute(stmt)
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Scout cache write failed (continuing without): {e}")
+
+
+async def _run_fetch(source: str, key: str, fetch: Callable) -> Any:
+    try:
+        value = await fetch()
+        if _is_error(value):
+            _count(source, "errors")
+        else:
+            await _store(source, key, value)
+        return value
+    finally:
+        _inflight.pop((source, key), None)
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    if not task.cancelled():
+        task.exception()  # avoid "never retrieved" warnings when every caller gave up
+
+
+async def _fetch(source: str, key: str, fetch: Callable) -> Any:
+    """Call the source once per key at a time; concurrent callers share the result.
+
+    The upstream call runs in a task owned by the cache: a caller that is
+    cancelled or times out only stops waiting, the fetch carries on for the others.
+    """
+    task = _inflight.get((source, key))
+    if task is None:
+        task = asyncio.create_task(_run_fetch(source, key, fetch))
+        task.add_done_callback(_retrieve_exception)
+        _inflight[(source, key)] = task
+    return copy.deepcopy(await asyncio.shield(task))
+
+
+async def _refresh(source: str, key: str, fetch: Callable) -> None:
+    try:
+        await _fetch(source, key, fetch)
+    except Exception as e:
+        logger.warning(f"Scout cache refresh failed for {source}:{key}: {e}")
+    finally:
+        _refreshing.pop((source, key), None)
+
+
+def cached_scout(source: str):
+    """Decorate an async scout `fn(query, *args)` with the read-through cache."""
+    if source not in SCOUT_CACHE_TTLS:
+        raise ValueError(f"No TTL configured for scout source '{source}'")
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(query: str, *args, **kwargs):
+            key = normalize_query(query)
+            extra = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in sorted(kwargs.items())]
+            if extra:
+                key += "|" + ",".join(extra)
+            fetch = functools.partial(fn, query, *args, **kwargs)
+
+            entry = await _load(source, key)
+            if entry is not None:
+                expires_at, stale_until, value = entry
+                now = datetime.now(timezone.utc)
+                if now < expires_at:
+                    _count(source, "hits")
+                    return copy.deepcopy(value)
+                if now < stale_until:
+                    _count(source, "stale")
+                    if (source, key) not in _refreshing:
+                        _refreshing[(source, key)] = asyncio.create_task(_refresh(source, key, fetch))
+                    return copy.deepcopy(value)
+
+            _count(source, "misses")
+            return copy.deepcopy(await _fetch(source, key, fetch))
+
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
+
+
+async def invalidate(source: Optional[str] = None, query: Optional[str] = None) -> int:
+    """Drop cached results for a source and/or query (all when both are None). Returns DB rows deleted."""
+    key = normalize_query(query) if query else None
+
+    def matches(s: str, k: str) -> bool:
+        return (source is None or s == source) and (key is None or k == key or k.startswith(key + "|"))
+
+    for cache_key in _memory.keys():
+        if matches(*cache_key):
+            _memory.pop(cache_key)
+
+    if not DB_ENABLED:
+        return 0
+    stmt = delete(ScoutCache)
+    if source:
+        stmt = stmt.where(ScoutCache.source == source)
+    if key:
+        # Scout queries can contain % and _: match them literally, not as LIKE wildcards
+        stmt = stmt.where((ScoutCache.query_key == key) | ScoutCache.query_key.startswith(key + "|", autoescape=True))
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(stmt)
+        await session.commit()
+    return result.rowcount or 0
+
+
+def cache_stats() -> dict:
+    return {
+        "ttl_s": SCOUT_CACHE_TTLS,
+        "stale_factor": STALE_FACTOR,
+        "negative_ttl_s": NEGATIVE_TTL,
+        "by_source": {source: dict(c) for source, c in _counters.items()},
+        "memory": _memory.stats(),
+        "db": {"enabled": DB_ENABLED},
+    }
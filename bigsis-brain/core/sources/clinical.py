@@ -1,9 +1,9 @@
-import requests
-import time
+from core import http_client
+from core.sources.cache import cached_scout
 
-_TRIALS_DELAY = 0.3  # ClinicalTrials.gov — polite delay
 
-def get_ongoing_trials(query: str) -> str:
+@cached_scout("trials")
+async def get_ongoing_trials(query: str) -> str:
     """
     Interroge ClinicalTrials.gov pour voir les études actives.
     Permet à Big Sis de dire : "La science est encore en train de chercher..."
@@ -19,8 +19,7 @@ def get_ongoing_trials(query: str) -> str:
     }
 
     try:
-        time.sleep(_TRIALS_DELAY)
-        resp = requests.get(url, params=params, timeout=15)
+        resp = await http_client.get(url, params=params)
         data = resp.json()
         
         if "studies" not in data or not data["studies"]:
@@ -1,12 +1,13 @@
-import requests
 import re
-import time
 from typing import List, Dict
 
-from core.rag.ingestion import ingest_document
+from core import http_client
+from core.sources.cache import cached_scout
+from core.rag.ingestion import ingest_documents_bulk
 
 
-def get_crossref_studies(query: str, max_results: int = 5, from_year: int = 2010) -> List[Dict]:
+@cached_scout("crossref")
+async def get_crossref_studies(query: str, max_results: int = 5, from_year: int = 2010) -> List[Dict]:
     """
     Search CrossRef API for peer-reviewed articles (covers Wiley, Elsevier, Springer, etc.).
     Returns structured study data compatible with the pipeline.
@@ -31,8 +32,7 @@ def get_crossref_studies(query: str, max_results: int = 5, from_year: int = 2010
     without_abstract = []
 
     try:
-        time.sleep(0.5)
-        resp = requests.get(base_url, params=params, headers=headers, timeout=15)
+        resp = await http_client.get(base_url, params=params, headers=headers)
 
         if resp.status_code != 200:
             print(f"CrossRef API returned {resp.status_code}")
@@ -97,7 +97,7 @@ async def ingest_crossref_results(query: str) -> int:
     """
     print(f"🚀 Demarrage recherche CrossRef: {query}")
 
-    studies = get_crossref_studies(query, max_results=10)
+    studies = await get_crossref_studies(query, max_results=10)
 
     if not studies:
         print("Aucun article CrossRef trouve.")
@@ -105,7 +105,7 @@ async def ingest_crossref_results(query: str) -> int:
 
     print(f"Trouve {len(studies)} articles CrossRef. Ingestion...")
 
-    count = 0
+    batch = []
     for study in studies:
         # Skip title-only entries (no real abstract)
         abstract = study.get("resume", "")
@@ -121,20 +121,18 @@ async def ingest_crossref_results(query: str) -> int:
             "citations": study.get("citations", 0),
         }
 
-        await ingest_document(
-            title=study["titre"],
-            content=content,
-            metadata=metadata,
-        )
-        count += 1
+        batch.append({"title": study["titre"], "content": content, "metadata": metadata})
+
+    await ingest_documents_bulk(batch)
+    count = len(batch)
 
     print(f"✅ Ingestion CrossRef terminee pour {count} articles.")
     return count
 
 
-def get_crossref_context(query: str) -> tuple[str, list]:
+async def get_crossref_context(query: str) -> tuple[str, list]:
     """Format CrossRef results as context text for the LLM. Returns (text, studies_list)."""
-    studies = get_crossref_studies(query)
+    studies = await get_crossref_studies(query)
     if not studies:
         return "", []
 
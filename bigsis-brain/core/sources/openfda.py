@@ -1,10 +1,11 @@
-import requests
-import time
 from typing import Dict
 
-_FDA_DELAY = 0.3  # OpenFDA allows 240 req/min (~4/s)
+from core import http_client
+from core.sources.cache import cached_scout
 
-def get_fda_adverse_events(query: str) -> str:
+
+@cached_scout("fda")
+async def get_fda_adverse_events(query: str) -> str:
     """
     Cherche les effets secondaires rapportés dans la base OpenFDA.
     Stratégie : Cherche d'abord dans les Médicaments (Drug), puis Dispositifs (Device).
@@ -21,8 +22,7 @@ def get_fda_adverse_events(query: str) -> str:
     }
     
     try:
-        time.sleep(_FDA_DELAY)
-        resp = requests.get(drug_url, params=params, timeout=15)
+        resp = await http_client.get(drug_url, params=params)
         data = resp.json()
         
         if "results" in data:
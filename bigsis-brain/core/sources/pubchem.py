@@ -1,10 +1,11 @@
-import requests
-import time
 import json
 
-_PUBCHEM_DELAY = 0.3  # PubChem allows 5 req/s
+from core import http_client
+from core.sources.cache import cached_scout
 
-def get_chemical_safety(query: str) -> str:
+
+@cached_scout("pubchem")
+async def get_chemical_safety(query: str) -> str:
     """
     Récupère les données de sécurité (GHS Hazards) sur PubChem.
     Idéal pour : Retinol, Acide Hyaluronique, Botox, Niacinamide...
@@ -15,8 +16,7 @@ def get_chemical_safety(query: str) -> str:
     search_url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{query}/cids/JSON"
     
     try:
-        time.sleep(_PUBCHEM_DELAY)
-        resp = requests.get(search_url, timeout=15)
+        resp = await http_client.get(search_url)
         if resp.status_code != 200:
             return "Pas de données chimiques (Ce n'est probablement pas une molécule simple)."
         
@@ -31,8 +31,7 @@ def get_chemical_safety(query: str) -> str:
     details_url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug_view/data/compound/{cid}/JSON?heading=GHS+Classification"
     
     try:
-        time.sleep(_PUBCHEM_DELAY)
-        resp = requests.get(details_url, timeout=15)
+        resp = await http_client.get(details_url)
         if resp.status_code != 200:
             return "Molécule trouvée, mais pas de données de sécurité GHS."
             
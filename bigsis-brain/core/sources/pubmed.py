@@ -1,13 +1,11 @@
-import requests
-import time
 import xml.etree.ElementTree as ET
 from typing import List, Dict
+from core import http_client
 from core.config import settings
 
 BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
-_PUBMED_DELAY = 0.4  # NCBI allows 3 req/s without API key
 
-def search_pubmed(query: str) -> List[str]:
+async def search_pubmed(query: str) -> List[str]:
     """Récupère les ID (Mode Silencieux)."""
     params = {
         "db": "pubmed",
@@ -18,8 +16,7 @@ def search_pubmed(query: str) -> List[str]:
         "email": settings.PUBMED_EMAIL
     }
     try:
-        time.sleep(_PUBMED_DELAY)
-        resp = requests.get(f"{BASE_URL}/esearch.fcgi", params=params, timeout=15)
+        resp = await http_client.get(f"{BASE_URL}/esearch.fcgi", params=params)
         resp.raise_for_status()
         return resp.json().get("esearchresult", {}).get("idlist", [])
     except Exception as e:
@@ -27,7 +24,7 @@ def search_pubmed(query: str) -> List[str]:
         print(f"⚠️ Erreur Search: {e}")
         return []
 
-def fetch_details(pmids: List[str]) -> List[Dict]:
+async def fetch_details(pmids: List[str]) -> List[Dict]:
     """Récupère Titre + Abstract complet via XML (Mode Silencieux)."""
     if not pmids:
         return []
@@ -43,8 +40,7 @@ def fetch_details(pmids: List[str]) -> List[Dict]:
     
     docs = []
     try:
-        time.sleep(_PUBMED_DELAY)
-        resp = requests.get(f"{BASE_URL}/efetch.fcgi", params=params, timeout=15)
+        resp = await http_client.get(f"{BASE_URL}/efetch.fcgi", params=params)
         resp.raise_for_status()
         
         root = ET.fromstring(resp.content)
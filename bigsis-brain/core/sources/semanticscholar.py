@@ -1,8 +1,10 @@
-import requests
-import time
 from typing import List, Dict
 
-def get_influential_studies(query: str) -> List[Dict]:
+from core import http_client
+from core.sources.cache import cached_scout
+
+@cached_scout("scholar")
+async def get_influential_studies(query: str) -> List[Dict]:
     """
     Récupère les 5 études les plus influentes sous forme de données structurées.
     Retourne une liste de dicts compatible avec le format de main.py.
@@ -19,14 +21,8 @@ def get_influential_studies(query: str) -> List[Dict]:
     structured_studies = []
     
     try:
-        time.sleep(1)  # Politesse API
-        resp = requests.get(base_url, params=params, timeout=15)
-
-        # Retry once on rate limit (429)
-        if resp.status_code == 429:
-            print(f"⚠️ Semantic Scholar rate limited, retrying in 5s...")
-            time.sleep(5)
-            resp = requests.get(base_url, params=params, timeout=15)
+        # 429 is retried by the shared client (5s backoff for this host)
+        resp = await http_client.get(base_url, params=params)
 
         if resp.status_code != 200:
             print(f"⚠️ Semantic Scholar returned {resp.status_code}")
@@ -6,6 +6,7 @@ and cumulative TRS (v2) that never regresses.
 
 from typing import Dict, List
 from sqlalchemy import select
+from core import cache_versions
 from core.db.database import AsyncSessionLocal
 from core.db.models import TrendTopic
 from core.pubmed import ingest_pubmed_results
@@ -168,6 +169,7 @@ async def run_learning_iteration(topic_id: str) -> Dict:
         topic.status = new_status
 
         await session.commit()
+        cache_versions.bump(cache_versions.TREND_TOPICS)
 
         return {
             "topic_id": str(topic.id),
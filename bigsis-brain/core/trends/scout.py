@@ -13,13 +13,12 @@ Scientific publication velocity + Reddit patient interest = proxy for what's tre
 import asyncio
 import uuid
 import logging
-import requests
-import time
+import xml.etree.ElementTree as ET
 from datetime import datetime
 from typing import Dict, List
 from sqlalchemy import select, func
-from starlette.concurrency import run_in_threadpool
 
+from core import cache_versions, http_client
 from core.llm_client import LLMClient
 from core.db.database import AsyncSessionLocal
 from core.db.models import Document, Chunk, Procedure, SocialGeneration, TrendTopic
@@ -61,11 +60,11 @@ _REDDIT_SUBS = [
 _REDDIT_HEADERS = {"User-Agent": "BigSIS-TrendScout/1.0 (research; contact: adolphe.sa@gmail.com)"}
 
 
-def _fetch_reddit_hot(subreddit: str, limit: int = 25) -> List[Dict]:
-    """Synchronous: fetch hot posts from a public subreddit via the JSON API."""
+async def _fetch_reddit_hot(subreddit: str, limit: int = 25) -> List[Dict]:
+    """Fetch hot posts from a public subreddit via the JSON API."""
     try:
         url = f"https://www.reddit.com/r/{subreddit}/hot.json"
-        r = requests.get(url, params={"limit": limit}, headers=_REDDIT_HEADERS, timeout=8)
+        r = await http_client.get(url, params={"limit": limit}, headers=_REDDIT_HEADERS)
         if r.status_code != 200:
             logger.warning(f"[Scout] Reddit r/{subreddit} returned {r.status_code}")
             return []
@@ -93,11 +92,10 @@ def _fetch_reddit_hot(subreddit: str, limit: int = 25) -> List[Dict]:
         return []
 
 
-def _pubmed_recent_titles(query: str, max_results: int = 4) -> List[Dict]:
-    """Synchronous: fetch recent PubMed titles for a query (last 180 days)."""
+async def _pubmed_recent_titles(query: str, max_results: int = 4) -> List[Dict]:
+    """Fetch recent PubMed titles for a query (last 180 days)."""
     try:
-        time.sleep(0.35)  # NCBI rate limit: 3 req/s
-        r = requests.get(_PUBMED_ESEARCH, params={
+        r = await http_client.get(_PUBMED_ESEARCH, params={
             "db": "pubmed", "term": query, "retmode": "json",
             "retmax": max_results, "reldate": 180,
             "email": _PUBMED_EMAIL,
@@ -106,9 +104,7 @@ def _pubmed_recent_titles(query: str, max_results: int = 4) -> List[Dict]:
         if not pmids:
             return []
 
-        time.sleep(0.35)
-        import xml.etree.ElementTree as ET
-        rf = requests.get(_PUBMED_EFETCH, params={
+        rf = await http_client.get(_PUBMED_EFETCH, params={
             "db": "pubmed", "id": ",".join(pmids), "retmode": "xml",
             "email": _PUBMED_EMAIL,
         }, timeout=10)
@@ -132,10 +128,7 @@ async def _fetch_reddit_signals() -> List[Dict]:
     Fetch hot posts from facial aesthetics subreddits in parallel.
     Returns patient-interest signals (what real people are asking in 2026).
     """
-    tasks = [
-        run_in_threadpool(_fetch_reddit_hot, sub, 25)
-        for sub in _REDDIT_SUBS
-    ]
+    tasks = [_fetch_reddit_hot(sub, 25) for sub in _REDDIT_SUBS]
     results = await asyncio.gather(*tasks, return_exceptions=True)
 
     seen: set = set()
@@ -168,15 +161,11 @@ async def _fetch_recent_signals() -> List[Dict]:
     current_year = datetime.now().year
 
     # All 3 sources in parallel
-    pubmed_tasks = [
-        run_in_threadpool(_pubmed_recent_titles, q, 4)
-        for q in SIGNAL_QUERIES
-    ]
+    pubmed_tasks = [_pubmed_recent_titles(q, 4) for q in SIGNAL_QUERIES]
     pubmed_results, reddit_signals, crossref_raw = await asyncio.gather(
         asyncio.gather(*pubmed_tasks, return_exceptions=True),
         _fetch_reddit_signals(),
-        run_in_threadpool(
-            get_crossref_studies,
+        get_crossref_studies(
             "facial aesthetics injection treatment minimally invasive",
             5,
             current_year - 1,
@@ -347,6 +336,7 @@ async def discover_trends(batch_id: str = None) -> Dict:
             })
 
         await session.commit()
+        cache_versions.bump(cache_versions.TREND_TOPICS)
 
     return {
         "batch_id": batch_id,
@@ -12,16 +12,20 @@ v3: Scoring based on PERTINENCE, not quantity.
 v2 (inherited): Scores are monotonically increasing by design via set union.
 """
 
+import asyncio
+import os
 import re
 from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
 from dataclasses import dataclass, field
-from sqlalchemy import select, func
+from sqlalchemy import select, func, true
 from datetime import datetime
 import uuid as _uuid
 
 from core.db.database import AsyncSessionLocal
 from core.db.models import Chunk, Document, DocumentVersion, Procedure
-from core.rag.embeddings import get_embedding
+from core.rag.embeddings import get_embedding, get_embeddings
+from core.rag.vector_index import tune_search
 
 # TRS thresholds
 TRS_GREEN = 75
@@ -36,6 +40,13 @@ SEMANTIC_DEDUP_THRESHOLD = 0.90
 # are counted in scoring. Filters out noise (e.g. "Ha Giang" for "Botox" topic).
 RELEVANCE_THRESHOLD = 0.30
 
+# Nearest-neighbour candidates examined per computation (before the relevance gate)
+CANDIDATE_POOL = 200
+
+# compute_trs_many(): concurrent candidate searches (one DB session each)
+TRS_BATCH_CONCURRENCY = int(os.getenv("TRS_BATCH_CONCURRENCY", "4"))
+_ID_VALIDATION_BATCH = 5000
+
 # Stagnation: if a learning iteration adds less than this TRS delta, stop
 STAGNATION_DELTA_THRESHOLD = 3.0
 MAX_LEARNING_ITERATIONS = 3
@@ -98,27 +109,32 @@ async def _validate_stored_ids(session, chunk_ids: Set[str], doc_ids: Set[str])
 
     if chunk_ids:
         try:
-            uuid_list = [_uuid.UUID(cid) for cid in chunk_ids]
-            result = await session.execute(
-                select(Chunk.id).where(Chunk.id.in_(uuid_list))
-            )
-            valid_chunk_ids = {str(r[0]) for r in result.all()}
+            valid_chunk_ids = await _existing_ids(session, Chunk.id, chunk_ids)
         except Exception:
             valid_chunk_ids = chunk_ids  # On error, keep all (safe fallback)
 
     if doc_ids:
         try:
-            uuid_list = [_uuid.UUID(did) for did in doc_ids]
-            result = await session.execute(
-                select(Document.id).where(Document.id.in_(uuid_list))
-            )
-            valid_doc_ids = {str(r[0]) for r in result.all()}
+            valid_doc_ids = await _existing_ids(session, Document.id, doc_ids)
         except Exception:
             valid_doc_ids = doc_ids
 
     return valid_chunk_ids, valid_doc_ids
 
 
+async def _existing_ids(session, column, ids: Set[str]) -> Set[str]:
+    """IDs from `ids` present in `column`, queried in slices to stay under the
+    driver's bind-parameter limit when many topics are validated together."""
+    uuid_list = [_uuid.UUID(i) for i in ids]
+    found = set()
+    for start in range(0, len(uuid_list), _ID_VALIDATION_BATCH):
+        result = await session.execute(
+            select(column).where(column.in_(uuid_list[start:start + _ID_VALIDATION_BATCH]))
+        )
+        found.update(str(r[0]) for r in result.all())
+    return found
+
+
 # ---------------------------------------------------------------------------
 # Main TRS computation
 # ---------------------------------------------------------------------------
@@ -143,202 +159,277 @@ async def compute_trs(topic: str, stored_details: Optional[Dict] = None, search_
     - coverage:   /15  (efficacy + safety + recovery dimensions)
     - atlas:      /15  (procedure exists in atlas)
     """
+
     # Load cumulative state from previous computation
     state = _load_cumulative_state(stored_details)
 
     query_embedding = await get_embedding(topic)
 
     async with AsyncSessionLocal() as session:
-        # 1. Find relevant chunks via semantic search (fresh discovery)
-        stmt = (
-            select(Chunk, DocumentVersion, Document)
-            .join(DocumentVersion, Chunk.document_version_id == DocumentVersion.id)
-            .join(Document, DocumentVersion.document_id == Document.id)
-            .order_by(Chunk.embedding.cosine_distance(query_embedding))
-            .limit(200)
-        )
-        result = await session.execute(stmt)
-        rows = result.all()
-
-        # 2. Relevance filtering + semantic deduplication on fresh results
-        fresh_unique_chunks = []
-        fresh_unique_embeddings = []
-        fresh_chunk_texts = []
-        fresh_doc_titles = []
-        _skipped_irrelevant = 0
-
-        for chunk, version, doc in rows:
-            if chunk.embedding is None:
-                continue
-
-            # Relevance gate: skip chunks not semantically close to the topic
-            relevance = _cosine_similarity(chunk.embedding, query_embedding)
-            if relevance < RELEVANCE_THRESHOLD:
-                _skipped_irrelevant += 1
-                continue
-
-            # Semantic dedup among surviving chunks
-            is_duplicate = False
-            for existing_emb in fresh_unique_embeddings:
-                sim = _cosine_similarity(chunk.embedding, existing_emb)
-                if sim > SEMANTIC_DEDUP_THRESHOLD:
-                    is_duplicate = True
-                    break
-
-            if not is_duplicate:
-                fresh_unique_chunks.append((chunk, version, doc))
-                fresh_unique_embeddings.append(chunk.embedding)
-                fresh_chunk_texts.append(chunk.text or "")
-                fresh_doc_titles.append(doc.title or "")
-
-        # 3. Merge: union fresh discovery with stored cumulative state
-        fresh_chunk_ids = {str(chunk.id) for chunk, _, _ in fresh_unique_chunks}
-        fresh_doc_ids = {str(doc.id) for _, _, doc in fresh_unique_chunks}
-
-        all_chunk_ids = state.seen_chunk_ids | fresh_chunk_ids
-        all_doc_ids = state.seen_doc_ids | fresh_doc_ids
-
-        # 4. Validate stored IDs still exist in DB (garbage collection)
-        # Only validate the stored ones — fresh ones were just fetched so they exist
+        rows, pool_size = await _fetch_relevant_chunks(session, query_embedding)
+        valid_stored = None
         if state.seen_chunk_ids or state.seen_doc_ids:
-            valid_stored_chunks, valid_stored_docs = await _validate_stored_ids(
-                session, state.seen_chunk_ids, state.seen_doc_ids
-            )
-            all_chunk_ids = valid_stored_chunks | fresh_chunk_ids
-            all_doc_ids = valid_stored_docs | fresh_doc_ids
-
-        # --- SCORING on merged sets ---
-
-        # 1. Documents (/20) — only pertinent docs counted
-        n_docs = len(all_doc_ids)
-        if n_docs >= 15:
-            score_docs = 20
-        elif n_docs >= 10:
-            score_docs = 12
-        elif n_docs >= 5:
-            score_docs = 6
-        else:
-            score_docs = 0
-
-        # 2. Chunks (/20) — only pertinent unique chunks counted
-        n_chunks = len(all_chunk_ids)
-        if n_chunks >= 40:
-            score_chunks = 20
-        elif n_chunks >= 20:
-            score_chunks = 12
-        elif n_chunks >= 10:
-            score_chunks = 6
-        else:
-            score_chunks = 0
-
-        # 3. Diversity (/15) - OR-merge with stored flags
-        fresh_diversity = _compute_diversity_flags(fresh_chunk_texts, fresh_doc_titles)
-        merged_diversity = {
-            "has_meta": state.seen_diversity_flags.get("has_meta", False) or fresh_diversity["has_meta"],
-            "has_rct": state.seen_diversity_flags.get("has_rct", False) or fresh_diversity["has_rct"],
-            "has_clinical": state.seen_diversity_flags.get("has_clinical", False) or fresh_diversity["has_clinical"],
-        }
-        score_diversity = _score_diversity(merged_diversity)
-
-        # 4. Recency (/15) — based on PUBLICATION YEAR, not ingestion date
-        current_year = datetime.utcnow().year
-        recency_window = 3  # papers from last 3 years
-        fresh_recency_ids = set()
-        for chunk, version, doc in fresh_unique_chunks:
-            pub_year = _extract_pub_year(chunk.text or "")
-            if pub_year is not None and pub_year >= (current_year - recency_window):
-                fresh_recency_ids.add(str(chunk.id))
-
-        all_recency_ids = state.seen_recency_chunk_ids | fresh_recency_ids
-        # Validate stored recency IDs still exist
-        if state.seen_recency_chunk_ids:
-            all_recency_ids = (valid_stored_chunks & state.seen_recency_chunk_ids) | fresh_recency_ids if state.seen_chunk_ids else all_recency_ids
-
-        recent_count = len(all_recency_ids)
-        if recent_count >= 8:
-            score_recency = 15
-        elif recent_count >= 4:
-            score_recency = 10
-        elif recent_count >= 2:
-            score_recency = 5
-        else:
-            score_recency = 0
-
-        # 5. Coverage (/15) - OR-merge with stored flags
-        fresh_efficacy, fresh_safety, fresh_recovery = _check_thematic_coverage(fresh_chunk_texts)
-        merged_coverage = {
-            "efficacy": state.seen_coverage_flags.get("efficacy", False) or fresh_efficacy,
-            "safety": state.seen_coverage_flags.get("safety", False) or fresh_safety,
-            "recovery": state.seen_coverage_flags.get("recovery", False) or fresh_recovery,
-        }
-        coverage_count = sum([merged_coverage["efficacy"], merged_coverage["safety"], merged_coverage["recovery"]])
-        if coverage_count == 3:
-            score_coverage = 15
-        elif coverage_count == 2:
-            score_coverage = 10
-        elif coverage_count == 1:
-            score_coverage = 5
-        else:
-            score_coverage = 0
-
-        # 6. Atlas presence (/15)
-        topic_lower = topic.lower()
-        proc_stmt = select(Procedure)
-        proc_result = await session.execute(proc_stmt)
-        procedures = proc_result.scalars().all()
-        atlas_match = False
-        for p in procedures:
-            if p.name and (topic_lower in p.name.lower() or p.name.lower() in topic_lower):
-                atlas_match = True
-                break
-        if not atlas_match:
-            for p in procedures:
-                if p.tags:
-                    for tag in p.tags:
-                        if topic_lower in tag.lower() or tag.lower() in topic_lower:
-                            atlas_match = True
-                            break
-                if atlas_match:
-                    break
-
-        score_atlas = 15 if atlas_match else 0
-
-        # Total
-        trs_total = score_docs + score_chunks + score_diversity + score_recency + score_coverage + score_atlas
-
-        return {
-            "trs": round(trs_total, 1),
-            "status": trs_status_label(trs_total),
-            "ready_for_generation": trs_total >= TRS_MINIMUM_FOR_GENERATION,
-            "details": {
-                # Cumulative state (persisted between computations)
-                "schema_version": TRS_SCHEMA_VERSION,
-                "seen_chunk_ids": sorted(all_chunk_ids),
-                "seen_doc_ids": sorted(all_doc_ids),
-                "seen_diversity_flags": merged_diversity,
-                "seen_coverage_flags": merged_coverage,
-                "seen_recency_chunk_ids": sorted(all_recency_ids),
-                # Score snapshot (for display/debug)
-                "relevance_filter": {
-                    "threshold": RELEVANCE_THRESHOLD,
-                    "skipped_irrelevant": _skipped_irrelevant,
-                    "passed": len(fresh_unique_chunks),
-                },
-                "scores": {
-                    "documents": {"score": score_docs, "max": 20, "count": n_docs},
-                    "chunks": {"score": score_chunks, "max": 20, "count": n_chunks},
-                    "diversity": {"score": score_diversity, "max": 15},
-                    "recency": {"score": score_recency, "max": 15, "recent_count": recent_count},
-                    "coverage": {
-                        "score": score_coverage, "max": 15,
-                        "efficacy": merged_coverage["efficacy"],
-                        "safety": merged_coverage["safety"],
-                        "recovery": merged_coverage["recovery"],
-                    },
-                    "atlas": {"score": score_atlas, "max": 15, "match_found": atlas_match},
+            valid_stored = await _validate_stored_ids(session, state.seen_chunk_ids, state.seen_doc_ids)
+        atlas = await _load_atlas(session)
+
+    return _score_topic(topic, state, rows, pool_size, valid_stored, atlas)
+
+
+async def compute_trs_many(
+    topics: List[Tuple[str, Optional[Dict]]],
+    concurrency: int = TRS_BATCH_CONCURRENCY,
+) -> List[Dict]:
+    """
+    Compute TRS for many topics in one pass. Same results as calling
+    compute_trs() for each (title, stored_details) pair, with shared work:
+
+    - all titles embedded in one batched call
+    - procedures (atlas) loaded once
+    - stored chunk/doc IDs of every topic validated with one query per table
+    - candidate vector searches run in groups of at most `concurrency` sessions
+
+    Returns results in input order.
+    """
+    if not topics:
+        return []
+
+    states = [_load_cumulative_state(details) for _, details in topics]
+    embeddings = await get_embeddings([title for title, _ in topics])
+
+    async with AsyncSessionLocal() as session:
+        atlas = await _load_atlas(session)
+        all_chunk_ids: Set[str] = set().union(*(s.seen_chunk_ids for s in states))
+        all_doc_ids: Set[str] = set().union(*(s.seen_doc_ids for s in states))
+        valid_chunks, valid_docs = await _validate_stored_ids(session, all_chunk_ids, all_doc_ids)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _candidates(query_embedding):
+        async with semaphore:
+            async with AsyncSessionLocal() as session:
+                return await _fetch_relevant_chunks(session, query_embedding)
+
+    candidate_rows = await asyncio.gather(*(_candidates(e) for e in embeddings))
+
+    results = []
+    for (title, _), state, (rows, pool_size) in zip(topics, states, candidate_rows):
+        valid_stored = None
+        if state.seen_chunk_ids or state.seen_doc_ids:
+            valid_stored = (state.seen_chunk_ids & valid_chunks, state.seen_doc_ids & valid_docs)
+        results.append(_score_topic(title, state, rows, pool_size, valid_stored, atlas))
+    return results
+
+
+async def _fetch_relevant_chunks(session, query_embedding: list) -> Tuple[list, int]:
+    """Nearest CANDIDATE_POOL chunks, filtered to the relevance threshold in SQL.
+
+    Returns (rows, pool_size): rows have id, text, embedding, doc_id, title and
+    distance; pool_size is the number of candidates examined before the
+    relevance gate, counted even when none of them pass it.
+    """
+    # Distance is computed in SQL; the relevance gate is applied server-side
+    # so only chunks close enough to the topic (and their vectors) come back.
+    await tune_search(session, limit=CANDIDATE_POOL)
+    distance = Chunk.embedding.cosine_distance(query_embedding)
+    pool = (
+        select(Chunk.id.label("chunk_id"), distance.label("distance"))
+        .where(Chunk.embedding.isnot(None))
+        .order_by(distance)
+        .limit(CANDIDATE_POOL)
+        .cte("pool")
+    )
+    totals = select(func.count().label("pool_size")).select_from(pool).subquery("totals")
+    relevant = (
+        select(
+            Chunk.id, Chunk.text, Chunk.embedding,
+            Document.id.label("doc_id"), Document.title,
+            pool.c.distance,
+        )
+        .select_from(pool)
+        .join(Chunk, Chunk.id == pool.c.chunk_id)
+        .join(DocumentVersion, Chunk.document_version_id == DocumentVersion.id)
+        .join(Document, DocumentVersion.document_id == Document.id)
+        .where(pool.c.distance <= 1 - RELEVANCE_THRESHOLD)
+        .subquery("relevant")
+    )
+    # One-row totals outer-joined to the survivors: an empty gate still yields
+    # a row carrying the pool size (with NULL chunk columns).
+    stmt = (
+        select(totals.c.pool_size, *relevant.c)
+        .select_from(totals.outerjoin(relevant, true()))
+        .order_by(relevant.c.distance)
+    )
+    result = (await session.execute(stmt)).all()
+    pool_size = result[0].pool_size if result else 0
+    return [row for row in result if row.id is not None], pool_size
+
+
+async def _load_atlas(session) -> List[Tuple[str, List[str]]]:
+    """(name, tags) of every atlas procedure — no embeddings."""
+    result = await session.execute(select(Procedure.name, Procedure.tags))
+    return [(name, tags or []) for name, tags in result.all()]
+
+
+def _atlas_match(topic: str, atlas: List[Tuple[str, List[str]]]) -> bool:
+    """True when the topic matches a procedure name, or failing that one of its tags."""
+    topic_lower = topic.lower()
+    for name, _ in atlas:
+        if name and (topic_lower in name.lower() or name.lower() in topic_lower):
+            return True
+    for _, tags in atlas:
+        for tag in tags:
+            if topic_lower in tag.lower() or tag.lower() in topic_lower:
+                return True
+    return False
+
+
+def _score_topic(
+    topic: str,
+    state: _CumulativeState,
+    rows: list,
+    pool_size: int,
+    valid_stored: Optional[Tuple[Set[str], Set[str]]],
+    atlas: List[Tuple[str, List[str]]],
+) -> Dict:
+    """Pure scoring step of compute_trs(): dedup fresh rows, merge with stored
+    state and compute the six TRS components."""
+    # 2. Semantic deduplication on fresh (already relevance-filtered) results
+    _skipped_irrelevant = pool_size - len(rows)
+    keep = _dedup_indices([row.embedding for row in rows], SEMANTIC_DEDUP_THRESHOLD)
+    fresh_unique_chunks = [rows[i] for i in keep]
+    fresh_chunk_texts = [row.text or "" for row in fresh_unique_chunks]
+    fresh_doc_titles = [row.title or "" for row in fresh_unique_chunks]
+
+    # 3. Merge: union fresh discovery with stored cumulative state
+    fresh_chunk_ids = {str(row.id) for row in fresh_unique_chunks}
+    fresh_doc_ids = {str(row.doc_id) for row in fresh_unique_chunks}
+
+    all_chunk_ids = state.seen_chunk_ids | fresh_chunk_ids
+    all_doc_ids = state.seen_doc_ids | fresh_doc_ids
+
+    # 4. Drop stored IDs that no longer exist in DB (garbage collection)
+    # Only stored ones are validated — fresh ones were just fetched so they exist
+    if valid_stored is not None:
+        valid_stored_chunks, valid_stored_docs = valid_stored
+        all_chunk_ids = valid_stored_chunks | fresh_chunk_ids
+        all_doc_ids = valid_stored_docs | fresh_doc_ids
+
+    # --- SCORING on merged sets ---
+
+    # 1. Documents (/20) — only pertinent docs counted
+    n_docs = len(all_doc_ids)
+    if n_docs >= 15:
+        score_docs = 20
+    elif n_docs >= 10:
+        score_docs = 12
+    elif n_docs >= 5:
+        score_docs = 6
+    else:
+        score_docs = 0
+
+    # 2. Chunks (/20) — only pertinent unique chunks counted
+    n_chunks = len(all_chunk_ids)
+    if n_chunks >= 40:
+        score_chunks = 20
+    elif n_chunks >= 20:
+        score_chunks = 12
+    elif n_chunks >= 10:
+        score_chunks = 6
+    else:
+        score_chunks = 0
+
+    # 3. Diversity (/15) - OR-merge with stored flags
+    fresh_diversity = _compute_diversity_flags(fresh_chunk_texts, fresh_doc_titles)
+    merged_diversity = {
+        "has_meta": state.seen_diversity_flags.get("has_meta", False) or fresh_diversity["has_meta"],
+        "has_rct": state.seen_diversity_flags.get("has_rct", False) or fresh_diversity["has_rct"],
+        "has_clinical": state.seen_diversity_flags.get("has_clinical", False) or fresh_diversity["has_clinical"],
+    }
+    score_diversity = _score_diversity(merged_diversity)
+
+    # 4. Recency (/15) — based on PUBLICATION YEAR, not ingestion date
+    current_year = datetime.utcnow().year
+    recency_window = 3  # papers from last 3 years
+    fresh_recency_ids = set()
+    for row in fresh_unique_chunks:
+        pub_year = _extract_pub_year(row.text or "")
+        if pub_year is not None and pub_year >= (current_year - recency_window):
+            fresh_recency_ids.add(str(row.id))
+
+    all_recency_ids = state.seen_recency_chunk_ids | fresh_recency_ids
+    # Validate stored recency IDs still exist
+    if state.seen_recency_chunk_ids:
+        all_recency_ids = (valid_stored_chunks & state.seen_recency_chunk_ids) | fresh_recency_ids if state.seen_chunk_ids else all_recency_ids
+
+    recent_count = len(all_recency_ids)
+    if recent_count >= 8:
+        score_recency = 15
+    elif recent_count >= 4:
+        score_recency = 10
+    elif recent_count >= 2:
+        score_recency = 5
+    else:
+        score_recency = 0
+
+    # 5. Coverage (/15) - OR-merge with stored flags
+    fresh_efficacy, fresh_safety, fresh_recovery = _check_thematic_coverage(fresh_chunk_texts)
+    merged_coverage = {
+        "efficacy": state.seen_coverage_flags.get("efficacy", False) or fresh_efficacy,
+        "safety": state.seen_coverage_flags.get("safety", False) or fresh_safety,
+        "recovery": state.seen_coverage_flags.get("recovery", False) or fresh_recovery,
+    }
+    coverage_count = sum([merged_coverage["efficacy"], merged_coverage["safety"], merged_coverage["recovery"]])
+    if coverage_count == 3:
+        score_coverage = 15
+    elif coverage_count == 2:
+        score_coverage = 10
+    elif coverage_count == 1:
+        score_coverage = 5
+    else:
+        score_coverage = 0
+
+    # 6. Atlas presence (/15)
+    atlas_match = _atlas_match(topic, atlas)
+    score_atlas = 15 if atlas_match else 0
+
+    # Total
+    trs_total = score_docs + score_chunks + score_diversity + score_recency + score_coverage + score_atlas
+
+    return {
+        "trs": round(trs_total, 1),
+        "status": trs_status_label(trs_total),
+        "ready_for_generation": trs_total >= TRS_MINIMUM_FOR_GENERATION,
+        "details": {
+            # Cumulative state (persisted between computations)
+            "schema_version": TRS_SCHEMA_VERSION,
+            "seen_chunk_ids": sorted(all_chunk_ids),
+            "seen_doc_ids": sorted(all_doc_ids),
+            "seen_diversity_flags": merged_diversity,
+            "seen_coverage_flags": merged_coverage,
+            "seen_recency_chunk_ids": sorted(all_recency_ids),
+            # Score snapshot (for display/debug)
+            "relevance_filter": {
+                "threshold": RELEVANCE_THRESHOLD,
+                "skipped_irrelevant": _skipped_irrelevant,
+                "passed": len(fresh_unique_chunks),
+            },
+            "scores": {
+                "documents": {"score": score_docs, "max": 20, "count": n_docs},
+                "chunks": {"score": score_chunks, "max": 20, "count": n_chunks},
+                "diversity": {"score": score_diversity, "max": 15},
+                "recency": {"score": score_recency, "max": 15, "recent_count": recent_count},
+                "coverage": {
+                    "score": score_coverage, "max": 15,
+                    "efficacy": merged_coverage["efficacy"],
+                    "safety": merged_coverage["safety"],
+                    "recovery": merged_coverage["recovery"],
                 },
-            }
+                "atlas": {"score": score_atlas, "max": 15, "match_found": atlas_match},
+            },
         }
+    }
+
+
 
 
 # ---------------------------------------------------------------------------
@@ -360,16 +451,36 @@ def _extract_pub_year(chunk_text: str) -> Optional[int]:
     return None
 
 
-def _cosine_similarity(a: list, b: list) -> float:
-    """Compute cosine similarity between two embedding vectors."""
-    if a is None or b is None or len(a) != len(b):
-        return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = sum(x * x for x in a) ** 0.5
-    norm_b = sum(x * x for x in b) ** 0.5
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
+def _normalize_rows(embeddings) -> np.ndarray:
+    """Stack embeddings into a float32 matrix with unit-norm rows (zero rows stay zero)."""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] == 0:
+        return matrix.reshape(0, 0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _dedup_indices(embeddings, threshold: float) -> List[int]:
+    """Greedy near-duplicate removal, in input order.
+
+    A row is dropped when its cosine similarity to an already-kept row exceeds
+    `threshold`. All pairwise similarities come from a single matmul; the greedy
+    pass only ORs rows of the similarity matrix.
+    """
+    matrix = _normalize_rows(embeddings)
+    n = matrix.shape[0]
+    if n == 0:
+        return []
+    sims = matrix @ matrix.T
+    suppressed = np.zeros(n, dtype=bool)
+    keep: List[int] = []
+    for i in range(n):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= sims[i] > threshold
+    return keep
 
 
 def _compute_diversity_flags(chunk_texts: List[str], doc_titles: List[str]) -> Dict[str, bool]:
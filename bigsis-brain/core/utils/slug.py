@@ -0,0 +1,28 @@
+import re
+import unicodedata
+from typing import Optional, Tuple
+from urllib.parse import unquote
+
+_KIND_PREFIX = re.compile(r'^\[([A-Za-z_]+)\]\s*')
+
+
+def make_slug(text: str) -> str:
+    """Generate a clean URL-safe slug from any text (percent-encoded input is decoded first)."""
+    decoded = text
+    for _ in range(3):
+        prev = decoded
+        decoded = unquote(decoded)
+        if decoded == prev:
+            break
+    normalized = unicodedata.normalize("NFKD", decoded)
+    ascii_text = normalized.encode("ascii", "ignore").decode("ascii").lower()
+    slug = re.sub(r'[^a-z0-9]+', '-', ascii_text).strip('-')
+    return re.sub(r'-+', '-', slug)
+
+
+def split_topic(topic: str) -> Tuple[Optional[str], str]:
+    """Split a generation topic like "[SOCIAL] Botox" into ("social", "Botox"); kind is None without a prefix."""
+    match = _KIND_PREFIX.match(topic or "")
+    if not match:
+        return None, topic or ""
+    return match.group(1).lower(), topic[match.end():]
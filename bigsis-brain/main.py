@@ -16,6 +16,7 @@ from api.fiches import router as fiches_router
 from api.chat import router as chat_router
 from api.ingredients import router as ingredients_router
 from api.scanner import router as scanner_router
+from core import http_client, jobs
 from core.db.database import engine, Base
 from sqlalchemy import text
 
@@ -101,13 +102,25 @@ async def startup():
         await conn.execute(text("ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS video_url VARCHAR"))
         await conn.execute(text("ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS reel_props JSONB"))
         await conn.run_sync(Base.metadata.create_all)
+        # Full-text column + GIN index for hybrid retrieval
+        await conn.execute(text("ALTER TABLE chunks ADD COLUMN IF NOT EXISTS text_tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', text)) STORED"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_chunks_text_tsv ON chunks USING gin(text_tsv)"))
+        # Fiche kind/slug columns (backfilled below) for indexed lookups
+        await conn.execute(text("ALTER TABLE social_generations ADD COLUMN IF NOT EXISTS kind VARCHAR"))
+        await conn.execute(text("ALTER TABLE social_generations ADD COLUMN IF NOT EXISTS slug VARCHAR"))
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_social_generations_kind_slug ON social_generations(kind, slug, created_at)"))
         logger.info("Auto-Migration complete.")
 
+    # ANN indexes on vector columns (CREATE INDEX CONCURRENTLY, in the background)
+    from core.rag.vector_index import start_background_build
+    start_background_build()
+
     # Backfill Procedure embeddings (one-time, idempotent)
     try:
+        from core import cache_versions
         from core.db.database import AsyncSessionLocal
         from core.db.models import Procedure
-        from core.rag.embeddings import get_embedding
+        from core.rag.embeddings import get_embeddings
         from sqlalchemy import select
 
         async with AsyncSessionLocal() as session:
@@ -117,14 +130,43 @@ async def startup():
             procs = result.scalars().all()
             if procs:
                 logger.info(f"Backfilling embeddings for {len(procs)} procedures...")
-                for p in procs:
-                    p.embedding = await get_embedding(p.name)
+                vectors = await get_embeddings([p.name for p in procs])
+                for p, vector in zip(procs, vectors):
+                    p.embedding = vector
                     logger.info(f"  Embedded: {p.name}")
                 await session.commit()
+                cache_versions.bump(cache_versions.PROCEDURES)
                 logger.info("Procedure embeddings backfill complete.")
     except Exception as e:
         logger.warning(f"Procedure embedding backfill skipped: {e}")
 
+    # Backfill kind/slug on generations created before those columns (one-time, idempotent)
+    try:
+        from core.db.database import AsyncSessionLocal
+        from core.db.models import SocialGeneration
+        from core.utils.slug import make_slug, split_topic
+        from sqlalchemy import select, update
+
+        async with AsyncSessionLocal() as session:
+            rows = (await session.execute(
+                select(SocialGeneration.id, SocialGeneration.topic).where(SocialGeneration.slug == None)  # noqa: E711
+            )).all()
+            if rows:
+                logger.info(f"Backfilling kind/slug for {len(rows)} generations...")
+                values = []
+                for row in rows:
+                    kind, name = split_topic(row.topic or "")
+                    values.append({"id": row.id, "kind": kind, "slug": make_slug(name)})
+                await session.execute(update(SocialGeneration), values)
+                await session.commit()
+                logger.info("Generation kind/slug backfill complete.")
+    except Exception as e:
+        logger.warning(f"Generation kind/slug backfill skipped: {e}")
+
+    # Persistent batch job workers (resume any job interrupted by a restart)
+    jobs.start_workers()
+
 @app.on_event("shutdown")
 async def shutdown():
-    pass
+    await jobs.stop_workers()
+    await http_client.close()
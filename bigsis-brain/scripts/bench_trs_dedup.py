@@ -0,0 +1,89 @@
+"""
+Benchmark: TRS semantic dedup, pure-Python pairwise loop vs NumPy matmul.
+
+Builds a synthetic candidate pool shaped like compute_trs() input (up to 200
+chunks x 1536 dims, with clusters of near-duplicates), checks both
+implementations keep exactly the same chunks, and reports timings.
+
+Usage:
+    python scripts/bench_trs_dedup.py
+    python scripts/bench_trs_dedup.py --sizes 50,200,500 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add brain root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.trends.trs_engine import SEMANTIC_DEDUP_THRESHOLD, _dedup_indices
+
+DIM = 1536
+
+
+def _cosine_similarity(a, b):
+    """The pre-NumPy implementation, kept here as the baseline."""
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = sum(x * x for x in a) ** 0.5
+    norm_b = sum(x * x for x in b) ** 0.5
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+def python_dedup(embeddings, threshold):
+    kept, kept_embeddings = [], []
+    for i, emb in enumerate(embeddings):
+        if any(_cosine_similarity(emb, other) > threshold for other in kept_embeddings):
+            continue
+        kept.append(i)
+        kept_embeddings.append(emb)
+    return kept
+
+
+def make_pool(n, dup_ratio=0.3, seed=0):
+    """n vectors; roughly dup_ratio of them are small perturbations of earlier ones."""
+    rng = np.random.default_rng(seed)
+    vectors = []
+    for i in range(n):
+        if vectors and rng.random() < dup_ratio:
+            base = vectors[rng.integers(len(vectors))]
+            vectors.append(base + rng.normal(0, 0.01, DIM))
+        else:
+            vectors.append(rng.normal(0, 1, DIM))
+    return [v.tolist() for v in vectors]
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(sizes, repeat):
+    print(f"{'n':>6} {'kept':>6} {'python ms':>12} {'numpy ms':>10} {'speedup':>9}")
+    print("-" * 47)
+    for n in sizes:
+        pool = make_pool(n)
+        py_ms, py_keep = _time(lambda: python_dedup(pool, SEMANTIC_DEDUP_THRESHOLD), repeat)
+        np_ms, np_keep = _time(lambda: _dedup_indices(pool, SEMANTIC_DEDUP_THRESHOLD), repeat)
+        if py_keep != np_keep:
+            print(f"❌ n={n}: results differ ({len(py_keep)} vs {len(np_keep)} kept)")
+            sys.exit(1)
+        print(f"{n:>6} {len(np_keep):>6} {py_ms:>12.1f} {np_ms:>10.2f} {py_ms / np_ms:>8.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TRS dedup benchmark")
+    parser.add_argument("--sizes", default="50,100,200", help="comma-separated pool sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main([int(s) for s in args.sizes.split(",")], args.repeat)
@@ -0,0 +1,74 @@
+"""
+Time-to-first-token report for POST /api/v1/chat/diagnostic.
+
+Sends the same conversation N times, measures client-side time to the first
+streamed token, and prints the per-stage `timings` event the server emits at
+the end of each stream (extraction, profile, catalogue, retrieval, ...).
+
+Usage:
+    python scripts/chat_ttft_report.py --url http://localhost:8000 --runs 10
+    python scripts/chat_ttft_report.py --message "rides du lion, j'ai 35 ans"
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import httpx
+
+
+def _run_once(client: httpx.Client, url: str, message: str):
+    payload = {"messages": [{"role": "user", "content": message}], "language": "fr"}
+    start = time.perf_counter()
+    ttft, timings = None, {}
+    with client.stream("POST", f"{url}/api/v1/chat/diagnostic", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line[6:])
+            if "token" in event and ttft is None:
+                ttft = (time.perf_counter() - start) * 1000
+            if "timings" in event:
+                timings = event["timings"]
+            if "error" in event:
+                raise RuntimeError(event["error"])
+            if event.get("done"):
+                break
+    return ttft, timings
+
+
+def main(url: str, runs: int, message: str):
+    ttfts, stages = [], {}
+    with httpx.Client(timeout=120) as client:
+        for i in range(runs):
+            ttft, timings = _run_once(client, url, message)
+            # A stream that ends without a token has no TTFT: shown, not counted
+            if ttft is not None:
+                ttfts.append(ttft)
+            for name, value in timings.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    stages.setdefault(name, []).append(value)
+            shown = f"{ttft:.0f} ms" if ttft is not None else "n/a"
+            print(f"run {i + 1:>3}: ttft={shown}  {timings}")
+
+    print(f"\n{'stage':<24} {'p50 ms':>10} {'max ms':>10}")
+    print("-" * 46)
+    if ttfts:
+        print(f"{'client ttft':<24} {statistics.median(ttfts):>10.1f} {max(ttfts):>10.1f}")
+    else:
+        print(f"{'client ttft':<24} {'n/a':>10} {'n/a':>10}")
+    for name, values in stages.items():
+        print(f"{name:<24} {statistics.median(values):>10.1f} {max(values):>10.1f}")
+    if len(ttfts) < runs:
+        print(f"\n{runs - len(ttfts)} run(s) streamed no token and are excluded from client ttft")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat diagnostic TTFT report")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--message", default="J'ai des rides du lion et des pattes d'oie, j'ai 38 ans")
+    args = parser.parse_args()
+    main(args.url, args.runs, args.message)
@@ -0,0 +1,264 @@
+"""
+Deterministic OpenAI-compatible stand-in server for offline load tests.
+
+Serves /v1/chat/completions (plain, JSON mode and streaming), /v1/embeddings
+and /v1/models. Output is a pure function of the request, so runs are
+reproducible:
+  - JSON mode: the largest JSON template found in the prompt (e.g. the fiche
+    structure in SHARED_FICHE_STRUCTURE) is filled in, so outputs have the
+    shape the pipelines validate against; `{}` when the prompt has none.
+  - text mode / streaming: French filler text of a configurable length.
+  - embeddings: unit vectors seeded from a hash of the input text.
+
+Latency is modelled as time-to-first-token + tokens / throughput, with jitter;
+--error-rate injects 429/500 responses to exercise retry paths.
+
+Point the brain at it with:
+    LLM_PROVIDER=local LLM_BASE_URL=http://localhost:8100/v1
+
+Embeddings come from here too in that mode — use a scratch database, since
+ingested chunks get stand-in vectors.
+
+Usage:
+    python scripts/llm_standin_server.py --profile realistic --port 8100
+    python scripts/llm_standin_server.py --ttft-ms 300 --tokens-per-sec 60 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# ttft_ms, tokens_per_sec, jitter (fraction of each delay)
+PROFILES = {
+    "instant": (0, 0, 0.0),
+    "fast": (80, 400, 0.1),
+    "realistic": (450, 70, 0.3),    # roughly gpt-4o-mini
+    "slow": (1500, 25, 0.5),        # roughly gpt-4o under load
+}
+
+EMBEDDING_DIM = 1536
+
+FILLER = (
+    "Franchement, pour cette zone la toxine botulique reste la reference, mais "
+    "l'acide hyaluronique peut completer si le creux est marque. Demande toujours "
+    "au praticien combien d'unites il prevoit et ce qu'il fait en cas de bleu. "
+    "Le resultat apparait en quelques jours et dure en general trois a quatre mois."
+).split()
+
+config = {"ttft_ms": 450, "tokens_per_sec": 70, "jitter": 0.3, "error_rate": 0.0, "stream_tokens": 120}
+stats = {"completions": 0, "streams": 0, "embeddings": 0, "errors_injected": 0}
+
+app = FastAPI(title="BigSis LLM stand-in")
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.sha256("\x1f".join(map(str, parts)).encode("utf-8")).hexdigest()[:16], 16)
+
+
+def _jittered(seconds: float, rng: random.Random) -> float:
+    if seconds <= 0:
+        return 0.0
+    return max(0.0, seconds * (1 + rng.uniform(-config["jitter"], config["jitter"])))
+
+
+def _token_delay() -> float:
+    return 1.0 / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Schema-shaped JSON
+# ---------------------------------------------------------------------------
+
+def _json_candidates(text: str):
+    """Balanced {...} spans in text, largest first."""
+    spans, stack = [], []
+    for i, ch in enumerate(text):
+        if ch == "{":
+            stack.append(i)
+        elif ch == "}" and stack:
+            start = stack.pop()
+            if not stack:
+                spans.append(text[start:i + 1])
+    return sorted(spans, key=len, reverse=True)
+
+
+def _find_template(prompt: str):
+    # Prompts built with str.format() may still carry doubled braces
+    text = prompt
+    while "{{" in text or "}}" in text:
+        text = text.replace("{{", "{").replace("}}", "}")
+    for candidate in _json_candidates(text):
+        cleaned = re.sub(r"\s+(?:or|ou)\s+null", "", candidate)
+        cleaned = re.sub(r",\s*\.\.\.\s*(?=[\]}])", "", cleaned)
+        cleaned = re.sub(r",\s*([}\]])", r"\1", cleaned)
+        try:
+            value = json.loads(cleaned)
+        except ValueError:
+            continue
+        if isinstance(value, dict) and value:
+            return value
+    return None
+
+
+def _fill(value, rng: random.Random):
+    """Replace template placeholders with plausible deterministic values."""
+    if isinstance(value, dict):
+        return {k: _fill(v, rng) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [_fill(v, rng) for v in value] or ["..."]
+        return items
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return value or rng.randint(5, 9)
+    if isinstance(value, float):
+        return value or round(rng.uniform(5, 9), 1)
+    if isinstance(value, str) and (value.strip(". ") == "" or value == "..."):
+        start = rng.randrange(len(FILLER) - 8)
+        return " ".join(FILLER[start:start + rng.randint(4, 8)])
+    return value
+
+
+def _json_output(messages: list, model: str) -> str:
+    prompt = "\n".join(m.get("content") or "" for m in messages)
+    template = _find_template(prompt)
+    if template is None:
+        return "{}"
+    return json.dumps(_fill(template, random.Random(_seed(model, prompt))), ensure_ascii=False)
+
+
+def _text_output(messages: list, model: str, n_tokens: int) -> list:
+    rng = random.Random(_seed(model, json.dumps(messages, sort_keys=True)))
+    start = rng.randrange(len(FILLER))
+    return [FILLER[(start + i) % len(FILLER)] + " " for i in range(n_tokens)]
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+def _maybe_error(rng: random.Random):
+    if config["error_rate"] and rng.random() < config["error_rate"]:
+        stats["errors_injected"] += 1
+        if rng.random() < 0.7:
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (stand-in)", "type": "rate_limit_error"}},
+                status_code=429, headers={"retry-after": "1"},
+            )
+        return JSONResponse({"error": {"message": "Internal error (stand-in)", "type": "server_error"}}, status_code=500)
+    return None
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": m, "object": "model"} for m in ("gpt-4o", "gpt-4o-mini", "text-embedding-ada-002")]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "gpt-4o-mini")
+    rng = random.Random()  # latency / error jitter is not part of the output
+
+    error = _maybe_error(rng)
+    if error:
+        return error
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+
+    if body.get("stream"):
+        stats["streams"] += 1
+        tokens = _text_output(messages, model, config["stream_tokens"])
+
+        async def events():
+            await asyncio.sleep(_jittered(config["ttft_ms"] / 1000, rng))
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(_jittered(_token_delay(), rng))
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    stats["completions"] += 1
+    json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+    content = _json_output(messages, model) if json_mode else "".join(_text_output(messages, model, config["stream_tokens"]))
+    n_tokens = max(1, len(content) // 4)
+    await asyncio.sleep(_jittered(config["ttft_ms"] / 1000 + n_tokens * _token_delay(), rng))
+
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    return {
+        "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens, "total_tokens": prompt_tokens + n_tokens},
+    }
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    model = body.get("model", "text-embedding-ada-002")
+    stats["embeddings"] += len(inputs)
+
+    data = []
+    for i, text in enumerate(inputs):
+        vec = np.random.default_rng(_seed(model, text)).normal(size=EMBEDDING_DIM)
+        vec /= np.linalg.norm(vec)
+        data.append({"object": "embedding", "index": i, "embedding": vec.tolist()})
+    # Embedding calls are latency-only: one short round-trip per batch
+    await asyncio.sleep(_jittered(config["ttft_ms"] / 4000, random.Random()))
+    tokens = sum(len(t) for t in inputs) // 4
+    return {"object": "list", "data": data, "model": model, "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+
+@app.get("/stats")
+async def get_stats():
+    return {"config": config, **stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--profile", choices=list(PROFILES), default="realistic")
+    parser.add_argument("--ttft-ms", type=float, help="override the profile's time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, help="override the profile's throughput (0 = unlimited)")
+    parser.add_argument("--jitter", type=float, help="override the profile's jitter fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions answered 429/500")
+    parser.add_argument("--stream-tokens", type=int, default=120, help="length of text/streamed responses")
+    args = parser.parse_args()
+
+    ttft_ms, tps, jitter = PROFILES[args.profile]
+    config.update(
+        ttft_ms=args.ttft_ms if args.ttft_ms is not None else ttft_ms,
+        tokens_per_sec=args.tokens_per_sec if args.tokens_per_sec is not None else tps,
+        jitter=args.jitter if args.jitter is not None else jitter,
+        error_rate=args.error_rate,
+        stream_tokens=args.stream_tokens,
+    )
+    print(f"LLM stand-in on http://{args.host}:{args.port}/v1 — {config}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
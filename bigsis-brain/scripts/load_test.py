@@ -0,0 +1,174 @@
+"""
+Load-test harness for the chat diagnostic and social generation endpoints.
+
+Drives POST /api/v1/chat/diagnostic (SSE) and/or POST /api/v1/social/generate
+with a fixed number of concurrent virtual users, then reports p50/p95/p99
+latency, time to first token (chat) and throughput per endpoint.
+
+Run the brain against the deterministic stand-in for offline, repeatable runs:
+    python scripts/llm_standin_server.py --profile realistic &
+    LLM_PROVIDER=local LLM_BASE_URL=http://localhost:8100/v1 uvicorn main:app --port 8000 &
+    python scripts/load_test.py --target chat --concurrency 20 --requests 200
+
+Usage:
+    python scripts/load_test.py --target both --concurrency 10 --duration 60
+    python scripts/load_test.py --target social --requests 50 --force
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import statistics
+import time
+
+import httpx
+
+CHAT_OPENINGS = [
+    "J'ai des rides du lion qui me donnent l'air fatiguee",
+    "Je voudrais atténuer mes pattes d'oie, j'ai 42 ans",
+    "Mon sillon nasogenien se creuse, c'est quoi les options ?",
+    "Est-ce que le botox est dangereux si j'allaite ?",
+    "J'ai la peau grasse et des rides du front",
+    "Skinbooster ou acide hyaluronique pour les joues ?",
+]
+CHAT_FOLLOW_UPS = ["Et le prix ?", "Combien de temps ça dure ?", "J'ai 35 ans", "C'est douloureux ?"]
+SOCIAL_TOPICS = ["Toxine Botulique", "Acide Hyaluronique", "Skinbooster", "Peeling TCA", "Microneedling", "LED Phototherapie"]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}   # endpoint -> [ms]
+        self.ttfts = {}       # endpoint -> [ms]
+        self.errors = {}      # endpoint -> count
+        self.started = time.perf_counter()
+
+    def record(self, endpoint, latency_ms, ttft_ms=None, error=False):
+        if error:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            return
+        self.latencies.setdefault(endpoint, []).append(latency_ms)
+        if ttft_ms is not None:
+            self.ttfts.setdefault(endpoint, []).append(ttft_ms)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"\nWall time: {elapsed:.1f}s\n")
+        header = f"{'endpoint':<10} {'ok':>6} {'err':>5} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        print(header)
+        print("-" * len(header))
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(endpoint, [])
+            print(
+                f"{endpoint:<10} {len(values):>6} {self.errors.get(endpoint, 0):>5} {len(values) / elapsed:>7.2f} "
+                f"{_percentile(values, 50):>9.0f} {_percentile(values, 95):>9.0f} {_percentile(values, 99):>9.0f}"
+            )
+        for endpoint, values in self.ttfts.items():
+            print(
+                f"{endpoint + ' ttft':<10} {len(values):>6} {'':>5} {'':>7} "
+                f"{_percentile(values, 50):>9.0f} {_percentile(values, 95):>9.0f} {_percentile(values, 99):>9.0f}"
+            )
+
+
+async def _chat_turn(client: httpx.AsyncClient, base_url: str, messages: list, conversation_id: str, results: Results):
+    start = time.perf_counter()
+    ttft, reply = None, []
+    try:
+        async with client.stream(
+            "POST", f"{base_url}/api/v1/chat/diagnostic",
+            json={"messages": messages, "language": "fr", "conversation_id": conversation_id},
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = json.loads(line[6:])
+                if "token" in event:
+                    if ttft is None:
+                        ttft = (time.perf_counter() - start) * 1000
+                    reply.append(event["token"])
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                if event.get("done"):
+                    break
+    except Exception as e:
+        print(f"chat error: {e}")
+        results.record("chat", 0, error=True)
+        return None
+    results.record("chat", (time.perf_counter() - start) * 1000, ttft)
+    return "".join(reply)
+
+
+async def _chat_conversation(client, base_url, n, turns, results):
+    """One simulated user: an opening message plus follow-ups in the same conversation."""
+    messages = [{"role": "user", "content": CHAT_OPENINGS[n % len(CHAT_OPENINGS)]}]
+    for turn in range(turns):
+        reply = await _chat_turn(client, base_url, messages, f"loadtest-{n}", results)
+        if reply is None:
+            return
+        messages.append({"role": "assistant", "content": reply})
+        messages.append({"role": "user", "content": CHAT_FOLLOW_UPS[(n + turn) % len(CHAT_FOLLOW_UPS)]})
+
+
+async def _social_generate(client, base_url, n, force, results):
+    start = time.perf_counter()
+    try:
+        response = await client.post(
+            f"{base_url}/api/v1/social/generate",
+            json={"topic": SOCIAL_TOPICS[n % len(SOCIAL_TOPICS)], "mode": "social", "force": force},
+        )
+        response.raise_for_status()
+    except Exception as e:
+        print(f"social error: {e}")
+        results.record("social", 0, error=True)
+        return
+    results.record("social", (time.perf_counter() - start) * 1000)
+
+
+async def run(base_url, target, concurrency, total, duration, turns, force, timeout):
+    results = Results()
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker(client):
+        while True:
+            n = next(counter)
+            if total is not None and n >= total:
+                return
+            if deadline and time.perf_counter() >= deadline:
+                return
+            use_chat = target == "chat" or (target == "both" and n % 2 == 0)
+            if use_chat:
+                await _chat_conversation(client, base_url, n, turns, results)
+            else:
+                await _social_generate(client, base_url, n, force, results)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    results.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BigSis chat/social load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--target", choices=["chat", "social", "both"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, help="number of conversations/generations (default: 100 unless --duration)")
+    parser.add_argument("--duration", type=float, help="stop starting new work after N seconds")
+    parser.add_argument("--turns", type=int, default=2, help="chat turns per conversation")
+    parser.add_argument("--force", action="store_true", help="social: bypass the fiche cache")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    total = args.requests if args.requests is not None else (None if args.duration else 100)
+    asyncio.run(run(args.url, args.target, args.concurrency, total, args.duration, args.turns, args.force, args.timeout))
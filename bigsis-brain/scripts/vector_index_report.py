@@ -0,0 +1,130 @@
+"""
+Recall-vs-latency report for the pgvector ANN indexes.
+
+Samples stored embeddings as queries, computes the exact top-k with index scans
+disabled, then re-runs each query through the ANN index at several
+hnsw.ef_search / ivfflat.probes values and reports recall@k and latency.
+
+Usage:
+    python scripts/vector_index_report.py --table chunks --k 10 --samples 50
+    python scripts/vector_index_report.py --table chunks --ef 20,40,100,200
+    python scripts/vector_index_report.py --table procedures --rebuild
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add brain root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from core.db.database import engine
+from core.rag.vector_index import (
+    INDEX_TYPE, VECTOR_COLUMNS, rebuild_vector_index, vector_index_status,
+)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def _sample_queries(table: str, column: str, n: int):
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(f"SELECT {column}::text FROM {table} WHERE {column} IS NOT NULL ORDER BY random() LIMIT :n"),
+            {"n": n},
+        )
+        return [row[0] for row in result.all()]
+
+
+async def _top_k(table: str, column: str, vector: str, k: int, settings: list):
+    """Run one ANN query with the given SET LOCAL statements. Returns (ids, ms)."""
+    async with engine.connect() as conn:
+        async with conn.begin():
+            for stmt in settings:
+                await conn.execute(text(stmt))
+            start = time.perf_counter()
+            result = await conn.execute(
+                text(f"SELECT id FROM {table} ORDER BY {column} <=> CAST(:q AS vector) LIMIT :k"),
+                {"q": vector, "k": k},
+            )
+            ids = [row[0] for row in result.all()]
+            return ids, (time.perf_counter() - start) * 1000
+
+
+async def report(table: str, k: int, samples: int, ef_values, probe_values, rebuild: bool):
+    column = VECTOR_COLUMNS[table]
+
+    if rebuild:
+        print(f"🔧 Rebuilding {INDEX_TYPE} index on {table}...")
+        print(f"   -> {await rebuild_vector_index(table)}")
+
+    for entry in await vector_index_status():
+        if entry["table"] == table:
+            if not entry["indexes"]:
+                print(f"⚠️  No ANN index on {table} — every run below is a sequential scan.")
+            for idx in entry["indexes"]:
+                print(f"📇 {idx['name']} ({idx['size_mb']} MB)\n   {idx['definition']}")
+
+    queries = await _sample_queries(table, column, samples)
+    if not queries:
+        print(f"❌ No embeddings found in {table}.")
+        return
+    print(f"\nSampled {len(queries)} query vectors, k={k}\n")
+
+    # Ground truth: exact search (index scans off forces a sequential scan + sort)
+    exact, exact_ms = [], []
+    for q in queries:
+        ids, ms = await _top_k(table, column, q, k, ["SET LOCAL enable_indexscan = off"])
+        exact.append(set(ids))
+        exact_ms.append(ms)
+
+    rows = [("exact (seq scan)", 1.0, statistics.median(exact_ms), _percentile(exact_ms, 95))]
+
+    if INDEX_TYPE == "hnsw":
+        sweep = [(f"ef_search={ef}", [f"SET LOCAL hnsw.ef_search = {ef}"]) for ef in ef_values if ef >= k]
+    elif INDEX_TYPE == "ivfflat":
+        sweep = [(f"probes={p}", [f"SET LOCAL ivfflat.probes = {p}"]) for p in probe_values]
+    else:
+        sweep = []
+
+    for label, settings in sweep:
+        recalls, latencies = [], []
+        for q, truth in zip(queries, exact):
+            ids, ms = await _top_k(table, column, q, k, settings)
+            recalls.append(len(truth & set(ids)) / max(1, len(truth)))
+            latencies.append(ms)
+        rows.append((label, statistics.mean(recalls), statistics.median(latencies), _percentile(latencies, 95)))
+
+    print(f"{'setting':<20} {'recall@' + str(k):>10} {'p50 ms':>10} {'p95 ms':>10}")
+    print("-" * 53)
+    for label, recall, p50, p95 in rows:
+        print(f"{label:<20} {recall:>10.3f} {p50:>10.2f} {p95:>10.2f}")
+
+    await engine.dispose()
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pgvector ANN recall/latency report")
+    parser.add_argument("--table", choices=list(VECTOR_COLUMNS), default="chunks")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--ef", type=_int_list, default=[10, 20, 40, 80, 160, 200, 400])
+    parser.add_argument("--probes", type=_int_list, default=[1, 3, 5, 10, 20, 40])
+    parser.add_argument("--rebuild", action="store_true", help="drop and rebuild the index first")
+    args = parser.parse_args()
+
+    asyncio.run(report(args.table, args.k, args.samples, args.ef, args.probes, args.rebuild))